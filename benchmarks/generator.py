@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from src.schema import apply_schema
+
+# Категории трат: (категория, MCC, описания, доля операций, медианная сумма в рублях)
+SPEND_CATEGORIES = [
+    ("Супермаркеты", 5411, ["Колхоз", "Магнит", "SPAR", "Пятерочка", "Перекресток"], 0.34, 450.0),
+    ("Фастфуд", 5814, ["McDonald's", "Rumyanyj Khleb", "KFC", "Теремок"], 0.19, 250.0),
+    ("Транспорт", 4121, ["Яндекс Такси", "Ситимобил"], 0.06, 350.0),
+    ("Переводы", np.nan, ["Перевод с карты", "Перевод Кредитная карта. ТП 10.2 RUR"], 0.05, 2000.0),
+    ("Ж/д билеты", 4112, ["РЖД", "Аэроэкспресс"], 0.04, 1500.0),
+    ("Различные товары", 5399, ["Ozon.ru", "Wildberries"], 0.03, 1200.0),
+    ("Связь", 4814, ["МТС", "Билайн"], 0.03, 400.0),
+    ("Аптеки", 5912, ["Аптека Вита", "Ригла"], 0.02, 600.0),
+    ("Каршеринг", 7512, ["Ситидрайв", "Делимобиль"], 0.02, 500.0),
+    ("Рестораны", 5812, ["Кофемания", "Шоколадница"], 0.02, 1800.0),
+    ("Наличные", 6011, ["Снятие в банкомате"], 0.015, 5000.0),
+    ("Дом и ремонт", 5200, ["Леруа Мерлен", "OBI"], 0.015, 2500.0),
+    ("Топливо", 5541, ["Лукойл", "Газпромнефть"], 0.012, 2000.0),
+    ("Одежда и обувь", 5651, ["Uniqlo", "Спортмастер"], 0.01, 3000.0),
+    ("ЖКХ", 4900, ["ЖКУ Квартира", "Мосэнергосбыт"], 0.008, 4500.0),
+    ("Местный транспорт", 4111, ["Метро Санкт-Петербург", "Тройка"], 0.03, 60.0),
+]
+# Поступления: (категория, описания, доля операций, медианная сумма в рублях)
+INCOME_CATEGORIES = [
+    ("Пополнения", ["Пополнение через Сбербанк", "Внесение наличных"], 0.03, 5000.0),
+    ("Бонусы", ["Кешбэк за обычные покупки"], 0.015, 100.0),
+    ("Зарплата", ["Пополнение. ООО Работа. Зарплата"], 0.005, 60000.0),
+]
+CARDS = ["*7197", "*4556", "*5091", "*5441", "*1112", "*6002", "*5507"]
+CARD_WEIGHTS = [0.76, 0.17, 0.03, 0.02, 0.01, 0.005, 0.005]
+FOREIGN_CURRENCIES = ["USD", "EUR", "TRY", "CNY"]
+
+
+def generate_operations(
+    rows: int, seed: int = 42, start: str = "2018-01-01", end: str = "2021-12-31", compact: bool = True
+) -> pd.DataFrame:
+    """Функция генерирует таблицу операций в формате выгрузки банка (те же столбцы, что и у operations.xlsx)
+    :param rows: количество операций
+    :param seed: зерно генератора случайных чисел (при одинаковом seed таблица одинакова)
+    :param start: дата первой операции
+    :param end: дата последней операции
+    :param compact: применить схему типов (как read_excel), иначе текстовые столбцы — object
+    :return: DataFrame с "Дата операции" типа datetime64, отсортированный по убыванию даты, как выгрузка банка
+    """
+    rng = np.random.default_rng(seed)
+    categories = [item[0] for item in SPEND_CATEGORIES] + [item[0] for item in INCOME_CATEGORIES]
+    weights = np.array([item[3] for item in SPEND_CATEGORIES] + [item[2] for item in INCOME_CATEGORIES])
+    medians = np.array([item[4] for item in SPEND_CATEGORIES] + [item[3] for item in INCOME_CATEGORIES])
+    mcc = np.array([item[1] for item in SPEND_CATEGORIES] + [np.nan] * len(INCOME_CATEGORIES), dtype=float)
+    descriptions = [item[2] for item in SPEND_CATEGORIES] + [item[1] for item in INCOME_CATEGORIES]
+    is_income = np.arange(len(categories)) >= len(SPEND_CATEGORIES)
+
+    category_codes = rng.choice(len(categories), size=rows, p=weights / weights.sum())
+    # Суммы — логнормальное распределение вокруг медианы категории, с точностью до копейки
+    amounts = np.round(medians[category_codes] * rng.lognormal(0.0, 0.8, size=rows), 2)
+    amounts = np.where(is_income[category_codes], amounts, -amounts)
+
+    start_ns, end_ns = pd.Timestamp(start).value, pd.Timestamp(end).value
+    operation_dates = pd.DatetimeIndex(
+        np.sort(rng.integers(start_ns, end_ns, size=rows))[::-1].astype("datetime64[ns]")
+    ).floor("s")
+    # Дата платежа — строка "DD.MM.YYYY"; различных дней немного, поэтому форматируются только уникальные дни
+    payment_days = operation_dates.normalize() + pd.to_timedelta(rng.integers(0, 3, size=rows), unit="D")
+    day_codes, unique_days = pd.factorize(payment_days)
+    payment_dates = np.asarray(unique_days.strftime("%d.%m.%Y"), dtype=object)[day_codes]
+
+    statuses = np.where(rng.random(rows) < 0.994, "OK", "FAILED")
+    cards = np.array(CARDS, dtype=object)[rng.choice(len(CARDS), size=rows, p=CARD_WEIGHTS)]
+    cards[rng.random(rows) < 0.1] = np.nan
+
+    currencies = np.full(rows, "RUB", dtype=object)
+    foreign = rng.random(rows) < 0.02
+    currencies[foreign] = np.array(FOREIGN_CURRENCIES, dtype=object)[
+        rng.integers(0, len(FOREIGN_CURRENCIES), foreign.sum())
+    ]
+    operation_amounts = np.where(foreign, np.round(amounts / 75.0, 2), amounts)
+
+    # Описание выбирается из списка описаний категории: все списки склеены в один массив, сдвиг — начало списка
+    flat_descriptions = np.array([value for values in descriptions for value in values], dtype=object)
+    description_counts = np.array([len(values) for values in descriptions])
+    description_offsets = np.concatenate([[0], np.cumsum(description_counts)[:-1]])
+    description_index = description_offsets[category_codes] + rng.integers(0, 1 << 30, size=rows) % (
+        description_counts[category_codes]
+    )
+    description_values = flat_descriptions[description_index]
+    cashback = np.where((amounts < 0) & (rng.random(rows) < 0.1), np.floor(-amounts / 100), np.nan)
+    bonuses = np.where(amounts < 0, np.floor(-amounts / 100), 0).astype(np.int64)
+
+    operations_df = pd.DataFrame(
+        {
+            "Дата операции": operation_dates,
+            "Дата платежа": payment_dates,
+            "Номер карты": cards,
+            "Статус": statuses.astype(object),
+            "Сумма операции": operation_amounts,
+            "Валюта операции": currencies,
+            "Сумма платежа": amounts,
+            "Валюта платежа": "RUB",
+            "Кэшбэк": cashback,
+            "Категория": np.array(categories, dtype=object)[category_codes],
+            "MCC": mcc[category_codes],
+            "Описание": description_values,
+            "Бонусы (включая кэшбэк)": bonuses,
+            "Округление на инвесткопилку": np.zeros(rows, dtype=np.int64),
+            "Сумма операции с округлением": np.abs(amounts),
+        }
+    )
+    return apply_schema(operations_df) if compact else operations_df
@@ -0,0 +1,198 @@
+"""Замеры производительности публичных функций на синтетических данных.
+
+Запуск:
+    python -m benchmarks.run --sizes 10000 100000 1000000
+    python -m benchmarks.run --sizes 10000000 --repeat 1
+    python -m benchmarks.run --compare benchmarks/results/<прошлый запуск>.json
+
+Для каждой функции и размера таблицы сохраняются время (лучшее из repeat запусков), пропускная способность
+(строк в секунду), пиковый RSS процесса и пик выделенной памяти (tracemalloc) в benchmarks/results.
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmarks.generator import generate_operations
+from src.anomalies import find_outliers, find_recurring
+from src.cashback_plan import cashback_plan
+from src.dataset import SpendDataset
+from src.memo import get_memo
+from src.reports import spending_by_category
+from src.serialization import frame_to_json
+from src.services import profitable_cashback
+from src.utils import df_cards_spend, df_top_transactions
+from src.views import get_result_main_page
+
+PATH_RESULTS = Path(__file__).parent / "results"
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BENCH_DATE = datetime(2021, 6, 30, 12, 0)
+# Столбцы отчета по категории для замера сериализации
+JSON_COLUMNS = ["Сумма платежа", "Категория"]
+
+
+def offline_market_snapshot(currencies: list[str], stocks: list[str]) -> tuple[list[dict], list[dict]]:
+    """Заглушка курсов и котировок: замеряется только обработка операций, без сети и хранилища"""
+    return [], []
+
+
+# Замеряемые функции: имя -> функция от (операции, подготовленный набор трат)
+CASES: dict[str, Callable[[pd.DataFrame, SpendDataset], Any]] = {
+    "SpendDataset": lambda df, spend: SpendDataset(df),
+    "get_result_main_page": lambda df, spend: get_result_main_page(BENCH_DATE, df),
+    "profitable_cashback": lambda df, spend: profitable_cashback(df, 2021, 6),
+    "spending_by_category": lambda df, spend: spending_by_category(df, "Супермаркеты", "30.06.2021", to_file=False),
+    "df_cards_spend": lambda df, spend: df_cards_spend(spend.frame),
+    "df_top_transactions": lambda df, spend: df_top_transactions(spend.frame),
+    "find_recurring": lambda df, spend: find_recurring(spend.frame),
+    "find_outliers": lambda df, spend: find_outliers(spend.frame),
+    "cashback_plan": lambda df, spend: cashback_plan(spend, pd.period_range("2018-01", "2021-12", freq="M")),
+    # Сериализация всех трат: прежний путь через список словарей и кодирование из столбцов
+    "json_to_dict_records": lambda df, spend: json.dumps(
+        spend.frame[JSON_COLUMNS].to_dict(orient="records"), ensure_ascii=False, indent=4
+    ),
+    "json_frame_records": lambda df, spend: frame_to_json(spend.frame[JSON_COLUMNS]),
+    "json_frame_columns": lambda df, spend: frame_to_json(spend.frame[JSON_COLUMNS], "columns"),
+}
+
+
+def _reset_peak_rss() -> bool:
+    """Функция сбрасывает пиковый RSS процесса (Linux: /proc/self/clear_refs), возвращает успех"""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """Функция возвращает пиковый RSS процесса в МБ"""
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(function: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Функция замеряет лучшее время из repeat запусков, пиковый RSS и пик выделенной памяти.
+    Перед каждым запуском запомненные результаты (src.memo) сбрасываются, чтобы замерялся сам расчет"""
+    _reset_peak_rss()
+    timings = []
+    for _ in range(repeat):
+        get_memo().clear()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    peak_rss = _peak_rss_mb()
+    # Отдельный запуск под tracemalloc, чтобы трассировка не искажала время
+    get_memo().clear()
+    tracemalloc.start()
+    function()
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_rss_mb": round(peak_rss, 1), "peak_alloc_mb": round(peak_alloc / 2**20, 1)}
+
+
+def run(sizes: list[int], repeat: int = 3, functions: Optional[list[str]] = None, seed: int = 42) -> list[dict]:
+    """Функция выполняет замеры для всех размеров таблиц и функций"""
+    results = []
+    with patch("src.views.get_market_snapshot", offline_market_snapshot):
+        for rows in sizes:
+            operations_df = generate_operations(rows, seed=seed)
+            spend = SpendDataset(operations_df)
+            for name, case in CASES.items():
+                if functions and name not in functions:
+                    continue
+                metrics = measure(lambda: case(operations_df, spend), repeat)
+                metrics["rows_per_second"] = round(rows / metrics["seconds"]) if metrics["seconds"] else 0
+                results.append({"function": name, "rows": rows, **metrics})
+                print(
+                    f"{name:<22} {rows:>10} строк: {metrics['seconds'] * 1000:10.2f} мс, "
+                    f"{metrics['rows_per_second']:>12} строк/с, RSS {metrics['peak_rss_mb']:8.1f} МБ, "
+                    f"выделено {metrics['peak_alloc_mb']:8.1f} МБ"
+                )
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results: list[dict], output: Path = PATH_RESULTS) -> Path:
+    """Функция сохраняет результаты с коммитом и окружением, возвращает путь к файлу"""
+    commit = _git_commit()
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json"
+    data = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=4)
+    return path
+
+
+def compare(results: list[dict], baseline_path: Path, threshold: float = 1.2) -> list[dict]:
+    """Функция сравнивает время с сохраненным запуском, возвращает замедлившиеся более чем в threshold раз"""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {(item["function"], item["rows"]): item for item in json.load(file)["results"]}
+    regressions = []
+    for item in results:
+        base = baseline.get((item["function"], item["rows"]))
+        if base is None or not base["seconds"]:
+            continue
+        ratio = item["seconds"] / base["seconds"]
+        mark = "  <-- замедление" if ratio > threshold else ""
+        print(f"{item['function']:<22} {item['rows']:>10} строк: {ratio:6.2f}x{mark}")
+        if ratio > threshold:
+            regressions.append({**item, "baseline_seconds": base["seconds"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических операциях")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="размеры таблиц (строк)")
+    parser.add_argument("--repeat", type=int, default=3, help="количество запусков каждой функции")
+    parser.add_argument("--functions", nargs="+", choices=list(CASES), help="замерять только эти функции")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=PATH_RESULTS, help="каталог для результатов")
+    parser.add_argument("--compare", type=Path, help="файл результатов прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2, help="допустимое замедление (во сколько раз)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.functions, args.seed)
+    print(f"Результаты сохранены: {save_results(results, args.output)}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
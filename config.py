@@ -3,3 +3,10 @@ PATH_ROOT = Path(__file__).parent
 PATH_TO_LOGGER = PATH_ROOT / "logs"
 PATH_DATA_FILE = PATH_ROOT / "data"
 PATH_DATA_REPORT = PATH_ROOT / "reports"
+PATH_DATA_CACHE = PATH_DATA_FILE / "cache"
+# Уровень логирования по умолчанию (переопределяется переменной окружения LOG_LEVEL)
+LOG_LEVEL = "DEBUG"
+# Количество запомненных результатов отчетов в памяти процесса (см. src.memo)
+MEMO_MAXSIZE = 128
+# Хранить запомненные результаты также на диске, в data/cache/memo (переопределяется переменной окружения MEMO_DISK)
+MEMO_DISK = False
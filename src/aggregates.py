@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import PATH_DATA_CACHE, PATH_DATA_FILE
+from src.cache import cache_dir_for
+from src.logger import get_logger
+from src.schema import amount_column
+from src.utils import read_excel
+
+logger = get_logger("aggregates")
+
+# Версия формата файла агрегатов
+ROLLUP_VERSION = 3
+# Число последних обработанных строк, по хэшу которых проверяется, что файл операций только дополнялся
+TAIL_ROWS = 256
+
+Bucket = dict[str, list[float]]
+
+
+def _row_hashes(transactions: pd.DataFrame) -> np.ndarray:
+    """Функция возвращает хэши всех строк DataFrame (без индекса)"""
+    return np.asarray(pd.util.hash_pandas_object(transactions, index=False), dtype=np.uint64)
+
+
+def _digest(hashes: np.ndarray) -> str:
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+class CashbackRollup:
+    """Помесячные агрегаты успешных трат по категориям: кешбэк, сумма трат и количество операций.
+    Строятся один раз и дополняются только новыми строками, добавленными в конец файла операций.
+    Отметка обработанной части — число строк и хэш последних TAIL_ROWS из них: при обновлении хэшируются
+    только эти строки и добавленные, поэтому изменение строки выше отметки обнаруживается только
+    по изменению файла без добавления строк (см. load_cashback_rollup)."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        # sha256 хэшей последних TAIL_ROWS обработанных строк
+        self.tail = ""
+        # Хэш всей истории, продолжаемый хэшем каждой добавленной порции строк (версия агрегатов)
+        self.digest = ""
+        # (mtime в наносекундах, размер) файла операций, по которому построены агрегаты
+        self.source: Optional[list[int]] = None
+        self.buckets: dict[tuple[int, int], Bucket] = {}
+
+    def reset(self) -> None:
+        """Метод сбрасывает агрегаты, следующий вызов update построит их заново"""
+        self.rows = 0
+        self.tail = ""
+        self.digest = ""
+        self.buckets = {}
+
+    def update(self, transactions: pd.DataFrame) -> int:
+        """Метод добавляет в агрегаты новые строки из конца DataFrame, возвращает число обработанных строк.
+        Если строк стало меньше или изменились последние обработанные строки, агрегаты строятся заново."""
+        if len(transactions) < self.rows:
+            logger.info("Строк операций стало меньше, чем обработано, агрегаты строятся заново")
+            self.reset()
+        start = max(0, self.rows - TAIL_ROWS)
+        hashes = _row_hashes(transactions.iloc[start:])
+        if self.rows and _digest(hashes[: self.rows - start]) != self.tail:
+            logger.info("Обработанные ранее операции изменились, агрегаты строятся заново")
+            self.reset()
+            start = 0
+            hashes = _row_hashes(transactions)
+        tail = transactions.iloc[self.rows :]
+        if tail.empty:
+            return 0
+        tail_spend = tail[(tail["Сумма платежа"] < 0) & (tail["Статус"] == "OK")]
+        dates = pd.to_datetime(tail_spend["Дата операции"])
+        grouped = (
+            tail_spend.assign(year=dates.dt.year, month=dates.dt.month)
+            .groupby(["year", "month", "Категория"], observed=True)
+            .agg(cashback=("Кэшбэк", "sum"), spend=(amount_column(tail), "sum"), count=("Сумма платежа", "size"))
+        )
+        for (year, month, category), cashback, spend, count in zip(
+            grouped.index, grouped["cashback"].tolist(), grouped["spend"].tolist(), grouped["count"].tolist()
+        ):
+            bucket = self.buckets.setdefault((int(year), int(month)), {})
+            totals = bucket.setdefault(category, [0.0, 0.0, 0])
+            totals[0] += cashback
+            totals[1] += spend
+            totals[2] += count
+        self.digest = hashlib.sha256(self.digest.encode() + hashes[self.rows - start :].tobytes()).hexdigest()
+        self.rows = len(transactions)
+        self.tail = _digest(hashes[max(0, self.rows - TAIL_ROWS) - start :])
+        logger.debug("Агрегаты дополнены строками: %s, всего строк: %s", len(tail), self.rows)
+        return len(tail)
+
+    def month(self, year: int, month: int) -> Bucket:
+        """Метод возвращает агрегаты за месяц: {категория: [кешбэк, сумма трат, количество]}"""
+        return self.buckets.get((year, month), {})
+
+    def period(self, start: tuple[int, int], end: tuple[int, int]) -> Bucket:
+        """Метод суммирует помесячные агрегаты за период с месяца start по месяц end включительно
+        :param start: (год, месяц) начала периода
+        :param end: (год, месяц) конца периода
+        """
+        result: Bucket = {}
+        for key in sorted(key for key in self.buckets if start <= key <= end):
+            for category, (cashback, spend, count) in self.buckets[key].items():
+                totals = result.setdefault(category, [0.0, 0.0, 0])
+                totals[0] += cashback
+                totals[1] += spend
+                totals[2] += count
+        return result
+
+    def cashback(self, start: tuple[int, int], end: Optional[tuple[int, int]] = None) -> dict[str, float]:
+        """Метод возвращает кешбэк по категориям (в алфавитном порядке) за месяц start или период start–end"""
+        bucket = self.month(*start) if end is None else self.period(start, end)
+        return {category: bucket[category][0] for category in sorted(bucket)}
+
+    def save(self, path: Path) -> None:
+        """Метод сохраняет агрегаты в JSON (запись через временный файл)"""
+        data = {
+            "version": ROLLUP_VERSION,
+            "rows": self.rows,
+            "tail": self.tail,
+            "digest": self.digest,
+            "source": self.source,
+            "buckets": {f"{year}-{month:02d}": bucket for (year, month), bucket in self.buckets.items()},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.debug("Агрегаты сохранены в %s", path)
+
+    @classmethod
+    def load(cls, path: Path) -> "CashbackRollup":
+        """Метод загружает агрегаты из JSON, при отсутствии файла или другой версии возвращает пустые агрегаты"""
+        rollup = cls()
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return rollup
+        if data.get("version") != ROLLUP_VERSION:
+            return rollup
+        rollup.rows = data["rows"]
+        rollup.tail = data["tail"]
+        rollup.digest = data["digest"]
+        rollup.source = data["source"]
+        for key, bucket in data["buckets"].items():
+            year, month = key.split("-")
+            rollup.buckets[(int(year), int(month))] = bucket
+        logger.debug("Агрегаты загружены из %s", path)
+        return rollup
+
+
+def rollup_path(filename: str) -> Path:
+    """Функция возвращает путь к файлу агрегатов для файла операций
+    (имя строится как имя каталога кэша: одноименные файлы из разных каталогов не делят агрегаты)"""
+    return PATH_DATA_CACHE / f"{cache_dir_for(PATH_DATA_FILE / filename).name}.rollup.json"
+
+
+def load_cashback_rollup(
+    filename: str = "operations.xlsx", transactions: Optional[pd.DataFrame] = None
+) -> CashbackRollup:
+    """Функция загружает сохраненные агрегаты, дополняет их новыми строками файла операций и сохраняет.
+    Если файл операций не менялся с последнего обновления, он не читается.
+    :param filename: файл операций (относительно каталога data)
+    :param transactions: уже прочитанные операции этого файла, по умолчанию файл читается read_excel
+    """
+    stat = (PATH_DATA_FILE / filename).stat()
+    source = [stat.st_mtime_ns, stat.st_size]
+    path = rollup_path(filename)
+    rollup = CashbackRollup.load(path)
+    if rollup.source == source and rollup.rows:
+        logger.debug("Файл операций %s не изменился, агрегаты не обновляются", filename)
+        return rollup
+    if transactions is None:
+        transactions = read_excel(filename)
+    if rollup.source is not None and len(transactions) <= rollup.rows:
+        # Файл изменился, но строки не добавлены: правка уже обработанных строк
+        logger.info("Файл операций %s изменен без добавления строк, агрегаты строятся заново", filename)
+        rollup.reset()
+    rollup.update(transactions)
+    rollup.source = source
+    try:
+        rollup.save(path)
+    except OSError as error:
+        logger.warning("Не удалось сохранить агрегаты в %s: %s", path, error)
+    return rollup
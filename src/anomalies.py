@@ -0,0 +1,330 @@
+"""Поиск регулярных платежей (подписки, коммунальные услуги) и выбросов среди трат.
+
+Все расчеты выполняются группировками и скользящими окнами pandas/NumPy по всей истории сразу:
+операции упорядочиваются по группе (стабильная сортировка сохраняет порядок дат внутри группы),
+медианы и MAD считаются одним вызовом groupby/rolling на группировку, без цикла по группам.
+
+Регулярный платеж — группа операций с одним нормализованным описанием и картой, у которой интервалы
+между последними RECURRING_HISTORY операциями близки к одному из периодов PERIODS (разброс интервалов
+по MAD не больше interval_tolerance от медианного интервала).
+
+Выброс — трата, которая больше медианы трат той же категории (или той же карты в этой категории)
+за предыдущие OUTLIER_MONTHS месяцев более чем на OUTLIER_THRESHOLD робастных отклонений (1.4826 * MAD).
+Суммы трат распределены с тяжелым правым хвостом, поэтому медиана и MAD считаются по логарифмам сумм.
+
+AnomalyMonitor хранит только хвост истории, от которого зависят эти расчеты, и дополняется новыми месяцами.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import Transactions, as_spend_dataset
+from src.logger import get_logger
+from src.schema import amount_column
+
+logger = get_logger("anomalies")
+
+# Периоды регулярных платежей в днях
+PERIODS = {"неделя": 7.0, "месяц": 30.44, "квартал": 91.31, "год": 365.25}
+# Число последних операций группы, по которым определяется регулярность платежа
+RECURRING_HISTORY = 12
+RECURRING_MIN_COUNT = 3
+# Окно выбросов: число предыдущих календарных месяцев, минимальное число трат группы в окне
+OUTLIER_MONTHS = 3
+OUTLIER_MIN_PERIODS = 5
+OUTLIER_THRESHOLD = 3.5
+# Коэффициент MAD для нормального распределения
+MAD_SCALE = 1.4826
+# Нижняя граница отклонения (в логарифмах сумм — около 5%): для трат с одинаковой суммой MAD равен нулю
+MIN_SCALE = 0.05
+
+# Столбцы операций, которые нужны для расчетов
+ANOMALY_COLUMNS = ["Дата операции", "Номер карты", "Описание", "Категория"]
+RECURRING_COLUMNS = [
+    "description",
+    "card",
+    "period",
+    "interval_days",
+    "count",
+    "amount",
+    "amount_mad",
+    "fixed_amount",
+    "last_date",
+    "next_date",
+]
+
+
+def normalize_descriptions(descriptions: pd.Series) -> pd.Categorical:
+    """Функция приводит описания операций к общему виду: нижний регистр, без цифр и знаков препинания
+    ("Яндекс Плюс 12/2021" и "ЯНДЕКС ПЛЮС" — одно описание). Нормализуется каждое уникальное описание,
+    пустые после нормализации описания становятся пропусками"""
+    codes, uniques = pd.factorize(descriptions)
+    normalized = pd.Index(uniques).astype(str).str.lower().str.replace(r"[\d\W_]+", " ", regex=True).str.strip()
+    normalized_codes, categories = pd.factorize(normalized.where(normalized != "", None))
+    mapping = np.append(normalized_codes, -1)
+    return pd.Categorical.from_codes(mapping[codes], categories)
+
+
+def _group_codes(*columns: pd.Series) -> np.ndarray:
+    """Функция возвращает код группы для комбинации значений столбцов, -1 — если значение пропущено.
+    Коды плотные (0 .. число встречающихся комбинаций - 1): после каждого столбца комбинации кодируются заново"""
+    keys = np.zeros(len(columns[0]), dtype=np.int64)
+    for column in columns:
+        codes, uniques = pd.factorize(column)
+        combined = np.where((keys < 0) | (codes < 0), -1, keys * len(uniques) + codes)
+        keys, _ = pd.factorize(combined, use_na_sentinel=False)
+        # factorize кодирует -1 как обычное значение, пропуск возвращается отдельно
+        keys = np.where(combined < 0, -1, keys)
+    return keys
+
+
+def _spend_amounts(frame: pd.DataFrame) -> np.ndarray:
+    """Функция возвращает суммы трат положительными числами (в рублях, если они пересчитаны)"""
+    return np.asarray(-frame[amount_column(frame)].to_numpy(dtype=float, na_value=np.nan), dtype=float)
+
+
+def _recurring_groups(frame: pd.DataFrame) -> tuple[np.ndarray, pd.Categorical]:
+    descriptions = normalize_descriptions(frame["Описание"])
+    return _group_codes(pd.Series(descriptions), frame["Номер карты"]), descriptions
+
+
+def find_recurring(
+    frame: pd.DataFrame,
+    history: int = RECURRING_HISTORY,
+    min_count: int = RECURRING_MIN_COUNT,
+    interval_tolerance: float = 0.2,
+    amount_tolerance: float = 0.1,
+) -> pd.DataFrame:
+    """Функция находит регулярные платежи по описанию и карте
+    :param frame: успешные траты, отсортированные по "Дата операции" (SpendDataset.frame)
+    :param history: число последних операций группы, по которым оценивается регулярность
+    :param min_count: минимальное число операций группы
+    :param interval_tolerance: допустимый разброс интервалов (MAD) и отклонение от периода в долях
+    :param amount_tolerance: разброс сумм (MAD) в долях медианы, при котором сумма считается постоянной
+    :return: DataFrame со столбцами RECURRING_COLUMNS, упорядоченный по описанию и карте
+    """
+    groups, descriptions = _recurring_groups(frame)
+    data = pd.DataFrame(
+        {
+            "group": groups,
+            "date": frame["Дата операции"].to_numpy(dtype="datetime64[ns]"),
+            "amount": _spend_amounts(frame),
+            "description": descriptions,
+            "card": frame["Номер карты"].astype(object).to_numpy(),
+        }
+    )
+    data = data[(data["group"] >= 0) & data["date"].notna() & data["amount"].notna()]
+    data = data.iloc[np.argsort(data["group"].to_numpy(), kind="stable")]
+    data = data[data.groupby("group", sort=False).cumcount(ascending=False) < history]
+
+    group_values = data["group"].to_numpy()
+    group_start = np.r_[True, group_values[1:] != group_values[:-1]]
+    interval = np.diff(data["date"].to_numpy().astype(np.int64), prepend=0) / 86_400e9
+    data["interval"] = np.where(group_start, np.nan, interval)
+
+    grouped = data.groupby("group", sort=False)
+    stats = grouped.agg(
+        description=("description", "first"),
+        card=("card", "first"),
+        count=("amount", "size"),
+        amount=("amount", "median"),
+        interval_days=("interval", "median"),
+        last_date=("date", "max"),
+    )
+    # MAD: медиана отклонений от медианы группы
+    deviations = pd.DataFrame(
+        {
+            "group": data["group"],
+            "amount_mad": (data["amount"] - grouped["amount"].transform("median")).abs(),
+            "interval_mad": (data["interval"] - grouped["interval"].transform("median")).abs(),
+        }
+    )
+    stats = stats.join(deviations.groupby("group", sort=False).median())
+
+    periods = np.array(list(PERIODS.values()))
+    nearest = np.abs(stats["interval_days"].to_numpy()[:, None] - periods).argmin(axis=1)
+    period_days = periods[nearest]
+    regular = (
+        (stats["count"] >= min_count)
+        & (np.abs(stats["interval_days"] - period_days) <= interval_tolerance * period_days)
+        & (stats["interval_mad"] <= interval_tolerance * stats["interval_days"])
+    )
+    stats["period"] = np.array(list(PERIODS))[nearest]
+    stats["fixed_amount"] = stats["amount_mad"] <= amount_tolerance * stats["amount"]
+    stats["next_date"] = stats["last_date"] + pd.to_timedelta(stats["interval_days"], unit="D")
+    result = stats[regular.to_numpy()].sort_values(["description", "card"])
+    logger.info("Найдено регулярных платежей: %s из %s групп операций", len(result), len(stats))
+    return pd.DataFrame(
+        {
+            "description": result["description"].astype(str),
+            "card": result["card"],
+            "period": result["period"],
+            "interval_days": result["interval_days"].round(1),
+            "count": result["count"].astype(int),
+            "amount": result["amount"].round(2),
+            "amount_mad": result["amount_mad"].round(2),
+            "fixed_amount": result["fixed_amount"].astype(bool),
+            "last_date": result["last_date"].dt.strftime("%d.%m.%Y"),
+            "next_date": result["next_date"].dt.strftime("%d.%m.%Y"),
+        }
+    ).reset_index(drop=True)
+
+
+def _month_numbers(dates: pd.Series) -> np.ndarray:
+    """Функция возвращает номер месяца даты (месяцы с 1970 года), пропуск даты — -1"""
+    months = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+    return np.where(dates.isna().to_numpy(), -1, months)
+
+
+def monthly_baseline(
+    values: np.ndarray,
+    groups: np.ndarray,
+    month_numbers: np.ndarray,
+    months: int = OUTLIER_MONTHS,
+    min_periods: int = OUTLIER_MIN_PERIODS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Функция считает для каждого значения медиану и MAD значений той же группы за предыдущие months
+    календарных месяцев (скользящее окно с шагом в месяц, текущий месяц в окно не входит).
+    Каждое значение добавляется в окна следующих months месяцев своей группы, и медианы всех окон
+    считаются одним вызовом groupby.median, без цикла по группам и месяцам.
+    :param values: значения (логарифмы сумм трат)
+    :param groups: коды групп (-1 — значение без группы, для него результат NaN)
+    :param month_numbers: номера месяцев значений (-1 — пропуск даты)
+    :param min_periods: минимальное число значений в окне, иначе результат NaN
+    :return: массивы медиан и MAD окон для каждого значения
+    """
+    median = np.full(len(values), np.nan)
+    mad = np.full(len(values), np.nan)
+    valid = (groups >= 0) & (month_numbers >= 0) & ~np.isnan(values)
+    if not valid.any():
+        return median, mad
+    month = month_numbers[valid] - month_numbers[valid].min()
+    span = int(month.max()) + months + 1
+    # Размер массивов окон — встречающиеся группы × месяцы, а не наибольший код группы
+    dense_groups, uniques = pd.factorize(groups[valid])
+    row_keys = dense_groups.astype(np.int64) * span + month
+    # Окно месяца m группы — значения месяцев m - months .. m - 1, ключ окна — группа и месяц m
+    window_keys = np.concatenate([row_keys + shift for shift in range(1, months + 1)])
+    sample = np.tile(values[valid], months)
+    size = len(uniques) * span
+    window_median = np.full(size, np.nan)
+    window_mad = np.full(size, np.nan)
+    grouped = pd.Series(sample).groupby(window_keys)
+    medians = grouped.median()
+    window_median[medians.index.to_numpy()] = medians.to_numpy()
+    deviations = pd.Series(np.abs(sample - window_median[window_keys])).groupby(window_keys).median()
+    window_mad[deviations.index.to_numpy()] = deviations.to_numpy()
+    counts = np.bincount(window_keys, minlength=size)
+    enough = counts[row_keys] >= min_periods
+    median[valid] = np.where(enough, window_median[row_keys], np.nan)
+    mad[valid] = np.where(enough, window_mad[row_keys], np.nan)
+    return median, mad
+
+
+def outlier_scores(values: np.ndarray, median: np.ndarray, mad: np.ndarray) -> np.ndarray:
+    """Функция возвращает робастное отклонение значений от медианы (в единицах 1.4826 * MAD, не меньше MIN_SCALE)"""
+    return np.asarray((values - median) / np.maximum(MAD_SCALE * mad, MIN_SCALE), dtype=float)
+
+
+def find_outliers(
+    frame: pd.DataFrame,
+    months: int = OUTLIER_MONTHS,
+    threshold: float = OUTLIER_THRESHOLD,
+    min_periods: int = OUTLIER_MIN_PERIODS,
+) -> pd.DataFrame:
+    """Функция находит траты, необычно большие для своей категории или для трат карты в этой категории
+    :param frame: успешные траты, отсортированные по "Дата операции" (SpendDataset.frame)
+    :param months: число предыдущих месяцев, по тратам группы за которые считаются медиана и MAD
+    :param threshold: порог робастного отклонения
+    :param min_periods: минимальное число предыдущих трат группы для оценки
+    :return: DataFrame выбросов (date, card, category, description, amount, category_median, category_score,
+    card_median, card_score) с индексом строк frame; медианы — в рублях, отклонения — по логарифмам сумм
+    """
+    amounts = _spend_amounts(frame)
+    log_amounts = np.log1p(np.clip(amounts, 0, None))
+    month_numbers = _month_numbers(frame["Дата операции"])
+    columns = {}
+    # Трата карты сравнивается с тратами этой карты в той же категории: по всем категориям карты
+    # крупные категории (ЖКХ, путешествия) выделялись бы на фоне мелких покупок
+    for name, keys in (("category", ["Категория"]), ("card", ["Номер карты", "Категория"])):
+        groups = _group_codes(*(frame[key] for key in keys))
+        median, mad = monthly_baseline(log_amounts, groups, month_numbers, months, min_periods)
+        columns[f"{name}_median"] = np.expm1(median)
+        columns[f"{name}_score"] = outlier_scores(log_amounts, median, mad)
+    flagged = (columns["category_score"] > threshold) | (columns["card_score"] > threshold)
+    rows = frame[flagged]
+    result = pd.DataFrame(
+        {
+            "date": rows["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S"),
+            "card": rows["Номер карты"].astype(object),
+            "category": rows["Категория"].astype(object),
+            "description": rows["Описание"].astype(object),
+            "amount": amounts[flagged],
+            **{name: np.round(values[flagged], 2) for name, values in columns.items()},
+        },
+        index=rows.index,
+    )
+    logger.info("Найдено выбросов: %s из %s трат", len(result), len(frame))
+    return result
+
+
+def _tail_mask(groups: np.ndarray, size: int) -> np.ndarray:
+    """Функция отмечает последние size строк каждой группы (строки без группы не отмечаются)"""
+    from_end = pd.Series(groups).groupby(groups).cumcount(ascending=False).to_numpy()
+    return np.asarray((groups >= 0) & (from_end < size), dtype=bool)
+
+
+class AnomalyMonitor:
+    """Поиск регулярных платежей и выбросов с дополнением новыми месяцами.
+    Хранится только хвост истории: последние history операций каждой группы регулярных платежей
+    и траты последних months месяцев (окно медианы и MAD для следующего месяца),
+    поэтому результат для новых трат такой же, как при расчете по всей истории."""
+
+    def __init__(
+        self,
+        history: int = RECURRING_HISTORY,
+        months: int = OUTLIER_MONTHS,
+        threshold: float = OUTLIER_THRESHOLD,
+        min_periods: int = OUTLIER_MIN_PERIODS,
+    ) -> None:
+        self.history = history
+        self.months = months
+        self.threshold = threshold
+        self.min_periods = min_periods
+        self.context: Optional[pd.DataFrame] = None
+        self.rows = 0
+
+    def update(self, transactions: Transactions) -> pd.DataFrame:
+        """Метод добавляет новые операции (например, следующий месяц) и возвращает выбросы среди них.
+        Новые операции должны быть не раньше уже обработанных, иначе результат отличается от полного расчета"""
+        new = as_spend_dataset(transactions).frame
+        new = new[[*ANOMALY_COLUMNS, *dict.fromkeys(["Сумма платежа", amount_column(new)])]]
+        if self.context is not None and len(self.context) and len(new):
+            if new["Дата операции"].min() < self.context["Дата операции"].max():
+                logger.warning("Добавлены операции раньше уже обработанных, выбросы оцениваются приближенно")
+        context = self.context if self.context is not None else new.iloc[:0]
+        combined = pd.concat([context, new], ignore_index=True).sort_values("Дата операции", kind="stable")
+        is_new = combined.index.to_numpy() >= len(context)
+        combined = combined.reset_index(drop=True)
+
+        outliers = find_outliers(combined, self.months, self.threshold, self.min_periods)
+        outliers = outliers[is_new[outliers.index.to_numpy()]]
+
+        keep = _tail_mask(_recurring_groups(combined)[0], self.history)
+        month_numbers = _month_numbers(combined["Дата операции"])
+        if len(combined):
+            keep |= month_numbers > month_numbers.max() - self.months
+        self.context = combined[keep].reset_index(drop=True)
+        self.rows += len(new)
+        logger.debug("Добавлено трат: %s, в хвосте истории: %s", len(new), len(self.context))
+        return outliers.reset_index(drop=True)
+
+    def recurring(
+        self, min_count: int = RECURRING_MIN_COUNT, interval_tolerance: float = 0.2, amount_tolerance: float = 0.1
+    ) -> pd.DataFrame:
+        """Метод возвращает регулярные платежи по хвосту истории (параметры — как у find_recurring)"""
+        if self.context is None:
+            return pd.DataFrame(columns=RECURRING_COLUMNS)
+        return find_recurring(self.context, self.history, min_count, interval_tolerance, amount_tolerance)
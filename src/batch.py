@@ -0,0 +1,169 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from config import PATH_DATA_REPORT
+from src.dataset import SpendDataset
+from src.logger import get_logger
+from src.reports import report_window
+from src.schema import amount_column
+from src.services import cashback_by_category
+from src.utils import df_cards_spend, read_excel
+from src.writers import write_report
+
+logger = get_logger("batch")
+
+
+def find_workbooks(source: Union[str, Path]) -> list[Path]:
+    """Функция возвращает список файлов операций
+    :param source: каталог (берутся все *.xlsx) или шаблон пути, например "exports/*/operations.xlsx"
+    """
+    path = Path(source)
+    if path.is_dir():
+        paths = path.glob("*.xlsx")
+    else:
+        paths = (Path(name) for name in glob.glob(str(source)))
+    # Временные файлы блокировки Excel ("~$имя.xlsx") не являются выгрузками
+    return sorted(path for path in paths if path.is_file() and not path.name.startswith("~$"))
+
+
+def analyze_file(path: Path, year: int, month: int, date: Optional[str] = None) -> dict[str, Any]:
+    """Функция загружает один файл операций и выполняет анализ кешбэка, карт и категорий
+    :param path: путь к файлу операций
+    :param year: год для анализа кешбэка и трат по картам
+    :param month: месяц для анализа кешбэка и трат по картам
+    :param date: конец трехмесячного окна трат по категориям в формате "DD.MM.YYYY", по умолчанию — сейчас
+    :return: dict с результатами; содержит только встроенные типы, поэтому передается между процессами
+    """
+    start = time.perf_counter()
+    transactions = read_excel(str(path.resolve()))
+    spend = SpendDataset(transactions)
+
+    cashback_series = cashback_by_category(spend, year, month)
+
+    month_start = datetime(year, month, 1)
+    month_end = datetime(year + month // 12, month % 12 + 1, 1)
+    cards = df_cards_spend(spend.between(month_start, month_end, include_end=False))
+
+    date_start, date_end = report_window(date)
+    categories = (
+        spend.between(date_start, date_end)
+        .groupby("Категория", observed=True)[amount_column(spend.frame)]
+        .agg(["sum", "count"])
+    )
+    logger.info("Файл %s обработан: %s строк", path, len(transactions))
+    return {
+        "file": str(path),
+        "rows": len(transactions),
+        "seconds": round(time.perf_counter() - start, 3),
+        "cashback": dict(zip(cashback_series.index, cashback_series.values.tolist())),
+        "cards": cards.to_dict(orient="records"),
+        "categories": {
+            category: {"total": float(row["sum"]), "count": int(row["count"])}
+            for category, row in categories.iterrows()
+        },
+    }
+
+
+def _analyze_file_safe(path: Path, year: int, month: int, date: Optional[str]) -> dict[str, Any]:
+    """Функция-обертка для пула процессов: ошибка в одном файле не прерывает обработку остальных"""
+    try:
+        return analyze_file(path, year, month, date)
+    except Exception as error:
+        logger.error("Ошибка при обработке файла %s: %s", path, error)
+        return {"file": str(path), "error": f"{type(error).__name__}: {error}"}
+
+
+def merge_results(results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Функция объединяет результаты по файлам в сводный отчет:
+    кешбэк и траты по категориям суммируются, траты по картам приводятся списком с указанием файла"""
+    cashback: dict[str, float] = {}
+    categories: dict[str, dict[str, float]] = {}
+    cards: list[dict[str, Any]] = []
+    failed = []
+    rows = 0
+    for result in sorted(results, key=lambda item: item["file"]):
+        if "error" in result:
+            failed.append({"file": result["file"], "error": result["error"]})
+            continue
+        rows += result["rows"]
+        for category, value in result["cashback"].items():
+            cashback[category] = cashback.get(category, 0.0) + value
+        for category, values in result["categories"].items():
+            totals = categories.setdefault(category, {"total": 0.0, "count": 0})
+            totals["total"] += values["total"]
+            totals["count"] += values["count"]
+        cards.extend({"file": result["file"], **card} for card in result["cards"])
+    return {
+        "files": len(results) - len(failed),
+        "rows": rows,
+        "cashback": {category: round(cashback[category], 2) for category in sorted(cashback)},
+        "cards": cards,
+        "categories": {
+            category: {"total": round(categories[category]["total"], 2), "count": categories[category]["count"]}
+            for category in sorted(categories)
+        },
+        "failed": failed,
+    }
+
+
+def run_batch(
+    source: Union[str, Path],
+    year: int,
+    month: int,
+    date: Optional[str] = None,
+    workers: Optional[int] = None,
+    filename: Optional[str] = "batch_report.json",
+    progress: bool = True,
+) -> dict[str, Any]:
+    """Функция обрабатывает все файлы операций в пуле процессов и формирует сводный отчет
+    :param source: каталог или шаблон пути к файлам операций
+    :param year: год для анализа кешбэка и трат по картам
+    :param month: месяц для анализа кешбэка и трат по картам
+    :param date: конец трехмесячного окна трат по категориям в формате "DD.MM.YYYY"
+    :param workers: число процессов, по умолчанию — число ядер
+    :param filename: файл сводного отчета в каталоге reports, None — не записывать
+    :param progress: выводить ход обработки на консоль
+    """
+    paths = find_workbooks(source)
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    logger.info("Пакетная обработка %s файлов в %s процессах", len(paths), workers)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_analyze_file_safe, path, year, month, date) for path in paths]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            if progress:
+                status = f"ошибка: {result['error']}" if "error" in result else f"{result['rows']} строк"
+                print(f"[{done}/{len(paths)}] {result['file']}: {status}")
+
+    combined = merge_results(results)
+    logger.info("Пакетная обработка завершена: %s файлов, ошибок: %s", combined["files"], len(combined["failed"]))
+    if filename:
+        write_report(json.dumps(combined, ensure_ascii=False, indent=4), PATH_DATA_REPORT / filename)
+    return combined
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Запуск: python -m src.batch exports/ --year 2021 --month 12"""
+    parser = argparse.ArgumentParser(description="Пакетный анализ каталога файлов операций")
+    parser.add_argument("source", help="каталог с файлами *.xlsx или шаблон пути")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, required=True)
+    parser.add_argument("--date", help="конец окна трат по категориям, DD.MM.YYYY")
+    parser.add_argument("--workers", type=int, help="число процессов (по умолчанию — число ядер)")
+    parser.add_argument("--output", default="batch_report.json", help="файл сводного отчета в каталоге reports")
+    args = parser.parse_args(argv)
+    combined = run_batch(args.source, args.year, args.month, args.date, args.workers, args.output)
+    print(f"Обработано файлов: {combined['files']}, строк: {combined['rows']}, ошибок: {len(combined['failed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+from config import PATH_DATA_REPORT
+from src.dataset import SpendDataset, Transactions, as_spend_dataset
+from src.logger import get_logger
+from src.schema import amount_column
+from src.services import cashback_by_category
+from src.utils import read_excel
+from src.writers import write_report
+
+logger = get_logger("bulk_reports")
+
+# Версия формата отчетов и манифеста: при изменении расчета все месяцы пересчитываются
+BULK_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+# Длины окон трат по категориям в месяцах (окно заканчивается в конце месяца отчета)
+WINDOWS = (1, 3, 6, 12)
+
+
+def month_bounds(dates: pd.DatetimeIndex) -> dict[str, tuple[int, int]]:
+    """Функция возвращает границы строк каждого месяца {"YYYY-MM": (начало, конец)} по отсортированным датам"""
+    months = dates.to_period("M")
+    bounds = {}
+    for period in months.dropna().unique():
+        start = period.start_time
+        end = (period + 1).start_time
+        bounds[str(period)] = (int(dates.searchsorted(start, side="left")), int(dates.searchsorted(end, side="left")))
+    return bounds
+
+
+def month_hash(frame: pd.DataFrame) -> str:
+    """Функция возвращает хэш строк месяца по столбцам, от которых зависят отчеты"""
+    columns = ["Дата операции", amount_column(frame), "Кэшбэк", "Категория"]
+    hashes = pd.util.hash_pandas_object(frame[columns].astype({"Категория": object}), index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def compute_month(month: str, frame: pd.DataFrame, windows: tuple[int, ...] = WINDOWS) -> dict[str, Any]:
+    """Функция рассчитывает отчет за месяц: кешбэк по категориям (как profitable_cashback) и траты
+    по категориям за окна из windows месяцев, заканчивающиеся в конце месяца (сумма и количество)
+    :param month: месяц отчета "YYYY-MM"
+    :param frame: траты (SpendDataset.frame) за max(windows) месяцев, заканчивающиеся в конце месяца
+    :return: dict только из встроенных типов, поэтому передается между процессами
+    """
+    period = pd.Period(month, freq="M")
+    spend = SpendDataset(frame)
+    cashback = cashback_by_category(spend, period.year, period.month)
+    window_end = (period + 1).start_time
+    amount = amount_column(frame)
+    categories: dict[str, dict[str, dict[str, float]]] = {}
+    for months in windows:
+        window = spend.between(window_end - pd.DateOffset(months=months), window_end, include_end=False)
+        totals = window.groupby("Категория", observed=True)[amount].agg(["sum", "count"])
+        for category, total, count in zip(totals.index, totals["sum"].tolist(), totals["count"].tolist()):
+            categories.setdefault(str(category), {})[str(months)] = {"total": round(total, 2), "count": int(count)}
+    return {
+        "month": month,
+        "cashback": dict(zip(cashback.index, cashback.values.tolist())),
+        "categories": {category: categories[category] for category in sorted(categories)},
+    }
+
+
+def _compute_month_safe(month: str, frame: pd.DataFrame, windows: tuple[int, ...]) -> dict[str, Any]:
+    """Функция-обертка для пула процессов: ошибка в одном месяце не прерывает расчет остальных"""
+    try:
+        return compute_month(month, frame, windows)
+    except Exception as error:
+        logger.error("Ошибка при расчете отчета за %s: %s", month, error)
+        return {"month": month, "error": f"{type(error).__name__}: {error}"}
+
+
+def _read_manifest(path: Path) -> dict[str, Any]:
+    """Функция читает манифест; при отсутствии, повреждении или другой версии возвращает пустой"""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {"version": BULK_VERSION, "partitions": {}}
+    if (
+        not isinstance(manifest, dict)
+        or manifest.get("version") != BULK_VERSION
+        or not isinstance(manifest.get("partitions"), dict)
+    ):
+        return {"version": BULK_VERSION, "partitions": {}}
+    return dict(manifest)
+
+
+def _write_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    """Функция записывает манифест через временный файл: прерванный запуск не оставляет поврежденный манифест"""
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+
+def generate_monthly_reports(
+    transactions: Transactions,
+    output_dir: Optional[Path] = None,
+    windows: tuple[int, ...] = WINDOWS,
+    workers: Optional[int] = None,
+    progress: bool = False,
+) -> dict[str, list[str]]:
+    """Функция рассчитывает отчеты за все месяцы истории в пуле процессов, по файлу на месяц (YYYY-MM.json).
+    Траты делятся на месяцы один раз; в манифесте хранится хэш строк, от которых зависит отчет месяца
+    (сам месяц и предыдущие месяцы окон), поэтому повторный или прерванный запуск пересчитывает
+    только месяцы, исходные строки которых изменились.
+    :param transactions: DataFrame с операциями или подготовленный набор трат SpendDataset
+    :param output_dir: каталог отчетов, по умолчанию reports/monthly
+    :param windows: длины окон трат по категориям в месяцах
+    :param workers: число процессов, по умолчанию — число ядер
+    :param progress: выводить ход расчета на консоль
+    :return: месяцы computed (пересчитаны), skipped (не изменились), failed (ошибка)
+    и removed (нет в исходных данных, их отчеты удалены)
+    """
+    output_dir = output_dir or PATH_DATA_REPORT / "monthly"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    frame = as_spend_dataset(transactions).frame
+    dates = pd.DatetimeIndex(frame["Дата операции"])
+    bounds = month_bounds(dates)
+    hashes = {month: month_hash(frame.iloc[start:end]) for month, (start, end) in bounds.items()}
+    manifest_path = output_dir / MANIFEST_FILENAME
+    manifest = _read_manifest(manifest_path)
+    # Месяцы, которых больше нет в исходных данных: их отчеты удаляются вместе с записями манифеста
+    removed = sorted(month for month in manifest["partitions"] if month not in bounds)
+    for month in removed:
+        (output_dir / manifest["partitions"].pop(month)["file"]).unlink(missing_ok=True)
+    if removed:
+        _write_manifest(manifest_path, manifest)
+        logger.info("Удалены отчеты месяцев, которых нет в исходных данных: %s", ", ".join(removed))
+    params = {"windows": list(windows), "amount": amount_column(frame)}
+    if manifest.get("params") != params:
+        manifest = {"version": BULK_VERSION, "params": params, "partitions": {}}
+
+    tasks = {}
+    skipped = []
+    for month in bounds:
+        period = pd.Period(month, freq="M")
+        sources = [str(period - offset) for offset in range(max(windows))]
+        signature = hashlib.sha256(json.dumps([hashes.get(source) for source in sources]).encode()).hexdigest()
+        entry = manifest["partitions"].get(month)
+        if entry and entry["hash"] == signature and (output_dir / entry["file"]).exists():
+            skipped.append(month)
+            continue
+        window_start = (period - (max(windows) - 1)).start_time
+        start = int(dates.searchsorted(window_start, side="left"))
+        tasks[month] = (signature, frame.iloc[start : bounds[month][1]])
+    logger.info("Отчеты по месяцам: пересчет %s, без изменений %s", len(tasks), len(skipped))
+
+    computed, failed = [], []
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_compute_month_safe, month, rows, windows) for month, (_, rows) in tasks.items()]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            month = result["month"]
+            if "error" in result:
+                failed.append(month)
+            else:
+                filename = f"{month}.json"
+                write_report(json.dumps(result, ensure_ascii=False, indent=4), output_dir / filename)
+                # Манифест обновляется после каждого месяца: прерванный запуск не теряет готовые отчеты
+                manifest["partitions"][month] = {"hash": tasks[month][0], "file": filename}
+                _write_manifest(manifest_path, manifest)
+                computed.append(month)
+            if progress:
+                status = f"ошибка: {result['error']}" if "error" in result else "готово"
+                print(f"[{done}/{len(tasks)}] {month}: {status}")
+    return {"computed": sorted(computed), "skipped": skipped, "failed": sorted(failed), "removed": removed}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Запуск: python -m src.bulk_reports --file operations.xlsx"""
+    parser = argparse.ArgumentParser(description="Отчеты по всем месяцам истории операций")
+    parser.add_argument("--file", default="operations.xlsx", help="файл операций в каталоге data")
+    parser.add_argument("--output", type=Path, help="каталог отчетов (по умолчанию reports/monthly)")
+    parser.add_argument("--windows", type=int, nargs="+", default=list(WINDOWS), help="длины окон в месяцах")
+    parser.add_argument("--workers", type=int, help="число процессов (по умолчанию — число ядер)")
+    args = parser.parse_args(argv)
+    result = generate_monthly_reports(
+        read_excel(args.file), args.output, tuple(args.windows), args.workers, progress=True
+    )
+    print(
+        f"Пересчитано месяцев: {len(result['computed'])}, без изменений: {len(result['skipped'])}, "
+        f"ошибок: {len(result['failed'])}, удалено: {len(result['removed'])}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import PATH_DATA_CACHE, PATH_DATA_FILE
+from src.logger import get_logger
+
+logger = get_logger("cache")
+
+# Версия формата кэша: при изменении способа загрузки данных старый кэш становится недействительным
+CACHE_VERSION = 4
+META_FILENAME = "meta.json"
+
+
+def file_sha256(path: Path) -> str:
+    """Функция возвращает sha256 содержимого файла (читается блоками по 1 МБ)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_dir_for(source: Path) -> Path:
+    """Функция возвращает каталог кэша для исходного файла.
+    Для файлов вне каталога data к имени добавляется хэш каталога: выгрузки разных клиентов
+    с одинаковым именем файла не должны делить один кэш."""
+    parent = source.resolve().parent
+    if parent == PATH_DATA_FILE.resolve():
+        return PATH_DATA_CACHE / source.name
+    return PATH_DATA_CACHE / f"{source.name}.{hashlib.sha1(str(parent).encode()).hexdigest()[:10]}"
+
+
+def _save_column(directory: Path, stem: str, series: pd.Series) -> dict[str, Any]:
+    """Функция сохраняет столбец в виде .npy файлов и возвращает его описание для meta.json"""
+    spec: dict[str, Any] = {"file": stem}
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        spec["kind"] = "category"
+        spec["ordered"] = bool(dtype.ordered)
+        np.save(directory / f"{stem}.codes.npy", series.cat.codes.to_numpy())
+        spec["categories"] = _save_column(directory, f"{stem}.categories", pd.Series(dtype.categories))
+    elif dtype.kind == "M" and getattr(dtype, "tz", None) is None:
+        spec["kind"] = "datetime"
+        np.save(directory / f"{stem}.npy", series.to_numpy(dtype="datetime64[ns]"))
+    elif dtype.kind in "biuf":
+        spec["kind"] = "numeric"
+        np.save(directory / f"{stem}.npy", series.to_numpy())
+    else:
+        values = series.to_numpy(dtype=object)
+        mask = pd.isna(values)
+        if all(isinstance(value, str) for value in values[~mask]):
+            # Строки храним фиксированной ширины (dtype "U"), такой массив можно отобразить в память
+            spec["kind"] = "string"
+            np.save(directory / f"{stem}.npy", np.where(mask, "", values).astype(str))
+            np.save(directory / f"{stem}.mask.npy", mask)
+        else:
+            # Значения разных типов: коды в .npy, сами значения — в meta.json (без pickle);
+            # значение, которое нельзя записать в JSON, отменяет запись кэша (TypeError)
+            spec["kind"] = "object"
+            codes, uniques = pd.factorize(values)
+            np.save(directory / f"{stem}.codes.npy", codes)
+            spec["values"] = [value.item() if isinstance(value, np.generic) else value for value in uniques]
+    return spec
+
+
+def _load_column(directory: Path, spec: dict[str, Any]) -> pd.Series:
+    """Функция загружает столбец, сохраненный _save_column"""
+    stem = spec["file"]
+    kind = spec["kind"]
+    if kind == "category":
+        codes = np.asarray(np.load(directory / f"{stem}.codes.npy", mmap_mode="c"))
+        categories = _load_column(directory, spec["categories"])
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categories, ordered=spec["ordered"]))
+    if kind in ("numeric", "datetime"):
+        # mmap_mode="c": данные читаются с диска по мере обращения, запись в массив не меняет файл кэша
+        return pd.Series(np.asarray(np.load(directory / f"{stem}.npy", mmap_mode="c")), copy=False)
+    if kind == "string":
+        values = np.load(directory / f"{stem}.npy", mmap_mode="r").astype(object)
+        values[np.load(directory / f"{stem}.mask.npy", allow_pickle=False)] = np.nan
+        return pd.Series(values, dtype=object)
+    codes = np.load(directory / f"{stem}.codes.npy", allow_pickle=False)
+    values = np.array(spec["values"] + [np.nan], dtype=object)
+    return pd.Series(values[codes], dtype=object)
+
+
+def _read_meta(directory: Path) -> Optional[dict[str, Any]]:
+    """Функция читает meta.json кэша, возвращает None, если кэша нет или он другой версии"""
+    try:
+        with open(directory / META_FILENAME, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or meta.get("version") != CACHE_VERSION:
+        return None
+    return dict(meta)
+
+
+def _is_fresh(source: Path, directory: Path, meta: dict[str, Any]) -> bool:
+    """Функция проверяет, что кэш соответствует исходному файлу.
+    Совпадение mtime и размера считается достаточным; при изменившемся mtime сверяется sha256,
+    и если содержимое не изменилось, в meta.json записывается новый mtime."""
+    stat = source.stat()
+    key = meta["source"]
+    if key["mtime_ns"] == stat.st_mtime_ns and key["size"] == stat.st_size:
+        return True
+    if key["size"] != stat.st_size or key["sha256"] != file_sha256(source):
+        return False
+    key["mtime_ns"] = stat.st_mtime_ns
+    try:
+        with open(directory / META_FILENAME, "w", encoding="utf-8") as file:
+            json.dump(meta, file, ensure_ascii=False)
+    except OSError as error:
+        logger.warning("Не удалось обновить meta.json кэша %s: %s", directory, error)
+    return True
+
+
+def read_cached_frame(source: Path, use_parsed: bool = True) -> Optional[pd.DataFrame]:
+    """Функция возвращает DataFrame из колоночного кэша или None, если кэша нет или он устарел
+    :param source: путь к исходному файлу (xlsx)
+    :param use_parsed: подставить вместо исходных столбцов уже разобранные (например, "Дата операции")
+    """
+    directory = cache_dir_for(source)
+    meta = _read_meta(directory)
+    if meta is None:
+        return None
+    try:
+        if not _is_fresh(source, directory, meta):
+            logger.info("Кэш для %s устарел", source.name)
+            return None
+        parsed = {spec["name"]: spec for spec in meta["parsed"]} if use_parsed else {}
+        columns = {}
+        for spec in meta["columns"]:
+            name = spec["name"]
+            columns[name] = _load_column(directory, parsed.get(name, spec))
+    except (OSError, ValueError, KeyError) as error:
+        logger.warning("Не удалось прочитать кэш для %s: %s", source.name, error)
+        return None
+    logger.debug("Данные %s загружены из кэша %s", source.name, directory)
+    frame = pd.DataFrame(columns, copy=False)
+    frame.attrs.update(meta.get("attrs", {}))
+    return frame
+
+
+def write_cached_frame(source: Path, frame: pd.DataFrame, parsed_columns: dict[str, pd.Series]) -> None:
+    """Функция сохраняет DataFrame в колоночный кэш (по файлу .npy на столбец)
+    :param source: путь к исходному файлу (xlsx), по нему вычисляется ключ кэша
+    :param frame: DataFrame с исходными данными; frame.attrs (например, invalid_dates) сохраняются в meta.json
+    :param parsed_columns: уже разобранные столбцы, которые подставляются при чтении вместо исходных
+    """
+    directory = cache_dir_for(source)
+    tmp_directory = directory.with_name(f"{directory.name}.tmp{os.getpid()}")
+    try:
+        stat = source.stat()
+        meta = {
+            "version": CACHE_VERSION,
+            "source": {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_sha256(source)},
+            "rows": len(frame),
+            "attrs": frame.attrs,
+        }
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        tmp_directory.mkdir(parents=True)
+        # Имена файлов столбцов — порядковые номера, чтобы не зависеть от кириллицы в названиях
+        meta["columns"] = [
+            dict(_save_column(tmp_directory, str(index), frame[name]), name=name)
+            for index, name in enumerate(frame.columns)
+        ]
+        meta["parsed"] = [
+            dict(_save_column(tmp_directory, f"parsed{index}", series), name=name)
+            for index, (name, series) in enumerate(parsed_columns.items())
+        ]
+        with open(tmp_directory / META_FILENAME, "w", encoding="utf-8") as file:
+            json.dump(meta, file, ensure_ascii=False)
+        shutil.rmtree(directory, ignore_errors=True)
+        tmp_directory.rename(directory)
+    except (OSError, TypeError, ValueError) as error:
+        # Кэш — только ускорение: значения, которые нельзя записать в JSON (frame.attrs, столбцы object),
+        # как и ошибки диска, не прерывают чтение файла
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        logger.warning("Не удалось записать кэш для %s: %s", source.name, error)
+        return
+    logger.debug("Кэш для %s записан в %s", source.name, directory)
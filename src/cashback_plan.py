@@ -0,0 +1,173 @@
+"""Выбор категорий повышенного кешбэка по истории трат.
+
+Траты успешных операций сводятся в тензор счет × месяц × категория (SpendTensor) одним проходом
+(np.bincount по плоскому индексу ячейки). Ожидаемые траты категории в месяце — среднемесячные траты
+за lookback предыдущих месяцев, разность накопленных сумм по оси месяцев. Выгода от повышенной ставки
+и лучшие k категорий (np.argpartition) считаются сразу для всех счетов и месяцев, без цикла по счетам.
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import Transactions, as_spend_dataset
+from src.logger import get_logger
+from src.schema import amount_column
+
+logger = get_logger("cashback_plan")
+
+# Ставки кешбэка: повышенная в выбранных категориях и обычная
+BOOST_RATE = 0.05
+BASE_RATE = 0.01
+# Число выбираемых категорий и длина истории в месяцах
+PICKS = 3
+LOOKBACK = 6
+# Столбец счета: по умолчанию рекомендации строятся для каждой карты
+ACCOUNT_COLUMN = "Номер карты"
+
+
+class SpendTensor:
+    """Траты по счетам, месяцам и категориям: values[счет, месяц, категория] — сумма трат (положительная).
+    Месяцы идут подряд с первого до последнего месяца операций, в том числе месяцы без трат."""
+
+    def __init__(self, frame: pd.DataFrame, account_column: str = ACCOUNT_COLUMN) -> None:
+        """
+        :param frame: успешные траты (SpendDataset.frame)
+        :param account_column: столбец счета (карта, клиент)
+        """
+        months = pd.PeriodIndex(frame["Дата операции"], freq="M")
+        account_codes, accounts = pd.factorize(frame[account_column], sort=True)
+        category_codes, categories = pd.factorize(frame["Категория"], sort=True)
+        valid = (account_codes >= 0) & (category_codes >= 0) & ~months.isna()
+        self.accounts = pd.Index(accounts)
+        self.categories = pd.Index(categories)
+        if valid.any():
+            self.months = pd.period_range(months[valid].min(), months[valid].max(), freq="M")
+        else:
+            self.months = pd.PeriodIndex([], freq="M")
+        shape = (len(self.accounts), len(self.months), len(self.categories))
+        amounts = -frame[amount_column(frame)].to_numpy(dtype=float, na_value=0.0)
+        month_codes = self.months.get_indexer(months)
+        cells = np.ravel_multi_index((account_codes[valid], month_codes[valid], category_codes[valid]), shape)
+        self.values = np.bincount(cells, weights=amounts[valid], minlength=int(np.prod(shape))).reshape(shape)
+        logger.debug("Построен тензор трат: %s счетов, %s месяцев, %s категорий", *shape)
+
+    def month_positions(self, periods: Union[pd.PeriodIndex, list[pd.Period]]) -> np.ndarray:
+        """Метод возвращает номера месяцев на оси тензора (могут выходить за ее пределы)"""
+        periods = pd.PeriodIndex(periods, freq="M")
+        if not len(self.months):
+            return np.zeros(len(periods), dtype=np.int64)
+        positions: np.ndarray = periods.asi8 - self.months.asi8[0]
+        return positions
+
+    def trailing_mean(self, positions: np.ndarray, lookback: int = LOOKBACK) -> np.ndarray:
+        """Метод возвращает среднемесячные траты за lookback месяцев до каждого из месяцев positions
+        (сам месяц не входит) — массив счет × месяц × категория. Месяцы до начала истории не учитываются.
+        """
+        cumulative = np.zeros((len(self.accounts), len(self.months) + 1, len(self.categories)))
+        np.cumsum(self.values, axis=1, out=cumulative[:, 1:])
+        end = np.clip(positions, 0, len(self.months))
+        start = np.clip(positions - lookback, 0, len(self.months))
+        months = np.maximum(end - start, 1)
+        mean: np.ndarray = (cumulative[:, end] - cumulative[:, start]) / months[None, :, None]
+        return mean
+
+
+def boost_gain(
+    spend: np.ndarray, boost_rates: np.ndarray, base_rate: float = BASE_RATE, cap: Optional[float] = None
+) -> np.ndarray:
+    """Функция возвращает дополнительный кешбэк от повышенной ставки при тратах spend
+    :param boost_rates: повышенные ставки по категориям (последняя ось spend)
+    :param cap: ограничение повышенного кешбэка по категории за месяц
+    """
+    boosted = spend * boost_rates
+    if cap is not None:
+        boosted = np.minimum(boosted, cap)
+    gain: np.ndarray = np.maximum(boosted - spend * base_rate, 0.0)
+    return gain
+
+
+def recommend_categories(
+    tensor: SpendTensor,
+    periods: Union[pd.PeriodIndex, list[pd.Period]],
+    k: int = PICKS,
+    lookback: int = LOOKBACK,
+    boost_rates: Union[float, dict[str, float]] = BOOST_RATE,
+    base_rate: float = BASE_RATE,
+    cap: Optional[float] = None,
+) -> pd.DataFrame:
+    """Функция выбирает k категорий повышенного кешбэка для всех счетов и месяцев periods сразу
+    :param periods: месяцы, для которых выбираются категории (в том числе следующий за историей)
+    :param lookback: число предыдущих месяцев, по которым оцениваются ожидаемые траты
+    :param boost_rates: повышенная ставка для всех категорий или ставки доступных для выбора категорий
+    (категории, которых нет в словаре, не выбираются)
+    :param cap: ограничение повышенного кешбэка по категории за месяц
+    :return: DataFrame (account, month, rank, category, expected_spend, expected_gain, actual_gain):
+    actual_gain — выгода выбора при фактических тратах месяца (для месяцев внутри истории, иначе NaN);
+    категории без ожидаемой выгоды не выводятся
+    """
+    periods = pd.PeriodIndex(periods, freq="M")
+    if isinstance(boost_rates, dict):
+        rates = np.array([boost_rates.get(category, 0.0) for category in tensor.categories])
+    else:
+        rates = np.full(len(tensor.categories), boost_rates)
+    k = min(k, len(tensor.categories))
+    if k == 0 or not len(tensor.accounts) or not len(tensor.months):
+        return pd.DataFrame(
+            columns=["account", "month", "rank", "category", "expected_spend", "expected_gain", "actual_gain"]
+        )
+
+    positions = tensor.month_positions(periods)
+    expected = tensor.trailing_mean(positions, lookback)
+    gain = boost_gain(expected, rates, base_rate, cap)
+    # k лучших категорий без полной сортировки, затем упорядочивание только выбранных k
+    picks = np.argpartition(-gain, k - 1, axis=-1)[..., :k]
+    picked_gain = np.take_along_axis(gain, picks, axis=-1)
+    order = np.argsort(-picked_gain, axis=-1, kind="stable")
+    picks = np.take_along_axis(picks, order, axis=-1)
+    picked_gain = np.take_along_axis(picked_gain, order, axis=-1)
+    picked_spend = np.take_along_axis(expected, picks, axis=-1)
+
+    # Проверка выбора на фактических тратах месяца
+    inside = (positions >= 0) & (positions < len(tensor.months))
+    actual = tensor.values[:, np.clip(positions, 0, len(tensor.months) - 1)]
+    actual_gain = np.take_along_axis(boost_gain(actual, rates, base_rate, cap), picks, axis=-1)
+    actual_gain[:, ~inside] = np.nan
+
+    shape = picks.shape
+    accounts, months, ranks = np.indices(shape).reshape(3, -1)
+    result = pd.DataFrame(
+        {
+            "account": tensor.accounts[accounts],
+            "month": np.asarray(periods.strftime("%m.%Y"))[months],
+            "rank": ranks + 1,
+            "category": tensor.categories[picks.ravel()],
+            "expected_spend": picked_spend.ravel().round(2),
+            "expected_gain": picked_gain.ravel().round(2),
+            "actual_gain": actual_gain.ravel().round(2),
+        }
+    )
+    result = result[picked_gain.ravel() > 0].reset_index(drop=True)
+    logger.info(
+        "Выбраны категории кешбэка: %s счетов, %s месяцев, %s категорий", shape[0], shape[1], len(tensor.categories)
+    )
+    return result
+
+
+def cashback_plan(
+    transactions: Transactions,
+    periods: Union[pd.PeriodIndex, list[pd.Period]],
+    k: int = PICKS,
+    lookback: int = LOOKBACK,
+    boost_rates: Union[float, dict[str, float]] = BOOST_RATE,
+    base_rate: float = BASE_RATE,
+    cap: Optional[float] = None,
+    account_column: str = ACCOUNT_COLUMN,
+) -> pd.DataFrame:
+    """Функция строит тензор трат и выбирает категории кешбэка (параметры — как у recommend_categories)
+    :param transactions: DataFrame с операциями, подготовленный набор трат SpendDataset или хранилище операций
+    :param account_column: столбец счета, например столбец клиента в объединенной выгрузке нескольких клиентов
+    """
+    tensor = SpendTensor(as_spend_dataset(transactions).frame, account_column)
+    return recommend_categories(tensor, periods, k, lookback, boost_rates, base_rate, cap)
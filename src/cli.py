@@ -0,0 +1,302 @@
+"""Командная строка приложения.
+
+Тяжелые зависимости (pandas, requests) импортируются только внутри команд, которым они нужны,
+поэтому запуск с --help и разбор аргументов не загружают их.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+# Формат даты и времени для страницы 'Главная'
+MAIN_PAGE_DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+# Формат даты отчетов и периодов
+DATE_FORMAT = "%d.%m.%Y"
+
+
+class CommandError(Exception):
+    """Ошибка в параметрах команды: выводится пользователю без трассировки, код выхода 2"""
+
+
+def _parse_date(value: str, date_format: str) -> datetime:
+    """Функция разбирает дату из параметра команды"""
+    try:
+        return datetime.strptime(value, date_format)
+    except ValueError:
+        raise CommandError(f"дата {value!r} не соответствует формату {date_format}") from None
+
+
+def _check_month(month: int) -> int:
+    """Функция проверяет номер месяца из параметра --month"""
+    if not 1 <= month <= 12:
+        raise CommandError(f"месяц {month} вне диапазона 1–12")
+    return month
+
+
+def _load_transactions(args: argparse.Namespace) -> Any:
+    """Функция читает файл операций args.file и возвращает подготовленный набор трат.
+    С --db новые операции файла догружаются в хранилище SQLite, и запросы выполняются к нему;
+    с --rub суммы пересчитываются в рубли по курсу на дату операции (курсы — из хранилища или файла --rates)"""
+    if args.db:
+        if args.rub:
+            raise CommandError("пересчет в рубли (--rub) не поддерживается для хранилища операций (--db)")
+        from src.db_store import get_transaction_store
+
+        store = get_transaction_store()
+        store.import_file(args.file)
+        return store
+
+    from src.dataset import SpendDataset
+    from src.utils import read_excel
+
+    transactions = read_excel(args.file)
+    if args.rub:
+        from src.currency import add_rub_amounts, load_rates
+
+        rates = load_rates(args.rates) if args.rates else None
+        transactions = add_rub_amounts(transactions, rates)
+    return SpendDataset(transactions)
+
+
+def command_main(args: argparse.Namespace) -> int:
+    """Команда: JSON страницы 'Главная'"""
+    from src.views import get_result_main_page
+
+    date = _parse_date(args.date, MAIN_PAGE_DATE_FORMAT) if args.date else datetime.now()
+    print(get_result_main_page(date, _load_transactions(args), timings=args.timings))
+    return 0
+
+
+def command_cashback(args: argparse.Namespace) -> int:
+    """Команда: выгодные категории повышенного кешбэка за месяц"""
+    from src.services import profitable_cashback
+
+    print(profitable_cashback(_load_transactions(args), args.year, _check_month(args.month)))
+    return 0
+
+
+def command_cashback_plan(args: argparse.Namespace) -> int:
+    """Команда: выбор категорий повышенного кешбэка на месяц по истории трат каждой карты"""
+    from src.services import recommended_cashback
+
+    _check_month(args.month)
+    print(
+        recommended_cashback(
+            _load_transactions(args), args.year, args.month, args.k, args.lookback, args.boost, args.base, args.cap
+        )
+    )
+    return 0
+
+
+def command_recurring(args: argparse.Namespace) -> int:
+    """Команда: регулярные платежи (подписки, коммунальные услуги)"""
+    from src.services import recurring_payments
+
+    print(recurring_payments(_load_transactions(args), args.history))
+    return 0
+
+
+def command_outliers(args: argparse.Namespace) -> int:
+    """Команда: необычно большие траты по категориям и картам"""
+    from src.services import transaction_outliers
+
+    print(transaction_outliers(_load_transactions(args), args.months, args.threshold))
+    return 0
+
+
+def command_report(args: argparse.Namespace) -> int:
+    """Команда: траты по категории за несколько месяцев до даты"""
+    from src.reports import spending_by_category
+
+    if args.date:
+        _parse_date(args.date, DATE_FORMAT)
+    print(
+        spending_by_category(
+            _load_transactions(args),
+            args.category,
+            args.date,
+            months=args.months,
+            summary=args.summary,
+            json_format=args.format,
+            to_file=not args.no_file,
+        )
+    )
+    return 0
+
+
+def command_serve(args: argparse.Namespace) -> int:
+    """Команда: локальный HTTP API"""
+    from src.server import main as serve
+
+    serve(["--host", args.host, "--port", str(args.port), "--file", args.file])
+    return 0
+
+
+def command_batch(args: argparse.Namespace) -> int:
+    """Команда: пакетный анализ каталога файлов операций"""
+    from src.batch import main as batch
+
+    _check_month(args.month)
+    argv = [args.source, "--year", str(args.year), "--month", str(args.month), "--output", args.output]
+    if args.date:
+        argv += ["--date", args.date]
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    batch(argv)
+    return 0
+
+
+def command_monthly(args: argparse.Namespace) -> int:
+    """Команда: отчеты по всем месяцам истории (пересчитываются только изменившиеся месяцы)"""
+    from src.bulk_reports import main as monthly
+
+    argv = ["--file", args.file, "--windows", *map(str, args.windows)]
+    if args.output:
+        argv += ["--output", str(args.output)]
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    monthly(argv)
+    return 0
+
+
+def command_market(args: argparse.Namespace) -> int:
+    """Команда: обновление хранилища курсов валют и котировок акций"""
+    import json
+
+    from config import PATH_DATA_FILE
+    from src.market_store import get_market_store, refresh_market_data, refresh_rate_history
+
+    with open(PATH_DATA_FILE / "user_settings.json", "r") as file:
+        settings = json.load(file)
+    missing = {"user_currencies", "user_stocks"} - set(settings)
+    if missing:
+        raise CommandError(f"в user_settings.json нет ключей: {', '.join(sorted(missing))}")
+    if args.history:
+        date_start, date_end = (_parse_date(value, DATE_FORMAT) for value in args.history)
+    store = get_market_store()
+    rates, prices = refresh_market_data(store, settings["user_currencies"], settings["user_stocks"])
+    print(f"Обновлено курсов: {rates}, котировок: {prices}")
+    if args.history:
+        saved = refresh_rate_history(store, settings["user_currencies"], date_start, date_end)
+        print(f"Загружено курсов за период: {saved}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Функция создает парсер аргументов командной строки"""
+    parser = argparse.ArgumentParser(prog="python -m src.main", description="Анализ банковских операций")
+    parser.add_argument("--profile", type=Path, metavar="FILE", help="профилировать (cProfile, tracemalloc) в файл")
+    parser.add_argument(
+        "--metrics", action="store_true", help="вывести метрики этапов и памяти результатов (Prometheus) в stderr"
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="команда")
+
+    def add_command(
+        name: str, handler: Callable[[argparse.Namespace], int], help_text: str
+    ) -> argparse.ArgumentParser:
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        subparser.set_defaults(handler=handler)
+        if name not in ("batch", "market"):
+            subparser.add_argument("--file", default="operations.xlsx", help="файл операций в каталоге data")
+        if name in ("main", "cashback", "cashback-plan", "report", "recurring", "outliers"):
+            subparser.add_argument(
+                "--db", action="store_true", help="загрузить операции в хранилище SQLite и считать по нему"
+            )
+            subparser.add_argument(
+                "--rub", action="store_true", help="пересчитать суммы в рубли по курсу на дату операции"
+            )
+            subparser.add_argument("--rates", type=Path, metavar="FILE", help="CSV курсов (currency, date, rate)")
+        return subparser
+
+    main_page = add_command("main", command_main, "страница 'Главная' (по умолчанию)")
+    main_page.add_argument("--date", help="дата и время, DD.MM.YYYY HH:MM:SS (по умолчанию — сейчас)")
+    main_page.add_argument("--timings", action="store_true", help="добавить в ответ замеры этапов")
+
+    cashback = add_command("cashback", command_cashback, "выгодные категории повышенного кешбэка")
+    cashback.add_argument("--year", type=int, required=True)
+    cashback.add_argument("--month", type=int, required=True)
+
+    plan = add_command("cashback-plan", command_cashback_plan, "выбор категорий повышенного кешбэка на месяц")
+    plan.add_argument("--year", type=int, required=True)
+    plan.add_argument("--month", type=int, required=True)
+    plan.add_argument("--k", type=int, default=3, help="число выбираемых категорий (по умолчанию 3)")
+    plan.add_argument("--lookback", type=int, default=6, help="число предыдущих месяцев истории (по умолчанию 6)")
+    plan.add_argument("--boost", type=float, default=0.05, help="повышенная ставка кешбэка (по умолчанию 0.05)")
+    plan.add_argument("--base", type=float, default=0.01, help="обычная ставка кешбэка (по умолчанию 0.01)")
+    plan.add_argument("--cap", type=float, help="ограничение повышенного кешбэка по категории за месяц")
+
+    report = add_command("report", command_report, "траты по категории за три месяца")
+    report.add_argument("--category", required=True)
+    report.add_argument("--date", help="конец периода, DD.MM.YYYY (по умолчанию — сегодня)")
+    report.add_argument("--no-file", action="store_true", help="не записывать отчет в каталог reports")
+    report.add_argument("--months", type=int, default=3, help="длина периода в месяцах (по умолчанию 3)")
+    report.add_argument("--summary", action="store_true", help="итоги и траты по дням вместо списка операций")
+    report.add_argument(
+        "--format",
+        choices=("records", "compact", "columns"),
+        default="records",
+        help="формат JSON: с отступами, в одну строку, по столбцам",
+    )
+
+    recurring = add_command("recurring", command_recurring, "регулярные платежи (подписки, коммунальные услуги)")
+    recurring.add_argument(
+        "--history", type=int, default=12, help="число последних платежей, по которым оценивается регулярность"
+    )
+
+    outliers = add_command("outliers", command_outliers, "необычно большие траты по категориям и картам")
+    outliers.add_argument("--months", type=int, default=3, help="число предыдущих месяцев для сравнения")
+    outliers.add_argument("--threshold", type=float, default=3.5, help="порог отклонения (в единицах MAD)")
+
+    serve = add_command("serve", command_serve, "локальный HTTP API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+
+    market = add_command("market", command_market, "обновление хранилища курсов валют и котировок акций")
+    market.add_argument("--history", nargs=2, metavar=("START", "END"), help="загрузить курсы за период, DD.MM.YYYY")
+
+    batch = add_command("batch", command_batch, "пакетный анализ каталога файлов операций")
+    batch.add_argument("source", help="каталог с файлами *.xlsx или шаблон пути")
+    batch.add_argument("--year", type=int, required=True)
+    batch.add_argument("--month", type=int, required=True)
+    batch.add_argument("--date", help="конец окна трат по категориям, DD.MM.YYYY")
+    batch.add_argument("--workers", type=int, help="число процессов (по умолчанию — число ядер)")
+    batch.add_argument("--output", default="batch_report.json", help="файл сводного отчета в каталоге reports")
+
+    monthly = add_command("monthly", command_monthly, "отчеты по всем месяцам истории операций")
+    monthly.add_argument("--output", type=Path, help="каталог отчетов (по умолчанию reports/monthly)")
+    monthly.add_argument("--windows", type=int, nargs="+", default=[1, 3, 6, 12], help="длины окон в месяцах")
+    monthly.add_argument("--workers", type=int, help="число процессов (по умолчанию — число ядер)")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Точка входа: python -m src.main <команда> [параметры]; без команды выводится страница 'Главная'"""
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args([*argv, "main"])
+    handler: Callable[[argparse.Namespace], int] = args.handler
+    try:
+        if args.profile:
+            from src.instrumentation import profiling
+
+            with profiling(args.profile):
+                code = handler(args)
+        else:
+            code = handler(args)
+    except CommandError as error:
+        print(f"Ошибка: {error}", file=sys.stderr)
+        return 2
+    if args.metrics:
+        from src.instrumentation import prometheus_text
+        from src.memo import memo_prometheus_text
+
+        print(prometheus_text() + memo_prometheus_text(), file=sys.stderr, end="")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
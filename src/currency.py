@@ -0,0 +1,92 @@
+"""Пересчет сумм операций в рубли по курсу на дату операции.
+
+Курсы берутся из локального хранилища курсов (src.market_store) или из CSV-файла со столбцами
+currency, date, rate (курс валюты к рублю на дату). Все операции пересчитываются одним
+объединением merge_asof по валюте и дате, без запросов к API и поиска курса по каждой строке.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import stage
+from src.logger import get_logger
+from src.schema import RUB_AMOUNT_COLUMN
+
+logger = get_logger("currency")
+
+BASE_CURRENCY = "RUB"
+
+
+def load_rates(path: Optional[Path] = None, currencies: Optional[list[str]] = None) -> pd.DataFrame:
+    """Функция возвращает таблицу курсов (currency, date, rate), отсортированную по дате
+    :param path: CSV-файл курсов, по умолчанию — локальное хранилище курсов
+    :param currencies: валюты, по умолчанию — все
+    """
+    if path is None:
+        from src.market_store import get_market_store
+
+        return get_market_store().rates_frame(currencies)
+    rates = pd.read_csv(path, dtype={"currency": str, "rate": float})
+    rates["date"] = pd.to_datetime(rates["date"], format="%Y-%m-%d")
+    if currencies:
+        rates = rates[rates["currency"].isin(currencies)]
+    return rates.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+@stage()
+def add_rub_amounts(
+    transactions: pd.DataFrame,
+    rates: Optional[pd.DataFrame] = None,
+    amount_column: str = "Сумма платежа",
+    currency_column: str = "Валюта платежа",
+) -> pd.DataFrame:
+    """Функция добавляет столбец RUB_AMOUNT_COLUMN — сумму платежа в рублях по курсу на дату операции.
+    Берется последний известный курс не позже даты операции; для операций раньше первого известного курса —
+    первый курс после нее. Операции в валюте без курсов получают пустую сумму (количество пишется в лог).
+    :param transactions: DataFrame с операциями (не изменяется)
+    :param rates: таблица курсов (currency, date, rate), по умолчанию — load_rates() для валют операций
+    :return: копия transactions с добавленным столбцом
+    """
+    currencies = transactions[currency_column].astype(object)
+    foreign = currencies.notna() & (currencies != BASE_CURRENCY)
+    codes = sorted(currencies[foreign].unique())
+    rate = pd.Series(np.where(foreign, np.nan, 1.0), index=transactions.index)
+    if codes:
+        if rates is None:
+            rates = load_rates(currencies=codes)
+        left = pd.DataFrame(
+            {
+                "position": np.flatnonzero(foreign.to_numpy()),
+                "date": transactions.loc[foreign, "Дата операции"].to_numpy(dtype="datetime64[ns]"),
+                "currency": currencies[foreign].to_numpy(),
+            }
+        ).sort_values("date", kind="stable")
+        right = rates[["currency", "date", "rate"]].astype({"currency": object, "date": "datetime64[ns]"})
+        right = right.sort_values("date", kind="stable")
+        # Строки с пустой датой не участвуют в объединении (merge_asof требует дату)
+        left = left[left["date"].notna()]
+        matched = pd.merge_asof(left, right, on="date", by="currency", direction="backward")
+        missing = matched["rate"].isna()
+        if missing.any():
+            earliest = pd.merge_asof(left[missing.to_numpy()], right, on="date", by="currency", direction="forward")
+            matched.loc[missing, "rate"] = earliest["rate"].to_numpy()
+        rate.iloc[matched["position"].to_numpy()] = matched["rate"].to_numpy()
+        unconverted = foreign & rate.isna()
+        if unconverted.any():
+            logger.warning(
+                "Нет курса для %s операций: %s",
+                int(unconverted.sum()),
+                currencies[unconverted].value_counts().to_dict(),
+            )
+    amounts = transactions[amount_column]
+    converted = transactions.copy()
+    if pd.api.types.is_integer_dtype(amounts.dtype):
+        # Суммы в копейках остаются целыми
+        converted[RUB_AMOUNT_COLUMN] = (amounts.astype("Float64") * rate).round().astype("Int64")
+    else:
+        converted[RUB_AMOUNT_COLUMN] = (amounts * rate).round(2)
+    logger.info("Суммы пересчитаны в рубли: %s операций в валютах %s", int(foreign.sum()), codes)
+    return converted
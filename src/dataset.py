@@ -0,0 +1,150 @@
+from datetime import datetime
+from functools import cached_property
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from src.db_store import TransactionStore
+from src.logger import get_logger
+from src.schema import amount_column
+
+logger = get_logger("dataset")
+
+
+class SpendDataset:
+    """Подготовленный набор данных: только успешные траты ("Сумма платежа" < 0, "Статус" == "OK"),
+    отсортированные по "Дата операции". Строится один раз на загруженный файл,
+    окна по датам выделяются бинарным поиском по индексу дат без полного просмотра столбца."""
+
+    def __init__(self, transactions: pd.DataFrame) -> None:
+        spend_mask = (transactions["Сумма платежа"] < 0) & (transactions["Статус"] == "OK")
+        # fillna: суммы в копейках (Int64) могут содержать пропуски, такие строки тратами не считаются
+        transactions_spend = transactions[spend_mask.fillna(False)]
+        logger.info("Данные отфильтрованы по 'Сумма платежа' и 'Статус'")
+        # Стабильная сортировка сохраняет исходный порядок операций с одинаковой датой
+        self.frame = transactions_spend.sort_values("Дата операции", kind="stable")
+        self.dates = pd.DatetimeIndex(self.frame["Дата операции"])
+        logger.debug("Подготовлен набор данных трат, размер данных DataFrame: %s", self.frame.shape)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def between(self, date_start: datetime, date_end: datetime, include_end: bool = True) -> pd.DataFrame:
+        """Метод возвращает траты с date_start по date_end (searchsorted по индексу дат)
+        :param date_start: начало периода (включительно)
+        :param date_end: конец периода
+        :param include_end: включать ли операции, совершенные ровно в date_end
+        """
+        start = self.dates.searchsorted(pd.Timestamp(date_start), side="left")
+        end = self.dates.searchsorted(pd.Timestamp(date_end), side="right" if include_end else "left")
+        return self.frame.iloc[start:end]
+
+    @cached_property
+    def spending_index(self) -> "SpendingIndex":
+        """Индекс трат по категориям (строится при первом обращении и сохраняется вместе с набором)"""
+        return SpendingIndex(self.frame)
+
+
+class SpendingIndex:
+    """Индекс трат по категориям: траты сгруппированы по категории и упорядочены по дате внутри категории,
+    по ним построены накопленные суммы. Сумма и количество трат категории за любой период — разность
+    накопленных значений на двух границах, найденных бинарным поиском по датам категории."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        """
+        :param frame: успешные траты, отсортированные по "Дата операции" (SpendDataset.frame)
+        """
+        self.frame = frame
+        codes, categories = pd.factorize(frame["Категория"], sort=True)
+        self.categories = pd.Index(categories)
+        # Траты уже отсортированы по дате, стабильная сортировка по коду категории сохраняет порядок дат в блоке
+        order = np.argsort(codes, kind="stable")
+        self.positions = order
+        self.dates = frame["Дата операции"].to_numpy(dtype="datetime64[ns]")[order]
+        self.amounts = frame[amount_column(frame)].to_numpy(dtype=float, na_value=0.0)[order]
+        self.cumulative = np.concatenate([[0.0], np.cumsum(self.amounts)])
+        self.block_bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1), side="left")
+        logger.debug("Построен индекс трат: %s категорий, %s операций", len(categories), len(frame))
+
+    def _block(self, category: str) -> tuple[int, int]:
+        """Метод возвращает границы блока категории в упорядоченных массивах; для неизвестной категории — (0, 0)"""
+        if category not in self.categories:
+            return 0, 0
+        code = self.categories.get_loc(category)
+        return int(self.block_bounds[code]), int(self.block_bounds[code + 1])
+
+    def bounds(self, category: str, date_start: datetime, date_end: datetime) -> tuple[int, int]:
+        """Метод возвращает границы трат категории с date_start по date_end включительно"""
+        block_start, block_end = self._block(category)
+        block_dates = self.dates[block_start:block_end]
+        left = block_start + int(block_dates.searchsorted(np.datetime64(pd.Timestamp(date_start)), side="left"))
+        right = block_start + int(block_dates.searchsorted(np.datetime64(pd.Timestamp(date_end)), side="right"))
+        return left, right
+
+    def total(self, category: str, date_start: datetime, date_end: datetime) -> tuple[float, int]:
+        """Метод возвращает сумму и количество трат категории с date_start по date_end включительно"""
+        left, right = self.bounds(category, date_start, date_end)
+        return round(float(self.cumulative[right] - self.cumulative[left]), 2), right - left
+
+    def windows(
+        self, categories: list[str], dates_end: pd.DatetimeIndex, months: int = 3
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Метод считает сумму и количество трат для всех пар (категория, конец окна)
+        :param categories: категории
+        :param dates_end: концы окон (включительно), окно — months месяцев до конца
+        :param months: длина окна в месяцах
+        :return: массивы сумм и количеств трат формы (категории, окна)
+        """
+        starts = (dates_end - pd.DateOffset(months=months)).to_numpy(dtype="datetime64[ns]")
+        ends = dates_end.to_numpy(dtype="datetime64[ns]")
+        totals = np.zeros((len(categories), len(dates_end)))
+        counts = np.zeros((len(categories), len(dates_end)), dtype=int)
+        for row, category in enumerate(categories):
+            block_start, block_end = self._block(category)
+            block_dates = self.dates[block_start:block_end]
+            left = block_start + block_dates.searchsorted(starts, side="left")
+            right = block_start + block_dates.searchsorted(ends, side="right")
+            totals[row] = self.cumulative[right] - self.cumulative[left]
+            counts[row] = right - left
+        return totals, counts
+
+    def rows(self, category: str, date_start: datetime, date_end: datetime) -> pd.DataFrame:
+        """Метод возвращает траты категории с date_start по date_end включительно в порядке даты"""
+        left, right = self.bounds(category, date_start, date_end)
+        return self.frame.iloc[self.positions[left:right]]
+
+    def daily(self, category: str, date_start: datetime, date_end: datetime) -> pd.DataFrame:
+        """Метод возвращает сумму и количество трат категории по дням (только дни с тратами)
+        :return: DataFrame со столбцами date, total, count
+        """
+        left, right = self.bounds(category, date_start, date_end)
+        days = self.dates[left:right].astype("datetime64[D]")
+        unique_days, first = np.unique(days, return_index=True)
+        bounds = np.append(first, len(days)) + left
+        return pd.DataFrame(
+            {
+                "date": pd.DatetimeIndex(unique_days),
+                "total": (self.cumulative[bounds[1:]] - self.cumulative[bounds[:-1]]).round(2),
+                "count": np.diff(bounds),
+            }
+        )
+
+
+Transactions = Union[pd.DataFrame, SpendDataset, TransactionStore]
+
+
+def as_spend_dataset(transactions: Transactions) -> Union[SpendDataset, TransactionStore]:
+    """Функция возвращает подготовленный набор трат; DataFrame преобразуется,
+    SpendDataset и хранилище операций TransactionStore возвращаются как есть"""
+    if isinstance(transactions, (SpendDataset, TransactionStore)):
+        return transactions
+    return SpendDataset(transactions)
+
+
+def spending_index(transactions: Transactions) -> SpendingIndex:
+    """Функция возвращает индекс трат по категориям; для SpendDataset индекс строится один раз"""
+    dataset = as_spend_dataset(transactions)
+    if isinstance(dataset, SpendDataset):
+        return dataset.spending_index
+    return SpendingIndex(dataset.frame)
@@ -0,0 +1,281 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import PATH_DATA_CACHE
+from src.logger import get_logger
+from src.schema import AMOUNT_COLUMNS, DATE_FORMATS, from_kopecks, parse_dates
+
+logger = get_logger("db_store")
+
+PATH_TRANSACTION_STORE = PATH_DATA_CACHE / "operations.sqlite"
+# Версия формата хранилища (PRAGMA user_version): при другой версии операции загружаются заново
+STORE_VERSION = 2
+# Формат хранения дат: строки в этом формате сравниваются и сортируются как даты
+STORE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Столбцы выгрузки операций -> (столбец таблицы, тип SQLite)
+COLUMNS = {
+    "Дата операции": ("operation_date", "TEXT"),
+    "Дата платежа": ("payment_date", "TEXT"),
+    "Номер карты": ("card", "TEXT"),
+    "Статус": ("status", "TEXT"),
+    "Сумма операции": ("operation_amount", "REAL"),
+    "Валюта операции": ("operation_currency", "TEXT"),
+    "Сумма платежа": ("payment_amount", "REAL"),
+    "Валюта платежа": ("payment_currency", "TEXT"),
+    "Кэшбэк": ("cashback", "REAL"),
+    "Категория": ("category", "TEXT"),
+    "MCC": ("mcc", "REAL"),
+    "Описание": ("description", "TEXT"),
+    "Бонусы (включая кэшбэк)": ("bonuses", "INTEGER"),
+    "Округление на инвесткопилку": ("invest_rounding", "REAL"),
+    "Сумма операции с округлением": ("rounded_amount", "REAL"),
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS operations (
+    operation_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    {", ".join(f"{column} {sql_type}" for column, sql_type in COLUMNS.values())}
+);
+CREATE INDEX IF NOT EXISTS operations_date ON operations (operation_date);
+CREATE INDEX IF NOT EXISTS operations_status_date ON operations (status, operation_date);
+CREATE INDEX IF NOT EXISTS operations_category_date ON operations (category, operation_date);
+CREATE INDEX IF NOT EXISTS operations_card_date ON operations (card, operation_date);
+"""
+
+# Условие успешной траты (как в SpendDataset)
+SPEND_CONDITION = "status = 'OK' AND payment_amount < 0"
+
+
+def _store_values(transactions: pd.DataFrame) -> dict[str, pd.Series]:
+    """Функция приводит столбцы выгрузки к виду хранения, одному для всех режимов чтения файла:
+    даты — строки STORE_DATE_FORMAT, суммы — рубли с точностью до копейки (суммы в копейках Int64
+    переводятся в рубли), целые — int, текст — str; пропуски — None
+    :return: dict столбец таблицы -> значения (object)
+    """
+    values = {}
+    for name, (column, sql_type) in COLUMNS.items():
+        series = transactions[name]
+        if name in DATE_FORMATS:
+            parsed = parse_dates(series, DATE_FORMATS[name])
+            # Значения, которые не удалось разобрать, хранятся как есть
+            series = parsed.dt.strftime(STORE_DATE_FORMAT).where(parsed.notna(), series.astype(object))
+        elif sql_type == "REAL":
+            if name in AMOUNT_COLUMNS and isinstance(series.dtype, pd.Int64Dtype):
+                series = from_kopecks(series)
+            series = series.astype("Float64").astype("float64").round(2)
+        elif sql_type == "INTEGER":
+            series = series.astype("Float64").round().astype("Int64")
+        else:
+            series = series.astype(str).where(series.notna(), None)
+        values[column] = series.astype(object).where(series.notna(), None)
+    return values
+
+
+def _hash_ids(values: dict[str, pd.Series]) -> pd.Series:
+    hashes = pd.util.hash_pandas_object(
+        pd.DataFrame({column: series.astype(str).where(series.notna(), "nan") for column, series in values.items()}),
+        index=False,
+    )
+    occurrence = hashes.groupby(hashes.to_numpy()).cumcount()
+    return hashes.map("{:016x}".format) + "-" + occurrence.astype(str)
+
+
+def operation_ids(transactions: pd.DataFrame) -> pd.Series:
+    """Функция возвращает идентификаторы операций: хэш всех полей строки в виде хранения и номер повторения
+    одинаковых строк. Повторная загрузка того же файла дает те же идентификаторы в любом режиме чтения
+    (суммы в рублях или копейках, даты разобраны или строками выгрузки), а действительно повторяющиеся
+    операции не схлопываются в одну."""
+    return _hash_ids(_store_values(transactions))
+
+
+def _format_date(date: datetime) -> str:
+    return str(pd.Timestamp(date).strftime(STORE_DATE_FORMAT))
+
+
+class TransactionStore:
+    """Хранилище операций во встроенной базе SQLite с индексами по дате операции, статусу, категории и карте.
+    Поддерживает те же запросы, что и SpendDataset (between, frame, dates), поэтому передается в
+    df_range_current_month, profitable_cashback и spending_by_category вместо DataFrame;
+    выборки и агрегаты выполняются индексными запросами без просмотра всей истории в памяти."""
+
+    def __init__(self, path: Path = PATH_TRANSACTION_STORE) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version != STORE_VERSION:
+                # Идентификаторы и значения прежнего формата не совпадают с новыми: повторная загрузка
+                # файла задвоила бы операции, поэтому хранилище строится заново
+                logger.info("Версия хранилища операций %s устарела, операции будут загружены заново", version)
+                connection.execute("DROP TABLE IF EXISTS operations")
+                connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        with self._connection() as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def import_frame(self, transactions: pd.DataFrame) -> int:
+        """Метод добавляет операции из DataFrame; уже загруженные операции пропускаются
+        :return: количество новых операций
+        """
+        store_values = _store_values(transactions)
+        values = pd.DataFrame({"operation_id": _hash_ids(store_values), **store_values})
+        with self._lock, self._connection() as connection:
+            (last_seq,) = connection.execute("SELECT COALESCE(MAX(seq), -1) FROM operations").fetchone()
+            values.insert(1, "seq", np.arange(last_seq + 1, last_seq + 1 + len(values)))
+            before = connection.total_changes
+            connection.executemany(
+                f"INSERT OR IGNORE INTO operations ({', '.join(values.columns)}) "
+                f"VALUES ({', '.join('?' * len(values.columns))})",
+                values.itertuples(index=False, name=None),
+            )
+            inserted = connection.total_changes - before
+        logger.info("Загружено новых операций: %s из %s", inserted, len(transactions))
+        return inserted
+
+    def import_file(self, filename: str = "operations.xlsx") -> int:
+        """Метод загружает файл операций (относительно каталога data), повторная загрузка добавляет только новые"""
+        from src.utils import read_excel
+
+        return self.import_frame(read_excel(filename))
+
+    def _to_frame(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Метод переименовывает столбцы таблицы в столбцы выгрузки и восстанавливает типы дат и сумм
+        (пустая выборка приходит со столбцами object); индекс — порядковый номер загрузки
+        (как исходный индекс строк DataFrame)"""
+        frame = rows.set_index("seq").rename_axis(None)
+        frame = frame.astype({column: float for column, sql_type in COLUMNS.values() if sql_type == "REAL"})
+        frame = frame.rename(columns={column: name for name, (column, _) in COLUMNS.items()})
+        frame["Дата операции"] = pd.to_datetime(frame["Дата операции"], format=STORE_DATE_FORMAT)
+        # Дата платежа, которую не удалось разобрать при загрузке, хранится как есть
+        frame["Дата платежа"] = parse_dates(frame["Дата платежа"], STORE_DATE_FORMAT)
+        return frame
+
+    def between(self, date_start: datetime, date_end: datetime, include_end: bool = True) -> pd.DataFrame:
+        """Метод возвращает успешные траты с date_start по date_end в порядке даты (индекс по статусу и дате)"""
+        end_operator = "<=" if include_end else "<"
+        columns = ", ".join(["seq"] + [column for column, _ in COLUMNS.values()])
+        rows = self._query(
+            f"SELECT {columns} FROM operations WHERE {SPEND_CONDITION} "
+            f"AND operation_date >= ? AND operation_date {end_operator} ? ORDER BY operation_date, seq",
+            (_format_date(date_start), _format_date(date_end)),
+        )
+        return self._to_frame(rows)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Все успешные траты в порядке даты"""
+        columns = ", ".join(["seq"] + [column for column, _ in COLUMNS.values()])
+        rows = self._query(f"SELECT {columns} FROM operations WHERE {SPEND_CONDITION} ORDER BY operation_date, seq")
+        return self._to_frame(rows)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.frame["Дата операции"])
+
+    def version(self) -> str:
+        """Метод возвращает версию содержимого: операции только добавляются, поэтому версию определяют
+        количество операций и последний порядковый номер загрузки"""
+        with self._connection() as connection:
+            count, last_seq = connection.execute("SELECT COUNT(*), COALESCE(MAX(seq), -1) FROM operations").fetchone()
+        return f"{count}:{last_seq}"
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            return int(connection.execute(f"SELECT COUNT(*) FROM operations WHERE {SPEND_CONDITION}").fetchone()[0])
+
+    def cashback_by_category(self, date_start: datetime, date_end: datetime) -> pd.Series:
+        """Метод возвращает сумму кешбэка по категориям за период [date_start, date_end) агрегатным запросом"""
+        rows = self._query(
+            "SELECT category, TOTAL(cashback) AS cashback FROM operations "
+            f"WHERE {SPEND_CONDITION} AND operation_date >= ? AND operation_date < ? "
+            "GROUP BY category HAVING category IS NOT NULL ORDER BY category",
+            (_format_date(date_start), _format_date(date_end)),
+        )
+        return pd.Series(
+            rows["cashback"].to_numpy(), index=pd.Index(rows["category"], name="Категория"), name="Кэшбэк"
+        )
+
+    def category_spending(self, category: str, date_start: datetime, date_end: datetime) -> pd.DataFrame:
+        """Метод возвращает траты по категории за период включительно (индекс по категории и дате)"""
+        columns = ", ".join(["seq"] + [column for column, _ in COLUMNS.values()])
+        rows = self._query(
+            f"SELECT {columns} FROM operations WHERE category = ? AND operation_date >= ? AND operation_date <= ? "
+            f"AND {SPEND_CONDITION} ORDER BY operation_date, seq",
+            (category, _format_date(date_start), _format_date(date_end)),
+        )
+        return self._to_frame(rows)
+
+    def last_spend_date(self, date_start: datetime, date_end: datetime) -> Optional[datetime]:
+        """Метод возвращает время последней траты за период включительно (None, если трат нет)"""
+        with self._connection() as connection:
+            (last,) = connection.execute(
+                f"SELECT MAX(operation_date) FROM operations WHERE {SPEND_CONDITION} "
+                "AND operation_date >= ? AND operation_date <= ?",
+                (_format_date(date_start), _format_date(date_end)),
+            ).fetchone()
+        return None if last is None else datetime.strptime(last, STORE_DATE_FORMAT)
+
+    def _spend_totals(self, column: str, date_start: datetime, date_end: datetime) -> pd.DataFrame:
+        """Метод возвращает траты и кешбэк за период включительно по значениям столбца таблицы
+        (в порядке значений, без пустых) агрегатным запросом по индексу статуса и даты"""
+        return self._query(
+            f"SELECT {column}, ROUND(TOTAL(payment_amount), 2) AS total_spent, ROUND(TOTAL(cashback), 2) AS cashback "
+            f"FROM operations WHERE {SPEND_CONDITION} AND operation_date >= ? AND operation_date <= ? "
+            f"GROUP BY {column} HAVING {column} IS NOT NULL ORDER BY {column}",
+            (_format_date(date_start), _format_date(date_end)),
+        )
+
+    def cards_spend(self, date_start: datetime, date_end: datetime) -> pd.DataFrame:
+        """Метод возвращает траты и кешбэк по картам за период включительно (как df_cards_spend)"""
+        rows = self._spend_totals("card", date_start, date_end)
+        rows.insert(0, "last_digits", rows.pop("card").str[-4:])
+        return rows
+
+    def categories_spend(self, date_start: datetime, date_end: datetime) -> pd.DataFrame:
+        """Метод возвращает траты и кешбэк по категориям за период включительно (как main_page_summary)"""
+        return self._spend_totals("category", date_start, date_end)
+
+    def top_spending(self, date_start: datetime, date_end: datetime, n: int = 5) -> pd.DataFrame:
+        """Метод возвращает n наибольших трат за период включительно (как nsmallest по сумме платежа)"""
+        columns = ", ".join(["seq"] + [column for column, _ in COLUMNS.values()])
+        rows = self._query(
+            f"SELECT {columns} FROM operations WHERE {SPEND_CONDITION} AND operation_date >= ? AND operation_date <= ? "
+            "ORDER BY payment_amount, operation_date, seq LIMIT ?",
+            (_format_date(date_start), _format_date(date_end), n),
+        )
+        return self._to_frame(rows)
+
+
+_stores: dict[Path, TransactionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_transaction_store(path: Optional[Path] = None) -> TransactionStore:
+    """Функция возвращает общее для процесса хранилище операций"""
+    path = path or PATH_TRANSACTION_STORE
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = TransactionStore(path)
+        return _stores[path]
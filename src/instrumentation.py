@@ -0,0 +1,206 @@
+"""Замеры этапов анализа: время, количество строк на входе и выходе, выделенная память.
+
+stage — декоратор и контекстный менеджер этапа. Каждый вызов этапа попадает в общие метрики процесса
+(prometheus_text) и, если открыт сбор через collect(), в список замеров текущего запроса.
+Память этапа и число строк хранилища операций замеряются, когда включен tracemalloc (режим profiling).
+"""
+
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from src.logger import get_logger
+
+logger = get_logger("instrumentation")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Замеры текущего запроса (см. collect); ContextVar, чтобы параллельные запросы сервера не смешивались
+_collected: contextvars.ContextVar[Optional[list[dict[str, Any]]]] = contextvars.ContextVar(
+    "instrumentation_collected", default=None
+)
+# Накопленные метрики процесса: этап -> счетчики
+_metrics: dict[str, dict[str, float]] = {}
+_metrics_lock = threading.Lock()
+# Стек вложенных этапов потока (для учета пика памяти вложенных этапов во внешних)
+_local = threading.local()
+
+
+def _rows(value: Any) -> Optional[int]:
+    """Функция возвращает количество строк DataFrame, Series или набора трат (SpendDataset, TransactionStore),
+    для остальных значений — None"""
+    if hasattr(value, "shape"):
+        return int(value.shape[0])
+    from src.db_store import TransactionStore  # не на уровне модуля: src.db_store -> src.schema -> этот модуль
+
+    if isinstance(value, TransactionStore):
+        # Для хранилища это запрос COUNT(*) к базе, поэтому он выполняется только в режиме profiling
+        return len(value) if tracemalloc.is_tracing() else None
+    if hasattr(value, "between") and hasattr(value, "__len__"):
+        return len(value)
+    return None
+
+
+class stage:
+    """Этап анализа. Используется как декоратор (@stage() или @stage("имя"))
+    или как контекстный менеджер (with stage("имя") as current: current.rows_out = ...).
+    Для декоратора строки на входе — размер первого аргумента, на выходе — размер результата."""
+
+    def __init__(self, name: Optional[str] = None) -> None:
+        self.name = name
+        self.rows_in: Optional[int] = None
+        self.rows_out: Optional[int] = None
+
+    def __call__(self, function: F) -> F:
+        name = self.name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name) as current:
+                current.rows_in = _rows(args[0]) if args else None
+                result = function(*args, **kwargs)
+                current.rows_out = _rows(result)
+                return result
+
+        return wrapper  # type: ignore[return-value]
+
+    def __enter__(self) -> "stage":
+        self._memory_floor = 0
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self._tracing = tracemalloc.is_tracing()
+        if self._tracing:
+            self._memory_start, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._memory_floor = max(stack[-1]._memory_floor, peak)
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        seconds = time.perf_counter() - self._start
+        stack = _local.stack
+        stack.pop()
+        memory = None
+        if self._tracing and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self._memory_floor)
+            memory = max(peak - self._memory_start, 0)
+            if stack:
+                stack[-1]._memory_floor = max(stack[-1]._memory_floor, peak)
+        _record(
+            {
+                "stage": self.name or "stage",
+                "seconds": round(seconds, 6),
+                "rows_in": self.rows_in,
+                "rows_out": self.rows_out,
+                "memory_peak_bytes": memory,
+            }
+        )
+
+
+def _record(measurement: dict[str, Any]) -> None:
+    """Функция добавляет замер этапа в метрики процесса и в сбор текущего запроса"""
+    collected = _collected.get()
+    if collected is not None:
+        collected.append(measurement)
+    with _metrics_lock:
+        metrics = _metrics.setdefault(
+            measurement["stage"],
+            {"calls": 0, "seconds": 0.0, "rows_in": 0, "rows_out": 0, "memory_peak_bytes": 0},
+        )
+        metrics["calls"] += 1
+        metrics["seconds"] += measurement["seconds"]
+        metrics["rows_in"] += measurement["rows_in"] or 0
+        metrics["rows_out"] += measurement["rows_out"] or 0
+        metrics["memory_peak_bytes"] = max(metrics["memory_peak_bytes"], measurement["memory_peak_bytes"] or 0)
+    logger.debug(
+        "Этап %s: %.6f с, строк на входе %s, на выходе %s",
+        measurement["stage"],
+        measurement["seconds"],
+        measurement["rows_in"],
+        measurement["rows_out"],
+    )
+
+
+@contextmanager
+def collect() -> Iterator[list[dict[str, Any]]]:
+    """Контекстный менеджер: собирает замеры этапов, выполненных внутри блока (включая потоки,
+    запущенные через contextvars.copy_context), в возвращаемый список"""
+    collected: list[dict[str, Any]] = []
+    token = _collected.set(collected)
+    try:
+        yield collected
+    finally:
+        _collected.reset(token)
+
+
+def metrics_snapshot() -> dict[str, dict[str, float]]:
+    """Функция возвращает копию накопленных метрик по этапам"""
+    with _metrics_lock:
+        return {name: dict(values) for name, values in _metrics.items()}
+
+
+def reset_metrics() -> None:
+    """Функция обнуляет накопленные метрики"""
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def prometheus_text(prefix: str = "bank_stage") -> str:
+    """Функция возвращает метрики этапов в текстовом формате Prometheus"""
+    descriptions = [
+        ("calls", "calls_total", "counter", "Количество вызовов этапа"),
+        ("seconds", "seconds_total", "counter", "Суммарное время этапа в секундах"),
+        ("rows_in", "rows_in_total", "counter", "Суммарное количество строк на входе этапа"),
+        ("rows_out", "rows_out_total", "counter", "Суммарное количество строк на выходе этапа"),
+        ("memory_peak_bytes", "memory_peak_bytes", "gauge", "Максимальный пик выделенной памяти этапа (tracemalloc)"),
+    ]
+    snapshot = metrics_snapshot()
+    lines = []
+    for key, suffix, metric_type, help_text in descriptions:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for stage_name in sorted(snapshot):
+            value = snapshot[stage_name][key]
+            lines.append(f'{name}{{stage="{stage_name}"}} {round(value, 6) if isinstance(value, float) else value}')
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profiling(path: Optional[Path] = None, top: int = 20) -> Iterator[cProfile.Profile]:
+    """Режим профилирования: cProfile и tracemalloc на время блока.
+    Статистика cProfile сохраняется в path (формат pstats), самые затратные функции
+    и места выделения памяти записываются в лог instrumentation.
+    :param path: файл для статистики cProfile, None — не сохранять
+    :param top: количество строк в отчетах
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+        if path is not None:
+            profiler.dump_stats(str(path))
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+        allocations = "\n".join(str(line) for line in snapshot.statistics("lineno")[:top])
+        logger.info("Профиль cProfile:\n%s\nВыделение памяти (tracemalloc):\n%s", stream.getvalue(), allocations)
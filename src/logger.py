@@ -1,19 +1,133 @@
+import atexit
 import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
-from config import PATH_TO_LOGGER
+from config import LOG_LEVEL, PATH_TO_LOGGER
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class ModuleFileHandler(logging.Handler):
+    """Обработчик, который пишет записи каждого модуля в свой файл logs/<модуль>.log.
+    Файлы открываются при первой записи; работает в потоке QueueListener, а не в потоке вызова."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._handlers: dict[str, logging.FileHandler] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        handler = self._handlers.get(record.name)
+        if handler is None:
+            PATH_TO_LOGGER.mkdir(exist_ok=True)
+            handler = logging.FileHandler(PATH_TO_LOGGER / f"{record.name}.log", encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            self._handlers[record.name] = handler
+        handler.emit(record)
+
+    def flush(self) -> None:
+        for handler in self._handlers.values():
+            handler.flush()
+
+    def close(self) -> None:
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers.clear()
+        super().close()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler, который передает запись в очередь без форматирования:
+    подстановка %-аргументов выполняется в потоке записи, а не в потоке вызова"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _DirectQueue:
+    """Замена очереди в дочернем процессе (fork): поток записи родителя туда не копируется,
+    поэтому записи пишутся в файлы сразу"""
+
+    def __init__(self, handler: logging.Handler) -> None:
+        self.handler = handler
+
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        self.handler.handle(record)
+
+
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def log_level() -> int:
+    """Функция возвращает уровень логирования: переменная окружения LOG_LEVEL или config.LOG_LEVEL"""
+    name = os.getenv("LOG_LEVEL", LOG_LEVEL).upper()
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else logging.DEBUG
+
+
+def _get_queue_handler() -> QueueHandler:
+    """Функция однократно создает очередь записей и фоновый поток записи в файлы"""
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is None:
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            _queue_handler = DeferredQueueHandler(log_queue)
+            _listener = QueueListener(log_queue, ModuleFileHandler())
+            _listener.start()
+            atexit.register(shutdown_logging)
+        elif _listener is None and not isinstance(_queue_handler.queue, _DirectQueue):
+            # Логирование было остановлено (shutdown_logging), поток записи запускается снова
+            _listener = QueueListener(_queue_handler.queue, ModuleFileHandler())
+            _listener.start()
+        return _queue_handler
+
+
+def _reset_after_fork() -> None:
+    """Функция переключает дочерний процесс на прямую запись в файлы"""
+    global _listener, _setup_lock
+    _setup_lock = threading.Lock()
+    _listener = None
+    if _queue_handler is not None:
+        _queue_handler.queue = _DirectQueue(ModuleFileHandler())  # type: ignore[assignment]
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def flush_logs() -> None:
+    """Функция дожидается записи всех накопленных записей в файлы"""
+    with _setup_lock:
+        if _listener is not None:
+            # QueueListener.stop() дописывает очередь; поток сразу запускается снова
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.flush()
+            _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Функция дописывает очередь и закрывает файлы логов (вызывается при завершении процесса)"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
 
 
 def get_logger(module_name: str) -> logging.Logger:
-    # Создаём объект логгера
+    """Функция возвращает логгер модуля. Записи передаются через очередь в фоновый поток,
+    который пишет их в файл logs/<module_name>.log; повторный вызов не добавляет обработчик.
+    Уровень задается переменной окружения LOG_LEVEL (по умолчанию config.LOG_LEVEL)."""
     logger = logging.getLogger(module_name)
-    # Создаём обработчик для записи логов в файл
-    handler = logging.FileHandler(PATH_TO_LOGGER / f"{module_name}.log", encoding="utf-8")
-    # Определяем формат логов
-    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-    # Добавляем обработчик к логгеру
-    logger.addHandler(handler)
-    # Устанавливаем уровень для обработчика (опционально)
-    handler.setLevel(logging.DEBUG)
-    # Устанавливаем уровень логирования
-    logger.setLevel(logging.DEBUG)
+    queue_handler = _get_queue_handler()
+    if queue_handler not in logger.handlers:
+        logger.addHandler(queue_handler)
+    logger.setLevel(log_level())
     return logger
@@ -0,0 +1,177 @@
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.logger import get_logger
+from src.utils import CURRENCY_RATE_URL, REQUEST_TIMEOUT, STOCK_PRICES_URL, get_currencies_rate, get_stock_prices
+
+logger = get_logger("market_data")
+
+
+class TTLCache:
+    """Потокобезопасный кэш с временем жизни записей и ограничением размера (вытесняются самые старые)"""
+
+    def __init__(self, ttl: float, maxsize: int = 256) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Метод возвращает значение по ключу или None, если записи нет или ее время жизни истекло"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Метод сохраняет значение; при превышении размера удаляются истекшие, затем самые старые записи"""
+        with self._lock:
+            now = time.monotonic()
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                for expired_key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+                    del self._data[expired_key]
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class FixedWindowRateLimiter:
+    """Ограничитель частоты запросов: не более max_calls запросов за окно period секунд"""
+
+    def __init__(self, max_calls: int, period: float) -> None:
+        self.max_calls = max_calls
+        self.period = period
+        self._window_start = time.monotonic()
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Метод резервирует запрос в текущем окне, возвращает False, если квота окна исчерпана"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.period:
+                self._window_start = now
+                self._calls = 0
+            if self._calls >= self.max_calls:
+                return False
+            self._calls += 1
+            return True
+
+
+class MarketDataClient:
+    """Клиент курсов валют и стоимости акций для страницы 'Главная'.
+    Запросы выполняются параллельно в пуле потоков через одну сессию requests с пулом соединений,
+    ответы кэшируются на cache_ttl секунд, частота запросов к каждому API ограничена квотой провайдера."""
+
+    def __init__(
+        self,
+        timeout: float = REQUEST_TIMEOUT,
+        max_workers: int = 8,
+        cache_ttl: float = 60.0,
+        cache_size: int = 256,
+        currency_limit: tuple[int, float] = (10, 60.0),
+        stock_limit: tuple[int, float] = (5, 60.0),
+        currency_url: str = CURRENCY_RATE_URL,
+        stock_url: str = STOCK_PRICES_URL,
+    ) -> None:
+        """
+        :param timeout: таймаут одного запроса в секундах
+        :param max_workers: максимальное число одновременных запросов
+        :param cache_ttl: время жизни полученных курсов и котировок в секундах
+        :param cache_size: максимальное число записей в кэше
+        :param currency_limit: квота API курсов валют (запросов, секунд)
+        :param stock_limit: квота API котировок акций (запросов, секунд)
+        :param currency_url: адрес API курсов валют
+        :param stock_url: адрес API котировок акций
+        """
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.urls = {"currency": currency_url, "stock": stock_url}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = TTLCache(cache_ttl, cache_size)
+        self.currency_limiter = FixedWindowRateLimiter(*currency_limit)
+        self.stock_limiter = FixedWindowRateLimiter(*stock_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _fetch(self, key: tuple[str, str], limiter: FixedWindowRateLimiter, fetcher: Callable[..., dict]) -> dict:
+        """Метод возвращает ответ из кэша или выполняет запрос, если квота API это позволяет"""
+        cached: Optional[dict] = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Данные для %s получены из кэша", key)
+            return cached
+        if not limiter.acquire():
+            logger.warning("Превышена квота запросов к API, запрос для %s пропущен", key)
+            return {}
+        result = fetcher(key[1], session=self.session, timeout=self.timeout, url=self.urls[key[0]])
+        # Ошибки не кэшируются, чтобы следующий вызов повторил запрос
+        if result:
+            self.cache.set(key, result)
+        return result
+
+    def get_currency_rate(self, currency_code: str) -> dict:
+        """Метод возвращает курс валюты к рублю"""
+        return self._fetch(("currency", currency_code), self.currency_limiter, get_currencies_rate)
+
+    def get_stock_price(self, stock_symbol: str) -> dict:
+        """Метод возвращает стоимость акции"""
+        return self._fetch(("stock", stock_symbol), self.stock_limiter, get_stock_prices)
+
+    def fetch_all(self, currencies: list[str], stocks: list[str]) -> tuple[list[dict], list[dict]]:
+        """Метод параллельно запрашивает курсы валют и стоимость акций, порядок ответов совпадает с запрошенным"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="market_data")
+        # Контекст вызова передается в потоки, чтобы замеры запросов попали в сбор текущего запроса (collect)
+        currency_futures = [
+            self._executor.submit(contextvars.copy_context().run, self.get_currency_rate, code) for code in currencies
+        ]
+        stock_futures = [
+            self._executor.submit(contextvars.copy_context().run, self.get_stock_price, symbol) for symbol in stocks
+        ]
+        currency_rates = [future.result() for future in currency_futures]
+        stock_prices = [future.result() for future in stock_futures]
+        logger.info("Получены курсы валют (%s) и стоимость акций (%s)", len(currency_rates), len(stock_prices))
+        return currency_rates, stock_prices
+
+    def close(self) -> None:
+        """Метод останавливает пул потоков и закрывает сессию"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+
+_client: Optional[MarketDataClient] = None
+_client_lock = threading.Lock()
+
+
+def get_market_data_client() -> MarketDataClient:
+    """Функция возвращает общий для процесса клиент, чтобы кэш сохранялся между вызовами страницы"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MarketDataClient()
+        return _client
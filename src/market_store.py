@@ -0,0 +1,266 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from config import PATH_DATA_CACHE
+from src.logger import get_logger
+from src.market_data import MarketDataClient, get_market_data_client
+from src.utils import get_currencies_rates_bulk, get_currencies_rates_history
+
+logger = get_logger("market_store")
+
+PATH_MARKET_STORE = PATH_DATA_CACHE / "market_data.sqlite"
+# Возраст данных хранилища (секунды), после которого они обновляются в фоне
+MAX_AGE = 6 * 60 * 60
+# Пауза между повторными попытками синхронного обновления, если API недоступен (секунды)
+RETRY_INTERVAL = 60
+# Максимальный период одного запроса истории курсов (ограничение API)
+HISTORY_CHUNK_DAYS = 365
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates (
+    currency TEXT NOT NULL,
+    date TEXT NOT NULL,
+    rate REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (currency, date)
+);
+CREATE TABLE IF NOT EXISTS quotes (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    price REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (symbol, date)
+);
+"""
+
+
+class MarketDataStore:
+    """Локальное хранилище курсов валют к рублю и котировок акций по дням (SQLite).
+    Страница 'Главная' читает данные отсюда, поэтому не зависит от задержек API и работает без сети."""
+
+    def __init__(self, path: Path = PATH_MARKET_STORE) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Соединение на одну операцию: хранилище используется из потоков сервера и фонового обновления"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def save_rates(self, rates: dict[str, float], day: str, fetched_at: Optional[float] = None) -> int:
+        """Метод сохраняет курсы валют к рублю на дату day ("YYYY-MM-DD"), возвращает количество записей"""
+        fetched_at = fetched_at or time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO rates (currency, date, rate, fetched_at) VALUES (?, ?, ?, ?)",
+                [(currency, day, rate, fetched_at) for currency, rate in rates.items()],
+            )
+        return len(rates)
+
+    def save_rates_history(self, history: dict[str, dict[str, float]]) -> int:
+        """Метод сохраняет курсы по дням {дата: {валюта: курс}}, возвращает количество записей"""
+        return sum(self.save_rates(rates, day) for day, rates in history.items())
+
+    def save_quotes(self, prices: dict[str, float], day: str, fetched_at: Optional[float] = None) -> int:
+        """Метод сохраняет стоимость акций на дату day ("YYYY-MM-DD"), возвращает количество записей"""
+        fetched_at = fetched_at or time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO quotes (symbol, date, price, fetched_at) VALUES (?, ?, ?, ?)",
+                [(symbol, day, price, fetched_at) for symbol, price in prices.items()],
+            )
+        return len(prices)
+
+    def _latest(self, table: str, key: str, value: str, names: list[str]) -> dict[str, tuple[float, float]]:
+        """Метод возвращает последние значения {имя: (значение, время получения)}"""
+        if not names:
+            return {}
+        placeholders = ",".join("?" * len(names))
+        with self._connection() as connection:
+            # SQLite: при агрегате MAX остальные столбцы берутся из строки с максимальной датой
+            rows = connection.execute(
+                f"SELECT {key}, {value}, fetched_at, MAX(date) FROM {table} WHERE {key} IN ({placeholders}) "
+                f"GROUP BY {key}",
+                names,
+            ).fetchall()
+        return {name: (result, fetched_at) for name, result, fetched_at, _ in rows}
+
+    def latest_rates(self, currencies: list[str]) -> list[dict]:
+        """Метод возвращает последние курсы валют в порядке запроса; для валюты без данных — пустой dict"""
+        latest = self._latest("rates", "currency", "rate", currencies)
+        return [{"currency": code, "rate": latest[code][0]} if code in latest else {} for code in currencies]
+
+    def latest_prices(self, stocks: list[str]) -> list[dict]:
+        """Метод возвращает последнюю стоимость акций в порядке запроса; для акции без данных — пустой dict"""
+        latest = self._latest("quotes", "symbol", "price", stocks)
+        return [{"stock": symbol, "price": latest[symbol][0]} if symbol in latest else {} for symbol in stocks]
+
+    def last_fetched(self, currencies: list[str], stocks: list[str]) -> Optional[float]:
+        """Метод возвращает время самого старого из последних обновлений по запрошенным валютам и акциям;
+        None, если хотя бы по одной из них данных нет"""
+        latest = list(self._latest("rates", "currency", "rate", currencies).values()) + list(
+            self._latest("quotes", "symbol", "price", stocks).values()
+        )
+        if len(latest) < len(set(currencies)) + len(set(stocks)):
+            return None
+        return min((fetched_at for _, fetched_at in latest), default=time.time())
+
+    def rate_on(self, currency: str, day: datetime) -> Optional[float]:
+        """Метод возвращает курс валюты к рублю на дату: последний известный курс не позже day"""
+        if currency == "RUB":
+            return 1.0
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT rate FROM rates WHERE currency = ? AND date <= ? ORDER BY date DESC LIMIT 1",
+                (currency, day.strftime("%Y-%m-%d")),
+            ).fetchone()
+        return row[0] if row else None
+
+    def rates_frame(self, currencies: Optional[list[str]] = None) -> pd.DataFrame:
+        """Метод возвращает все курсы в виде DataFrame (currency, date, rate), отсортированного по дате"""
+        query = "SELECT currency, date, rate FROM rates"
+        params: list[str] = []
+        if currencies:
+            query += f" WHERE currency IN ({','.join('?' * len(currencies))})"
+            params = currencies
+        with self._connection() as connection:
+            frame = pd.read_sql_query(query + " ORDER BY date", connection, params=params)
+        frame["date"] = pd.to_datetime(frame["date"], format="%Y-%m-%d")
+        return frame
+
+
+def refresh_market_data(
+    store: MarketDataStore, currencies: list[str], stocks: list[str], client: Optional[MarketDataClient] = None
+) -> tuple[int, int]:
+    """Функция обновляет хранилище: курсы всех валют — одним запросом к API,
+    котировки — параллельными запросами (API котировок не поддерживает запрос нескольких акций)
+    :return: количество обновленных курсов и котировок
+    """
+    client = client or get_market_data_client()
+    today = date.today().isoformat()
+    rates = get_currencies_rates_bulk(currencies, session=client.session, timeout=client.timeout) if currencies else {}
+    store.save_rates(rates, today)
+    _, quotes = client.fetch_all([], stocks)
+    prices = {}
+    for quote in quotes:
+        try:
+            prices[quote["stock"]] = float(quote["price"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    store.save_quotes(prices, today)
+    logger.info(
+        "Хранилище обновлено: курсов %s из %s, котировок %s из %s",
+        len(rates),
+        len(currencies),
+        len(prices),
+        len(stocks),
+    )
+    return len(rates), len(prices)
+
+
+def refresh_rate_history(
+    store: MarketDataStore,
+    currencies: list[str],
+    date_start: datetime,
+    date_end: datetime,
+    client: Optional[MarketDataClient] = None,
+) -> int:
+    """Функция загружает историю курсов за период (один запрос на каждый год периода)
+    для пересчета операций в иностранной валюте по курсу на дату операции
+    :return: количество сохраненных записей
+    """
+    client = client or get_market_data_client()
+    saved = 0
+    chunk_start = date_start
+    while chunk_start <= date_end:
+        chunk_end = min(chunk_start + timedelta(days=HISTORY_CHUNK_DAYS - 1), date_end)
+        history = get_currencies_rates_history(
+            currencies, chunk_start, chunk_end, session=client.session, timeout=client.timeout
+        )
+        saved += store.save_rates_history(history)
+        chunk_start = chunk_end + timedelta(days=1)
+    logger.info("Загружена история курсов %s: %s записей", currencies, saved)
+    return saved
+
+
+_store: Optional[MarketDataStore] = None
+_store_lock = threading.Lock()
+# Блокировка обновления хранилища; она же защищает _last_attempt
+_refresh_lock = threading.Lock()
+_last_attempt = 0.0
+
+
+def get_market_store() -> MarketDataStore:
+    """Функция возвращает общее для процесса хранилище (создается при первом обращении)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MarketDataStore()
+        return _store
+
+
+def _refresh_due() -> bool:
+    """Функция проверяет, прошло ли RETRY_INTERVAL с последней попытки обновления (вызывается под _refresh_lock)"""
+    return _last_attempt == 0.0 or time.monotonic() - _last_attempt >= RETRY_INTERVAL
+
+
+def _refresh_safely(store: MarketDataStore, currencies: list[str], stocks: list[str]) -> None:
+    """Функция обновляет хранилище (вызывается под _refresh_lock);
+    ошибка обновления не мешает показать сохраненные данные"""
+    global _last_attempt
+    _last_attempt = time.monotonic()
+    try:
+        refresh_market_data(store, currencies, stocks)
+    except Exception as error:
+        logger.error("Ошибка обновления хранилища курсов и котировок: %s", error)
+
+
+def _refresh_in_background(store: MarketDataStore, currencies: list[str], stocks: list[str]) -> None:
+    """Функция обновляет хранилище в фоновом потоке; _refresh_lock захватывает запустивший поток,
+    а освобождает эта функция по окончании обновления"""
+    try:
+        _refresh_safely(store, currencies, stocks)
+    finally:
+        _refresh_lock.release()
+
+
+def get_market_snapshot(
+    currencies: list[str], stocks: list[str], store: Optional[MarketDataStore] = None, max_age: float = MAX_AGE
+) -> tuple[list[dict], list[dict]]:
+    """Функция возвращает курсы валют и стоимость акций из хранилища.
+    Если по какой-то валюте или акции данных еще нет, хранилище обновляется сразу (не чаще раза в RETRY_INTERVAL);
+    устаревшие данные возвращаются сразу, а обновление выполняется в фоновом потоке — если оно еще не выполняется
+    и с последней попытки прошло RETRY_INTERVAL. Без сети возвращаются последние сохраненные значения."""
+    store = store or get_market_store()
+    fetched_at = store.last_fetched(currencies, stocks)
+    if fetched_at is None:
+        with _refresh_lock:
+            if _refresh_due():
+                _refresh_safely(store, currencies, stocks)
+    elif time.time() - fetched_at > max_age and _refresh_lock.acquire(blocking=False):
+        started = False
+        try:
+            if _refresh_due():
+                threading.Thread(
+                    target=_refresh_in_background, args=(store, currencies, stocks), name="market_refresh", daemon=True
+                ).start()
+                started = True
+        finally:
+            if not started:
+                _refresh_lock.release()
+    return store.latest_rates(currencies), store.latest_prices(stocks)
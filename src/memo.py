@@ -0,0 +1,244 @@
+"""Запоминание результатов отчетов.
+
+Ключ результата — имя функции и ее аргументы, вместо набора операций в ключ входит его отпечаток
+(хэш содержимого DataFrame и SpendDataset, версия хранилища операций, состояние агрегатов),
+вместо файла — его размер и время изменения. Поэтому изменение файла операций или user_settings.json
+делает старые результаты недоступными без явной очистки.
+Хэш DataFrame считается при каждом вызове: DataFrame может измениться на месте при тех же размерах.
+Результаты хранятся в памяти процесса (LRU с ограничением размера) и, если включено, на диске (data/cache/memo);
+изменяемые результаты (словари, списки) выдаются копиями.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+import pandas as pd
+
+import config
+from src.aggregates import CashbackRollup
+from src.dataset import SpendDataset
+from src.db_store import TransactionStore
+from src.logger import get_logger
+
+logger = get_logger("memo")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PATH_MEMO = config.PATH_DATA_CACHE / "memo"
+
+# Отпечатки подготовленных наборов трат: набор не изменяется, поэтому хэш считается один раз
+_dataset_fingerprints: "weakref.WeakKeyDictionary[SpendDataset, str]" = weakref.WeakKeyDictionary()
+
+
+class FileVersion:
+    """Версия файла для ключа результата: путь, размер и время изменения (файл не читается)"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def __repr__(self) -> str:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return f"FileVersion({self.path}, нет файла)"
+        return f"FileVersion({self.path}, {stat.st_size}, {stat.st_mtime_ns})"
+
+
+def frame_fingerprint(frame: pd.DataFrame) -> str:
+    """Функция возвращает хэш содержимого DataFrame (значения, индекс и названия столбцов)"""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(repr(list(frame.columns)).encode())
+    return digest.hexdigest()
+
+
+def fingerprint(value: Any) -> Optional[str]:
+    """Функция возвращает представление аргумента для ключа результата;
+    None — аргумент не поддерживается (например, итератор пакетов), результат не запоминается"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return repr(value)
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, FileVersion):
+        return repr(value)
+    if isinstance(value, SpendDataset):
+        if value not in _dataset_fingerprints:
+            _dataset_fingerprints[value] = frame_fingerprint(value.frame)
+        return f"SpendDataset({_dataset_fingerprints[value]})"
+    if isinstance(value, pd.DataFrame):
+        return f"DataFrame({frame_fingerprint(value)})"
+    if isinstance(value, TransactionStore):
+        return f"TransactionStore({value.path}, {value.version()})"
+    if isinstance(value, CashbackRollup):
+        return f"CashbackRollup({value.rows}, {value.digest})"
+    if isinstance(value, (list, tuple)):
+        items = [fingerprint(item) for item in value]
+        return None if None in items else f"({', '.join(items)})"  # type: ignore[arg-type]
+    return None
+
+
+def _detached(value: Any) -> Any:
+    """Функция возвращает копию изменяемого результата, неизменяемые значения (строки, числа) — как есть"""
+    return value if value is None or isinstance(value, (str, int, float, bool)) else copy.deepcopy(value)
+
+
+class Memo:
+    """Хранилище результатов: LRU в памяти процесса и необязательный уровень на диске.
+    Результаты должны сериализоваться в JSON (для уровня на диске). Хранятся и выдаются копии результатов,
+    поэтому изменение полученного результата вызывающим кодом не затрагивает запомненный."""
+
+    def __init__(self, maxsize: int = 128, path: Optional[Path] = None, disk_maxsize: int = 1024) -> None:
+        """
+        :param maxsize: максимальное число результатов в памяти
+        :param path: каталог для результатов на диске, None — только память
+        :param disk_maxsize: максимальное число файлов результатов на диске (удаляются самые старые)
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.disk_maxsize = disk_maxsize
+        self._data: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, function: str, counter: str) -> None:
+        stats = self._stats.setdefault(function, {"hits": 0, "disk_hits": 0, "misses": 0})
+        stats[counter] += 1
+
+    def get(self, function: str, key: str) -> tuple[bool, Any]:
+        """Метод возвращает (найден ли результат, результат); результат с диска переносится в память"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._count(function, "hits")
+                return True, _detached(self._data[key])
+        if self.path is not None:
+            try:
+                with open(self.path / f"{key}.json", "r", encoding="utf-8") as file:
+                    value = json.load(file)
+            except (OSError, ValueError):
+                pass
+            else:
+                with self._lock:
+                    self._count(function, "disk_hits")
+                self._remember(key, value)
+                return True, _detached(value)
+        with self._lock:
+            self._count(function, "misses")
+        return False, None
+
+    def _remember(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key: str, value: Any) -> None:
+        """Метод сохраняет результат в памяти и, если включен уровень на диске, в файл (через временный файл)"""
+        self._remember(key, _detached(value))
+        if self.path is None:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path / f"{key}.tmp{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(value, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path / f"{key}.json")
+            self._prune_disk()
+        except (OSError, TypeError, ValueError) as error:
+            logger.warning("Не удалось сохранить результат %s на диск: %s", key, error)
+
+    def _prune_disk(self) -> None:
+        """Метод удаляет самые старые файлы результатов сверх disk_maxsize"""
+        entries = [entry for entry in os.scandir(self.path) if entry.name.endswith(".json")]
+        if len(entries) <= self.disk_maxsize:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - self.disk_maxsize]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Метод очищает результаты в памяти и счетчики (файлы на диске не удаляются)"""
+        with self._lock:
+            self._data.clear()
+            self._stats.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Метод возвращает счетчики по функциям: hits (память), disk_hits (диск), misses (вычисление)"""
+        with self._lock:
+            return {function: dict(counters) for function, counters in self._stats.items()}
+
+
+def memoize(name: Optional[str] = None) -> Callable[[F], F]:
+    """Декоратор запоминает результат функции в общем хранилище get_memo().
+    Если какой-то аргумент не поддерживается fingerprint, функция просто вызывается."""
+
+    def decorator(function: F) -> F:
+        label = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            parts = [fingerprint(arg) for arg in args]
+            keywords = {keyword: fingerprint(value) for keyword, value in sorted(kwargs.items())}
+            if None in parts or None in keywords.values():
+                return function(*args, **kwargs)
+            parts += [f"{keyword}={part}" for keyword, part in keywords.items()]
+            key = hashlib.sha256(f"{label}({', '.join(parts)})".encode()).hexdigest()  # type: ignore[arg-type]
+            memo = get_memo()
+            found, value = memo.get(label, key)
+            if found:
+                logger.debug("Результат %s взят из запомненных", label)
+                return value
+            value = function(*args, **kwargs)
+            memo.set(key, value)
+            return value
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+_memo: Optional[Memo] = None
+_memo_lock = threading.Lock()
+
+
+def get_memo() -> Memo:
+    """Функция возвращает общее для процесса хранилище результатов.
+    Размер — config.MEMO_MAXSIZE, уровень на диске включается config.MEMO_DISK или переменной окружения MEMO_DISK=1"""
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            disk = os.environ.get("MEMO_DISK", "1" if config.MEMO_DISK else "0") == "1"
+            _memo = Memo(config.MEMO_MAXSIZE, PATH_MEMO if disk else None)
+        return _memo
+
+
+def memo_prometheus_text(prefix: str = "bank_memo") -> str:
+    """Функция возвращает счетчики запомненных результатов в текстовом формате Prometheus"""
+    stats = get_memo().stats()
+    lines = []
+    for counter, help_text in (
+        ("hits", "Результаты, найденные в памяти"),
+        ("disk_hits", "Результаты, найденные на диске"),
+        ("misses", "Результаты, вычисленные заново"),
+    ):
+        name = f"{prefix}_{counter}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for function in sorted(stats):
+            lines.append(f'{name}{{function="{function}"}} {stats[function][counter]}')
+    return "\n".join(lines) + "\n"
@@ -1,29 +1,50 @@
 import datetime
 import json
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterable, Optional
 
+import numpy as np
 import pandas as pd
 
 from config import PATH_DATA_REPORT
+from src.dataset import SpendingIndex, Transactions, as_spend_dataset, spending_index
+from src.db_store import TransactionStore
+from src.instrumentation import stage
 from src.logger import get_logger
+from src.memo import memoize
+from src.schema import amount_column
+from src.serialization import JSON_FORMATS, frame_to_json
+from src.streaming import fold_batches
+from src.writers import write_report
 
 logger = get_logger("reports")
 
+# Столбцы, которые нужны для отчета по категории (для потокового чтения iter_operations)
+REPORT_COLUMNS = ["Дата операции", "Статус", "Сумма платежа", "Категория"]
 
-def write_to_file(filename: str = "report.json") -> Callable:
+
+def write_to_file(
+    filename: str = "report.json", fmt: Optional[str] = None, unique: bool = False, background: bool = False
+) -> Callable:
     """Декоратор для записи данных отчета в файл
     Args:
         filename (str): Имя файла для записи отчета.
-        По умолчанию — "report.json"."""
+        По умолчанию — "report.json".
+        fmt (str): Формат отчета: json, ndjson, csv или parquet (см. src.writers),
+        по умолчанию определяется по расширению filename.
+        unique (bool): Добавлять к имени файла уникальный суффикс запуска,
+        чтобы параллельные запуски не перезаписывали отчеты друг друга.
+        background (bool): Записывать отчет в фоновом потоке.
+    Запись атомарная: отчет пишется во временный файл, который затем переименовывается."""
 
     def decorator(function: Callable) -> Callable:
         @wraps(function)
-        def wrapper(*args: tuple[Any, ...], **kwargs: dict[str, Any]) -> Any:
+        def wrapper(*args: tuple[Any, ...], to_file: bool = True, **kwargs: dict[str, Any]) -> Any:
+            """to_file=False — вернуть результат без записи в файл (для одиночных вызовов)"""
             # Получаем результат выполнения функции
             result = function(*args, **kwargs)  # Передаем filename аргументом явно
-            with open(PATH_DATA_REPORT / filename, "w", encoding="UTF-8") as file:
-                file.write(result)
+            if to_file:
+                write_report(result, PATH_DATA_REPORT / filename, fmt=fmt, unique=unique, background=background)
             return result
 
         return wrapper
@@ -31,43 +52,189 @@ def write_to_file(filename: str = "report.json") -> Callable:
     return decorator
 
 
-@write_to_file()  # В декоратор можно передать имя файла для записи данных
-def spending_by_category(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> str:
-    """Функция возвращает траты по заданной категории за последние три месяца (от переданной даты)"""
+def report_window(date: Optional[str] = None, months: int = 3) -> tuple[datetime.datetime, datetime.datetime]:
+    """Функция возвращает начало и конец периода отчета: months месяцев до переданной даты (по умолчанию — сейчас)"""
     if date:
         date_end = datetime.datetime.strptime(date, "%d.%m.%Y")
     else:
         date_end = datetime.datetime.now()
     logger.info("Определена начальная дата")
-    date_start = date_end - pd.DateOffset(months=3)
+    date_start = date_end - pd.DateOffset(months=months)
     logger.info("Определена конечная дата")
+    return date_start, date_end
 
-    # Фильтрация данных за последние 3 месяца
-    transactions_spend = transactions[(transactions["Сумма платежа"] < 0) & (transactions["Статус"] == "OK")]
-    logger.info("Данные отфильтрованы по 'Сумма платежа' и 'Статус'")
-    transactions_df_range = transactions_spend[
-        (transactions_spend["Дата операции"] >= date_start) & (transactions_spend["Дата операции"] <= date_end)
-    ]
-    logger.info(
-        f"Получены данные DataFrame за последние 3 месяца, размер данных DataFrame: {transactions_df_range.shape}"
-    )
-    # Добавляем фильтрацию по категории
-    transactions_df_category = transactions_df_range[transactions_df_range["Категория"] == category]
-    logger.info(f"Данные отфильтрованы по категории '{category}', размер: {transactions_df_category.shape}")
-    result_transactions_df_category = transactions_df_category[["Сумма платежа", "Категория"]]
+
+def category_spending(
+    transactions: Transactions, category: str, date_start: datetime.datetime, date_end: datetime.datetime
+) -> pd.DataFrame:
+    """Функция возвращает траты по категории за период с date_start по date_end включительно
+    в порядке строк исходных операций"""
+    if isinstance(transactions, TransactionStore):
+        transactions_df_category = transactions.category_spending(category, date_start, date_end)
+        logger.info("Траты по категории '%s' получены запросом к хранилищу операций", category)
+    else:
+        # Траты категории за период — непрерывный участок индекса трат (две границы бинарного поиска)
+        transactions_df_category = spending_index(transactions).rows(category, date_start, date_end)
+        logger.info("Данные отфильтрованы по категории '%s', размер: %s", category, transactions_df_category.shape)
+    # Выборка упорядочена по дате, отчет выводит траты в порядке исходного файла (по индексу строк)
+    return transactions_df_category.sort_index(kind="stable")
+
+
+def category_summary(
+    transactions: Transactions, category: str, date_start: datetime.datetime, date_end: datetime.datetime
+) -> dict[str, Any]:
+    """Функция возвращает итоги трат по категории за период с date_start по date_end включительно:
+    сумму, количество и траты по дням (по индексу трат, без выборки строк)"""
+    if isinstance(transactions, TransactionStore):
+        index = SpendingIndex(transactions.category_spending(category, date_start, date_end))
+    else:
+        index = spending_index(transactions)
+    total, count = index.total(category, date_start, date_end)
+    daily = index.daily(category, date_start, date_end)
+    logger.info("Посчитаны итоги трат по категории '%s': %s операций за %s дней", category, count, len(daily))
+    return {
+        "category": category,
+        "date_start": date_start.strftime("%d.%m.%Y"),
+        "date_end": date_end.strftime("%d.%m.%Y"),
+        "total": total,
+        "count": count,
+        "daily": [
+            {"date": day.strftime("%d.%m.%Y"), "total": day_total, "count": day_count}
+            for day, day_total, day_count in zip(daily["date"], daily["total"].tolist(), daily["count"].tolist())
+        ],
+    }
+
+
+@memoize()
+def category_report(
+    transactions: Transactions,
+    category: str,
+    date_start: datetime.datetime,
+    date_end: datetime.datetime,
+    summary: bool = False,
+    json_format: str = "records",
+) -> str:
+    """Функция возвращает JSON трат по категории за период с date_start по date_end включительно
+    (результат запоминается, см. src.memo)
+    :param summary: вернуть итоги (сумма, количество, траты по дням) вместо списка всех трат
+    :param json_format: формат списка трат (см. src.serialization.JSON_FORMATS); итоги в любом формате,
+    кроме records, выводятся в одну строку
+    """
+    if json_format not in JSON_FORMATS:
+        raise ValueError(f"Неизвестный формат JSON: {json_format}, ожидается один из {', '.join(JSON_FORMATS)}")
+    if summary:
+        result = category_summary(transactions, category, date_start, date_end)
+        if json_format == "records":
+            return json.dumps(result, ensure_ascii=False, indent=4)
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+    transactions_df_category = category_spending(transactions, category, date_start, date_end)
+    # Для пересчитанных операций (src.currency) в отчет добавляется сумма в рублях
+    columns = list(dict.fromkeys(["Сумма платежа", amount_column(transactions_df_category), "Категория"]))
+    result_transactions_df_category = transactions_df_category[columns]
     logger.info(
-        f"Данные отфильтрованы по столбцам 'Сумма платежа', 'Категория', размер: {result_transactions_df_category.shape}"
+        "Данные отфильтрованы по столбцам %s, размер: %s",
+        columns,
+        result_transactions_df_category.shape,
     )
 
-    # Преобразование в словарь и сериализация в JSON
-    result_dict = result_transactions_df_category.to_dict(orient="records")
-    logger.info("Данные сформированы в dict из DataFrame")
-
-    json_result = json.dumps(result_dict, ensure_ascii=False, indent=4)
+    # Сериализация в JSON напрямую из столбцов, без промежуточного списка словарей
+    json_result = frame_to_json(result_transactions_df_category, json_format)
     logger.debug("Успешно получены данные в формате json для выводя в консоль")
     return json_result
 
 
+@stage("spending_by_category")
+@write_to_file()  # В декоратор можно передать имя файла для записи данных
+def spending_by_category(
+    transactions: Transactions,
+    category: str,
+    date: Optional[str] = None,
+    months: int = 3,
+    summary: bool = False,
+    json_format: str = "records",
+) -> str:
+    """Функция возвращает траты по заданной категории за последние months месяцев (от переданной даты)
+    :param transactions: DataFrame с операциями или подготовленный набор трат SpendDataset
+    :param months: длина периода в месяцах (1, 3, 6, 12 и т.д.)
+    :param summary: вернуть итоги (сумма, количество, траты по дням) вместо списка всех трат
+    :param json_format: records (список трат с отступами), compact (в одну строку) или columns (по столбцам)
+    """
+    date_start, date_end = report_window(date, months)
+    # Отчет за период запоминается: повторный запрос с тем же набором операций не пересчитывается
+    return category_report(transactions, category, date_start, date_end, summary, json_format)
+
+
+@write_to_file()
+def spending_by_category_batches(batches: Iterable[pd.DataFrame], category: str, date: Optional[str] = None) -> str:
+    """Функция возвращает тот же JSON, что и spending_by_category, по пакетам строк (например, из iter_operations).
+    В памяти находятся один пакет и уже отобранные траты по категории."""
+    date_start, date_end = report_window(date)
+    parts: list[pd.DataFrame] = fold_batches(
+        batches,
+        lambda batch: [category_spending(batch, category, date_start, date_end)[REPORT_COLUMNS]],
+        lambda accumulated, partial: accumulated + partial,
+        [],
+    )
+    transactions_df_category = pd.concat(parts) if parts else pd.DataFrame(columns=REPORT_COLUMNS)
+    # Пакеты идут в порядке файла, траты внутри пакета — тоже, поэтому порядок как в spending_by_category
+    result_transactions_df_category = transactions_df_category[["Сумма платежа", "Категория"]]
+    logger.info("Траты по пакетам отобраны, строк: %s", len(result_transactions_df_category))
+    return frame_to_json(result_transactions_df_category)
+
+
+def category_window_totals(
+    transactions: Transactions,
+    categories: list[str],
+    dates_end: pd.DatetimeIndex,
+    months: int = 3,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Функция считает сумму и количество трат для всех пар (категория, конец окна) по индексу трат:
+    границы каждого окна находятся бинарным поиском внутри блока категории,
+    сумма за окно — разность двух накопленных сумм (см. SpendingIndex)
+    :param transactions: DataFrame с операциями или подготовленный набор трат SpendDataset
+    :param categories: категории
+    :param dates_end: концы окон (включительно), окно — months месяцев до конца
+    :param months: длина окна в месяцах
+    :return: массивы сумм и количеств трат формы (категории, окна)
+    """
+    totals, counts = spending_index(transactions).windows(categories, dates_end, months)
+    logger.debug("Посчитаны траты для %s категорий и %s окон", len(categories), len(dates_end))
+    return totals, counts
+
+
+@write_to_file("report_batch.json")
+def spending_by_categories(
+    transactions: Transactions, dates: list[str], categories: Optional[list[str]] = None, months: int = 3
+) -> str:
+    """Функция возвращает единый отчет с суммой и количеством трат по каждой категории
+    за months месяцев до каждой из переданных дат
+    :param transactions: DataFrame с операциями или подготовленный набор трат SpendDataset
+    :param dates: концы окон в формате "DD.MM.YYYY"
+    :param categories: категории, по умолчанию — все категории, по которым были траты
+    :param months: длина окна в месяцах
+    :return: JSON-список записей {"date", "category", "total", "count"}
+    """
+    dataset = as_spend_dataset(transactions)
+    if categories is None:
+        categories = sorted(spending_index(dataset).categories.dropna())
+    dates_end = pd.DatetimeIndex([datetime.datetime.strptime(date, "%d.%m.%Y") for date in dates])
+    totals, counts = category_window_totals(dataset, categories, dates_end, months)
+
+    result = [
+        {
+            "date": date,
+            "category": category,
+            "total": round(float(totals[category_index, date_index]), 2),
+            "count": int(counts[category_index, date_index]),
+        }
+        for date_index, date in enumerate(dates)
+        for category_index, category in enumerate(categories)
+    ]
+    logger.info("Сформирован отчет по %s категориям и %s датам", len(categories), len(dates))
+    return json.dumps(result, ensure_ascii=False)
+
+
 # if __name__ == "__main__":
 #     data_df = read_excel("operations.xlsx")
 #     print(spending_by_category(data_df, 'Супермаркеты', "18.04.2025"))
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import stage
+from src.logger import get_logger
+
+logger = get_logger("schema")
+
+# Текстовые столбцы с небольшим числом различных значений хранятся как category:
+# строка хранится один раз, а сравнение "==" выполняется по целочисленным кодам
+CATEGORY_COLUMNS = ["Номер карты", "Статус", "Валюта операции", "Валюта платежа", "Категория", "Описание"]
+# Денежные столбцы (точность — копейки)
+AMOUNT_COLUMNS = ["Сумма операции", "Сумма платежа", "Кэшбэк", "Сумма операции с округлением"]
+# Сумма платежа в рублях по курсу на дату операции (добавляется src.currency.add_rub_amounts)
+RUB_AMOUNT_COLUMN = "Сумма платежа в рублях"
+# Форматы дат выгрузки операций
+DATE_FORMATS = {"Дата операции": "%d.%m.%Y %H:%M:%S", "Дата платежа": "%d.%m.%Y"}
+
+
+def parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+    """Функция разбирает даты по явному формату. Каждое различное значение разбирается один раз:
+    миллионы операций выгрузки приходятся на небольшое число различных дат.
+    Значения в другом формате разбираются по остальным форматам DATE_FORMATS, затем с dayfirst=True;
+    значения, которые не удалось разобрать, становятся NaT (см. normalize_dates)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    unique_values = pd.Series(uniques, dtype=object)
+    parsed = pd.to_datetime(unique_values, format=date_format, errors="coerce")
+    for fallback_format in dict.fromkeys(DATE_FORMATS.values()):
+        unparsed = parsed.isna()
+        if not unparsed.any():
+            break
+        if fallback_format != date_format:
+            parsed[unparsed] = pd.to_datetime(unique_values[unparsed], format=fallback_format, errors="coerce")
+    unparsed = parsed.isna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(unique_values[unparsed], dayfirst=True, errors="coerce")
+    # Код -1 (пропуск) выбирает последний элемент — добавленный NaT
+    dates = np.append(parsed.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    return pd.Series(dates.take(codes), index=values.index, name=values.name)
+
+
+@stage()
+def normalize_dates(operations_df: pd.DataFrame) -> dict[str, pd.Series]:
+    """Функция разбирает столбцы дат выгрузки операций (DATE_FORMATS) в datetime64.
+    Количество значений, которые не удалось разобрать, записывается в operations_df.attrs["invalid_dates"]
+    и в лог (с примерами значений)
+    :return: dict столбец -> разобранные даты (исходный DataFrame не изменяется)
+    """
+    parsed_columns = {}
+    invalid_dates = {}
+    for column in operations_df.columns.intersection(list(DATE_FORMATS)):
+        values = operations_df[column]
+        parsed = parse_dates(values, DATE_FORMATS[column])
+        invalid = parsed.isna() & values.notna()
+        if invalid.any():
+            invalid_dates[column] = int(invalid.sum())
+            logger.warning(
+                "Столбец '%s': не удалось разобрать дат: %s, например: %s",
+                column,
+                invalid_dates[column],
+                values[invalid].unique()[:5].tolist(),
+            )
+        parsed_columns[column] = parsed
+    operations_df.attrs["invalid_dates"] = invalid_dates
+    return parsed_columns
+
+
+def amount_column(operations_df: pd.DataFrame) -> str:
+    """Функция возвращает столбец суммы для агрегатов: сумма в рублях, если операции пересчитаны, иначе сумма платежа"""
+    return RUB_AMOUNT_COLUMN if RUB_AMOUNT_COLUMN in operations_df.columns else "Сумма платежа"
+
+
+def to_kopecks(amounts: pd.Series) -> pd.Series:
+    """Функция переводит суммы в рублях в целое число копеек (Int64, пропуски сохраняются)"""
+    return (amounts * 100).round().astype("Int64")
+
+
+def from_kopecks(amounts: pd.Series) -> pd.Series:
+    """Функция переводит суммы в копейках обратно в рубли (float64)"""
+    return amounts.astype("Float64").div(100).astype("float64")
+
+
+def amounts_to_kopecks(operations_df: pd.DataFrame) -> pd.DataFrame:
+    """Функция переводит денежные столбцы (AMOUNT_COLUMNS) в копейки (изменяет переданный DataFrame)"""
+    for column in operations_df.columns.intersection(AMOUNT_COLUMNS):
+        operations_df[column] = to_kopecks(operations_df[column])
+    return operations_df
+
+
+def apply_schema(operations_df: pd.DataFrame, amounts_in_kopecks: bool = False) -> pd.DataFrame:
+    """Функция приводит столбцы выгрузки операций к компактным типам (изменяет переданный DataFrame)
+    :param operations_df: DataFrame, прочитанный из выгрузки операций
+    :param amounts_in_kopecks: хранить денежные столбцы целым числом копеек (Int64) вместо float64 в рублях
+    :return: тот же DataFrame
+    """
+    for column in operations_df.columns.intersection(CATEGORY_COLUMNS):
+        operations_df[column] = operations_df[column].astype("category")
+    if amounts_in_kopecks:
+        amounts_to_kopecks(operations_df)
+    logger.debug("Применена схема типов, размер данных DataFrame: %s", operations_df.shape)
+    return operations_df
+
+
+def memory_report(usage_before: pd.Series, usage_after: pd.Series) -> pd.DataFrame:
+    """Функция сравнивает объем памяти по столбцам до и после применения схемы
+    :param usage_before: результат DataFrame.memory_usage(deep=True) до применения схемы
+    :param usage_after: результат DataFrame.memory_usage(deep=True) после применения схемы
+    :return: DataFrame со столбцами before, after (байты) и saved (доля сэкономленной памяти), строка "Итого"
+    """
+    report = pd.DataFrame({"before": usage_before, "after": usage_after})
+    report.loc["Итого"] = report.sum()
+    report["saved"] = (1 - report["after"] / report["before"]).round(3)
+    return report
@@ -0,0 +1,164 @@
+"""Сериализация таблиц в JSON напрямую из столбцов, без промежуточного списка словарей.
+
+to_dict(orient="records") создает по словарю и по объекту на каждую ячейку, и все они живут
+до конца json.dumps. Здесь каждый столбец кодируется в строки JSON один раз (повторяющиеся
+значения — категории, описания — кодируются по одному разу на значение), а строки записей
+собираются по шаблону пакетами по CHUNK_ROWS строк, поэтому одновременно в памяти находятся
+только закодированный пакет и готовый результат.
+
+Форматы (JSON_FORMATS):
+- records — список записей с отступом 4, байт в байт как json.dumps(to_dict("records"), indent=4);
+- compact — тот же список записей без пробелов и переводов строк;
+- columns — {"столбец": [значения]}; числовые столбцы кодируются orjson прямо из массивов numpy
+  (если orjson установлен), без создания объектов Python на каждое значение.
+"""
+
+import json
+import math
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость, без нее используется стандартный json
+    orjson = None  # type: ignore[assignment]
+
+logger = get_logger("serialization")
+
+JSON_FORMATS = ("records", "compact", "columns")
+# Число строк, кодируемых за один шаг
+CHUNK_ROWS = 65_536
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _float(value: float) -> str:
+    """Функция кодирует float так же, как json.dumps (NaN, Infinity, -Infinity для особых значений)"""
+    if math.isfinite(value):
+        return float.__repr__(value)
+    if value != value:
+        return "NaN"
+    return "Infinity" if value > 0 else "-Infinity"
+
+
+def _scalar(value: Any) -> str:
+    """Функция кодирует отдельное значение; пропуски pandas (pd.NA, NaT) кодируются как null"""
+    if value is pd.NA or value is pd.NaT:
+        return "null"
+    return _dumps(value)
+
+
+def _encode_repeated(values: list, encode: Callable[[Any], str]) -> list[str]:
+    """Функция кодирует значения, кодируя каждое повторяющееся значение один раз"""
+    cache: dict = {}
+    result = []
+    for value in values:
+        try:
+            encoded = cache.get(value)
+        except TypeError:  # нехешируемое значение (список, словарь)
+            result.append(encode(value))
+            continue
+        if encoded is None:
+            encoded = cache[value] = encode(value)
+        result.append(encoded)
+    return result
+
+
+def encode_column(values: pd.Series) -> list[str]:
+    """Функция кодирует столбец в список строк JSON — значения, которые дал бы json.dumps
+    для элементов to_dict(orient="records")"""
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Категории кодируются по одному разу, пропуск (код -1) — последний элемент, как NaN в to_dict
+        categories = [_scalar(value) for value in dtype.categories.tolist()] + ["NaN"]
+        return [categories[code] for code in values.cat.codes.tolist()]
+    if isinstance(dtype, np.dtype):
+        if dtype.kind == "f":
+            return list(map(_float, values.to_numpy().tolist()))
+        if dtype.kind in "iu":
+            return list(map(int.__repr__, values.to_numpy().tolist()))
+        if dtype.kind == "b":
+            return ["true" if value else "false" for value in values.to_numpy().tolist()]
+    return _encode_repeated(values.tolist(), _scalar)
+
+
+def _layout(indent: Optional[int], compact: bool) -> tuple[str, str, str, str, str]:
+    """Функция возвращает разделители как у json.dumps:
+    (начало списка, между записями, конец списка, между полями, ключ-значение)"""
+    if indent is None:
+        item, key = (",", ":") if compact else (", ", ": ")
+        return "[", item, "]", item, key
+    row_break = "\n" + " " * indent
+    field_break = "\n" + " " * (2 * indent)
+    return "[" + row_break, "," + row_break, "\n]", "," + field_break, ": "
+
+
+def frame_to_json(frame: pd.DataFrame, json_format: str = "records", indent: Optional[int] = 4) -> str:
+    """Функция кодирует DataFrame в JSON из столбцов, без to_dict(orient="records")
+    :param json_format: records (список записей), compact (список записей без пробелов) или columns
+    :param indent: отступ для формата records, None — в одну строку
+    """
+    if json_format not in JSON_FORMATS:
+        raise ValueError(f"Неизвестный формат JSON: {json_format}, ожидается один из {', '.join(JSON_FORMATS)}")
+    if json_format == "columns":
+        return columns_json(frame)
+    compact = json_format == "compact"
+    if compact:
+        indent = None
+    if frame.empty:
+        # Нет строк или столбцов: остаются только пустые записи, их кодирует стандартный json
+        separators = (",", ":") if compact else None
+        return json.dumps([{}] * len(frame), ensure_ascii=False, indent=indent, separators=separators)
+
+    list_open, row_sep, list_close, field_sep, key_sep = _layout(indent, compact)
+    keys = [_dumps(str(column)).replace("{", "{{").replace("}", "}}") for column in frame.columns]
+    row_open = "{{" if indent is None else "{{\n" + " " * (2 * indent)
+    row_close = "}}" if indent is None else "\n" + " " * indent + "}}"
+    # Шаблон записи для str.format: ключи уже закодированы, подставляются только значения
+    template = row_open + field_sep.join(f"{key}{key_sep}{{}}" for key in keys) + row_close
+
+    chunks = []
+    for start in range(0, len(frame), CHUNK_ROWS):
+        chunk = frame.iloc[start : start + CHUNK_ROWS]
+        encoded = [encode_column(chunk.iloc[:, position]) for position in range(len(keys))]
+        chunks.append(row_sep.join(map(template.format, *encoded)))
+    logger.debug("Закодировано в JSON %s строк, %s столбцов", len(frame), len(keys))
+    return list_open + row_sep.join(chunks) + list_close
+
+
+def columns_json(frame: pd.DataFrame) -> str:
+    """Функция кодирует DataFrame в компактный JSON по столбцам {"столбец": [значения]}.
+    С orjson числовые столбцы без пропусков передаются кодировщику массивами numpy"""
+    if orjson is None:
+        lists = {str(column): frame[column].tolist() for column in frame.columns}
+        return json.dumps(lists, ensure_ascii=False, separators=(",", ":"))
+    data: dict[str, Any] = {}
+    for column in frame.columns:
+        values = frame[column]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iufb" and not values.isna().any():
+            data[str(column)] = values.to_numpy()
+        else:
+            # Строки и столбцы с пропусками: пропуски кодируются как null
+            data[str(column)] = values.astype(object).where(values.notna(), None).tolist()
+    return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+
+
+def series_to_json(series: pd.Series, indent: Optional[int] = 4) -> str:
+    """Функция кодирует Series в JSON-объект {индекс: значение} — как json.dumps(dict(zip(index, values)))"""
+    if not series.index.is_unique or not all(isinstance(key, str) for key in series.index):
+        return json.dumps(dict(zip(series.index, series.tolist())), ensure_ascii=False, indent=indent)
+    if series.empty:
+        return "{}"
+    if indent is None:
+        open_, field_sep, close = "{", ", ", "}"
+    else:
+        open_, field_sep, close = "{\n" + " " * indent, ",\n" + " " * indent, "\n}"
+    keys = [_dumps(key) for key in series.index]
+    values = encode_column(series)
+    return open_ + field_sep.join(f"{key}: {value}" for key, value in zip(keys, values)) + close
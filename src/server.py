@@ -0,0 +1,162 @@
+import argparse
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from config import PATH_DATA_FILE
+from src.aggregates import CashbackRollup, load_cashback_rollup
+from src.dataset import SpendDataset
+from src.instrumentation import prometheus_text
+from src.logger import get_logger
+from src.memo import memo_prometheus_text
+from src.reports import spending_by_category
+from src.services import profitable_cashback
+from src.utils import get_current_date_time, read_excel
+from src.views import get_result_main_page
+
+logger = get_logger("server")
+
+# Формат параметра date для страницы 'Главная'
+MAIN_PAGE_DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+
+class DatasetHolder:
+    """Загруженные в память операции: набор трат и помесячные агрегаты кешбэка.
+    Файл перечитывается только после его изменения (по mtime и размеру)."""
+
+    def __init__(self, filename: str = "operations.xlsx", loader: Callable[[str], pd.DataFrame] = read_excel) -> None:
+        """
+        :param filename: файл операций (относительно каталога data)
+        :param loader: функция чтения файла операций
+        """
+        self.filename = filename
+        self.loader = loader
+        self._key: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.spend: Optional[SpendDataset] = None
+        self.rollup: Optional[CashbackRollup] = None
+
+    def _source_key(self) -> tuple[int, int]:
+        stat = (PATH_DATA_FILE / self.filename).stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> tuple[SpendDataset, CashbackRollup]:
+        """Метод возвращает набор трат и агрегаты, при изменении файла предварительно перечитывает его"""
+        key = self._source_key()
+        with self._lock:
+            if key != self._key or self.spend is None or self.rollup is None:
+                logger.info("Загрузка файла операций %s", self.filename)
+                transactions = self.loader(self.filename)
+                self.spend = SpendDataset(transactions)
+                self.rollup = load_cashback_rollup(self.filename, transactions)
+                self._key = key
+            return self.spend, self.rollup
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP-запросов:
+    /main?date=DD.MM.YYYY HH:MM:SS — страница 'Главная' (по умолчанию — текущие дата и время),
+    с параметром timings=1 ответ содержит замеры этапов;
+    /cashback?year=YYYY&month=MM — выгодные категории повышенного кешбэка;
+    /report?category=...&date=DD.MM.YYYY — траты по категории за три месяца
+    (format=compact — в одну строку, format=columns — по столбцам);
+    /metrics — метрики этапов и счетчики запомненных результатов в текстовом формате Prometheus;
+    /health — проверка работоспособности."""
+
+    holder: DatasetHolder
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/main":
+                spend, _ = self.holder.get()
+                date = (
+                    datetime.strptime(params["date"], MAIN_PAGE_DATE_FORMAT)
+                    if "date" in params
+                    else get_current_date_time()
+                )
+                body = get_result_main_page(date, spend, timings=params.get("timings") == "1")
+            elif url.path == "/cashback":
+                _, rollup = self.holder.get()
+                body = profitable_cashback(rollup, int(params["year"]), int(params["month"]))
+            elif url.path == "/report":
+                spend, _ = self.holder.get()
+                body = spending_by_category(
+                    spend,
+                    params["category"],
+                    params.get("date"),
+                    months=int(params.get("months", 3)),
+                    summary=params.get("summary") == "1",
+                    json_format=params.get("format", "records"),
+                    to_file=False,
+                )
+            elif url.path == "/metrics":
+                metrics = prometheus_text() + memo_prometheus_text()
+                self._send(200, metrics, "text/plain; version=0.0.4; charset=utf-8")
+                return
+            elif url.path == "/health":
+                body = json.dumps({"status": "ok"})
+            else:
+                self._send(404, json.dumps({"error": f"Неизвестный адрес: {url.path}"}, ensure_ascii=False))
+                return
+        except (KeyError, ValueError) as error:
+            self._send(400, json.dumps({"error": f"Некорректный параметр запроса: {error}"}, ensure_ascii=False))
+            return
+        except Exception as error:
+            logger.error("Ошибка при обработке запроса %s: %s", self.path, error)
+            self._send(500, json.dumps({"error": "Внутренняя ошибка сервера"}, ensure_ascii=False))
+            return
+        self._send(200, body)
+
+    def _send(self, status: int, body: str, content_type: str = "application/json; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def create_server(
+    host: str = "127.0.0.1", port: int = 8000, holder: Optional[DatasetHolder] = None
+) -> ThreadingHTTPServer:
+    """Функция создает HTTP-сервер; файл операций загружается при создании и остается в памяти
+    :param host: адрес
+    :param port: порт (0 — любой свободный)
+    :param holder: загруженные операции, по умолчанию — data/operations.xlsx
+    """
+    holder = holder or DatasetHolder()
+    holder.get()
+    handler = type("BoundApiHandler", (ApiHandler,), {"holder": holder})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Запуск сервера: python -m src.server --port 8000"""
+    parser = argparse.ArgumentParser(description="Локальный HTTP API анализа банковских операций")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--file", default="operations.xlsx", help="файл операций в каталоге data")
+    args = parser.parse_args(argv)
+    server = create_server(args.host, args.port, DatasetHolder(args.file))
+    logger.info("Сервер запущен: http://%s:%s", args.host, server.server_port)
+    print(f"Сервер запущен: http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
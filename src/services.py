@@ -1,47 +1,157 @@
 import calendar
 import datetime
-import json
+from typing import Iterable, Optional, Union
 
-from pandas import DataFrame
+import pandas as pd
 
+from src.aggregates import CashbackRollup
+from src.anomalies import OUTLIER_MONTHS, OUTLIER_THRESHOLD, RECURRING_HISTORY, find_outliers, find_recurring
+from src.cashback_plan import BASE_RATE, BOOST_RATE, LOOKBACK, PICKS, cashback_plan
+from src.dataset import Transactions, as_spend_dataset
+from src.db_store import TransactionStore
+from src.instrumentation import stage
 from src.logger import get_logger
-from src.utils import read_excel
+from src.memo import memoize
+from src.serialization import frame_to_json, series_to_json
+from src.streaming import fold_batches
 
 logger = get_logger("services")
 
+# Столбцы, которые нужны для расчета кешбэка (для потокового чтения iter_operations)
+CASHBACK_COLUMNS = ["Дата операции", "Статус", "Сумма платежа", "Кэшбэк", "Категория"]
 
-def profitable_cashback(data: DataFrame, year: int, month: int) -> str:
-    """Функция выдает JSON с анализом, сколько на каждой категории можно заработать кешбэка в указанном месяце года"""
+
+def cashback_by_category(data: Transactions, year: int, month: int) -> pd.Series:
+    """Функция возвращает Series с суммой кешбэка по категориям за указанный месяц года"""
     date_start = datetime.datetime(year, month, day=1)
     logger.info("Определена начальная дата")
     last_day = calendar.monthrange(year, month)
-    date_end = datetime.datetime(year, month, day=last_day[-1])
+    date_end = datetime.datetime(year, month, day=last_day[-1]) + datetime.timedelta(days=1)
     logger.info("Определена конечная дата")
 
-    # Фильтрация данных за определенный месяц и год
-    transactions_spend = data[(data["Сумма платежа"] < 0) & (data["Статус"] == "OK")]
-    logger.info("Данные отфильтрованы по 'Сумма платежа' и 'Статус'")
-    transactions_df_range = transactions_spend[
-        (transactions_spend["Дата операции"] >= date_start) & (transactions_spend["Дата операции"] <= date_end)
-    ]
+    if isinstance(data, TransactionStore):
+        cashback_series = data.cashback_by_category(date_start, date_end)
+        logger.info("Кешбэк по категориям получен агрегатным запросом к хранилищу операций")
+        return cashback_series
+
+    # Фильтрация данных за определенный месяц и год (весь последний день месяца включительно)
+    transactions_df_range = as_spend_dataset(data).between(date_start, date_end, include_end=False)
     logger.debug(
-        f"Успешно получены данные DataFrame за указанный месяц года, размер данных DataFrame: {transactions_df_range.shape}"
+        "Успешно получены данные DataFrame за указанный месяц года, размер данных DataFrame: %s",
+        transactions_df_range.shape,
     )
-    df_transactions_by_categories = (
-        transactions_df_range[["Кэшбэк", "Категория"]].groupby("Категория").sum().reset_index()
+    cashback_series = (
+        transactions_df_range[["Кэшбэк", "Категория"]].groupby("Категория", observed=True)["Кэшбэк"].sum()
     )
     logger.info("Данные отфильтрованы по 'Категория' и 'Кэшбэк'")
+    return cashback_series
 
-    result_dict = dict(
-        zip(df_transactions_by_categories["Категория"], df_transactions_by_categories["Кэшбэк"].values.tolist())
-    )
-    logger.info("Данные сформированы в dict из DataFrame")
-    json_result = json.dumps(result_dict, ensure_ascii=False, indent=4)
+
+def cashback_to_json(cashback_series: pd.Series) -> str:
+    """Функция кодирует кешбэк по категориям в JSON. Суммы округляются до копеек: результат не зависит
+    от порядка суммирования (по всем строкам, по пакетам или по помесячным агрегатам)"""
+    return series_to_json(cashback_series.astype(float).round(2))
+
+
+@stage()
+@memoize()
+def profitable_cashback(data: Union[Transactions, CashbackRollup], year: int, month: int) -> str:
+    """Функция выдает JSON с анализом, сколько на каждой категории можно заработать кешбэка в указанном месяце года
+    :param data: DataFrame с операциями, подготовленный набор трат SpendDataset
+    или помесячные агрегаты CashbackRollup (тогда результат берется из готовых агрегатов без фильтрации)
+    """
+    if isinstance(data, CashbackRollup):
+        result_dict = data.cashback((year, month))
+        logger.info("Данные получены из помесячных агрегатов")
+        return cashback_to_json(pd.Series(result_dict, dtype=float))
+
+    cashback_series = cashback_by_category(data, year, month)
+    json_result = cashback_to_json(cashback_series)
     logger.debug("Успешно получены данные в формате json для выводя в консоль")
     # return result_dict
     return json_result
 
 
+def profitable_cashback_period(
+    data: CashbackRollup, start_year: int, start_month: int, end_year: int, end_month: int
+) -> str:
+    """Функция выдает JSON с кешбэком по категориям за период из нескольких месяцев (квартал, год),
+    суммируя готовые помесячные агрегаты"""
+    result_dict = data.cashback((start_year, start_month), (end_year, end_month))
+    logger.info("Получен кешбэк по категориям за период %02d.%s–%02d.%s", start_month, start_year, end_month, end_year)
+    return cashback_to_json(pd.Series(result_dict, dtype=float))
+
+
+def profitable_cashback_batches(batches: Iterable[pd.DataFrame], year: int, month: int) -> str:
+    """Функция выдает тот же JSON, что и profitable_cashback, по пакетам строк (например, из iter_operations):
+    кешбэк считается по каждому пакету и суммируется, в памяти находится только один пакет"""
+    cashback_series = fold_batches(
+        batches,
+        lambda batch: cashback_by_category(batch, year, month),
+        lambda accumulated, partial: accumulated.add(partial, fill_value=0),
+        pd.Series(dtype=float),
+    ).sort_index()
+    logger.info("Кешбэк по пакетам посчитан для %s категорий", len(cashback_series))
+    return cashback_to_json(cashback_series)
+
+
+@stage()
+@memoize()
+def recommended_cashback(
+    data: Transactions,
+    year: int,
+    month: int,
+    k: int = PICKS,
+    lookback: int = LOOKBACK,
+    boost_rate: float = BOOST_RATE,
+    base_rate: float = BASE_RATE,
+    cap: Optional[float] = None,
+) -> str:
+    """Функция выдает JSON с k категориями повышенного кешбэка для каждой карты на указанный месяц года:
+    ожидаемые траты (среднемесячные за lookback предыдущих месяцев) и ожидаемая выгода от повышенной ставки;
+    для прошедших месяцев — выгода при фактических тратах (см. src.cashback_plan)
+    :param boost_rate: повышенная ставка кешбэка
+    :param base_rate: обычная ставка кешбэка
+    :param cap: ограничение повышенного кешбэка по категории за месяц
+    """
+    result = cashback_plan(
+        data, [pd.Period(year=year, month=month, freq="M")], k, lookback, boost_rate, base_rate, cap
+    )
+    logger.info("Выбраны категории кешбэка на %02d.%s для %s карт", month, year, result["account"].nunique())
+    # Для месяца за пределами истории фактической выгоды нет: null вместо NaN
+    actual_gain = result["actual_gain"]
+    result["actual_gain"] = actual_gain.astype(object).where(actual_gain.notna(), None)
+    return frame_to_json(result.drop(columns="month"))
+
+
+@stage()
+@memoize()
+def recurring_payments(data: Transactions, history: int = RECURRING_HISTORY) -> str:
+    """Функция выдает JSON с регулярными платежами (подписки, коммунальные услуги): описание, карта, период,
+    типичная сумма и дата следующего платежа (см. src.anomalies.find_recurring)
+    :param data: DataFrame с операциями, подготовленный набор трат SpendDataset или хранилище операций
+    :param history: число последних операций по описанию и карте, по которым оценивается регулярность
+    """
+    result = find_recurring(as_spend_dataset(data).frame, history)
+    logger.info("Найдено регулярных платежей: %s", len(result))
+    return frame_to_json(result)
+
+
+@stage()
+@memoize()
+def transaction_outliers(
+    data: Transactions, months: int = OUTLIER_MONTHS, threshold: float = OUTLIER_THRESHOLD
+) -> str:
+    """Функция выдает JSON с тратами, необычно большими для своей категории или карты по сравнению
+    с тратами за предыдущие months месяцев (см. src.anomalies.find_outliers)
+    :param data: DataFrame с операциями, подготовленный набор трат SpendDataset или хранилище операций
+    :param threshold: порог робастного отклонения (в единицах 1.4826 * MAD)
+    """
+    result = find_outliers(as_spend_dataset(data).frame, months, threshold)
+    logger.info("Найдено необычных трат: %s", len(result))
+    return frame_to_json(result)
+
+
 # if __name__ == "__main__":
 #     data_df = read_excel("operations.xlsx")
 #     print(profitable_cashback(data_df, 2025, 3))
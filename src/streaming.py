@@ -0,0 +1,96 @@
+from functools import reduce
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+import openpyxl
+import pandas as pd
+
+from config import PATH_DATA_FILE
+from src.logger import get_logger
+from src.schema import normalize_dates
+
+logger = get_logger("streaming")
+
+T = TypeVar("T")
+
+# Размер пакета строк по умолчанию
+BATCH_SIZE = 50_000
+# Числовые столбцы выгрузки операций
+NUMERIC_COLUMNS = [
+    "Сумма операции",
+    "Сумма платежа",
+    "Кэшбэк",
+    "MCC",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+
+
+def _typed_batch(batch: pd.DataFrame) -> pd.DataFrame:
+    """Функция приводит типы столбцов пакета так же, как read_excel"""
+    for column in batch.columns.intersection(NUMERIC_COLUMNS):
+        batch[column] = pd.to_numeric(batch[column], errors="coerce")
+    for column, parsed in normalize_dates(batch).items():
+        batch[column] = parsed
+    return batch
+
+
+def _iter_xlsx(path: str, columns: Optional[list[str]], batch_size: int) -> Iterator[pd.DataFrame]:
+    """Функция читает xlsx построчно (openpyxl в режиме read_only) и возвращает пакеты строк"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        names = header if columns is None else columns
+        missing = set(names) - set(header)
+        if missing:
+            raise KeyError(f"В файле {path} нет столбцов: {sorted(missing)}")
+        positions = [header.index(name) for name in names]
+        batch: list[list] = []
+        for row in rows:
+            batch.append([row[position] for position in positions])
+            if len(batch) == batch_size:
+                yield _typed_batch(pd.DataFrame(batch, columns=names))
+                batch = []
+        if batch:
+            yield _typed_batch(pd.DataFrame(batch, columns=names))
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path: str, columns: Optional[list[str]], batch_size: int) -> Iterator[pd.DataFrame]:
+    """Функция читает csv частями по batch_size строк"""
+    with pd.read_csv(path, usecols=columns, chunksize=batch_size) as reader:
+        for batch in reader:
+            yield _typed_batch(batch if columns is None else batch[columns])
+
+
+def iter_operations(
+    filename: str, columns: Optional[list[str]] = None, batch_size: int = BATCH_SIZE
+) -> Iterator[pd.DataFrame]:
+    """Функция читает файл операций (xlsx или csv) пакетами, не загружая его целиком в память
+    :param filename: путь к файлу операций (относительно каталога data)
+    :param columns: столбцы, нужные для анализа, по умолчанию читаются все
+    :param batch_size: количество строк в пакете
+    :return: итератор DataFrame с типизированными столбцами ("Дата операции" — datetime, суммы — float)
+    """
+    path = PATH_DATA_FILE / filename
+    reader = _iter_csv if path.suffix.lower() == ".csv" else _iter_xlsx
+    batches = 0
+    for batch in reader(str(path), columns, batch_size):
+        batches += 1
+        yield batch
+    logger.debug("Файл %s прочитан пакетами, количество пакетов: %s", filename, batches)
+
+
+def fold_batches(
+    batches: Iterable[pd.DataFrame], map_batch: Callable[[pd.DataFrame], T], merge: Callable[[T, T], T], initial: T
+) -> T:
+    """Функция сворачивает пакеты строк: map_batch считает частичный результат по пакету,
+    merge объединяет его с накопленным. В памяти одновременно находится только один пакет.
+    :param batches: пакеты строк (например, из iter_operations)
+    :param map_batch: функция частичного расчета по пакету
+    :param merge: функция объединения двух частичных результатов
+    :param initial: начальное значение (результат для пустых данных)
+    """
+    return reduce(lambda accumulated, batch: merge(accumulated, map_batch(batch)), batches, initial)
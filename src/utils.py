@@ -1,22 +1,43 @@
+import logging
 import os
 from datetime import datetime
+from functools import lru_cache
+from typing import Any, Optional
 
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 
 from config import PATH_DATA_FILE
+from src.cache import read_cached_frame, write_cached_frame
+from src.dataset import SpendDataset, Transactions, as_spend_dataset
+from src.db_store import TransactionStore
+from src.instrumentation import stage
 from src.logger import get_logger
-
-load_dotenv()
+from src.schema import DATE_FORMATS, amount_column, amounts_to_kopecks, apply_schema, memory_report, normalize_dates
 
 logger = get_logger("utils")
 
+CURRENCY_RATE_URL = "https://api.apilayer.com/exchangerates_data/convert"
+CURRENCY_LATEST_URL = "https://api.apilayer.com/exchangerates_data/latest"
+CURRENCY_TIMESERIES_URL = "https://api.apilayer.com/exchangerates_data/timeseries"
+STOCK_PRICES_URL = "https://www.alphavantage.co/query"
+# Таймаут API-запросов в секундах
+REQUEST_TIMEOUT = 10.0
+
+
+@lru_cache(maxsize=None)
+def load_environment() -> None:
+    """Функция однократно загружает переменные окружения из файла .env (при первом запросе к API)"""
+    load_dotenv()
+    logger.debug("Загружены переменные окружения из .env")
+
 
 def get_current_date_time() -> datetime:
     """Функция возвращает текущую дату и время"""
     current_date_time = datetime.now()
-    logger.debug(f"Получено текущее время: {current_date_time}")
+    logger.debug("Получено текущее время: %s", current_date_time)
     return current_date_time
 
 
@@ -38,132 +59,349 @@ def greetings(time: datetime) -> str:
     return greetings_message
 
 
-def read_excel(filename: str, datetime_to_timestamp: bool = True) -> pd.DataFrame:
+@stage()
+def read_excel(
+    filename: str, datetime_to_timestamp: bool = True, use_cache: bool = True, amounts_in_kopecks: bool = False
+) -> pd.DataFrame:
     """Функция для чтения xlsx файла
     :param filename: путь к xlsx файлу
-    :param datetime_to_timestamp: приводит столбец "Дата операции" к формату timestamp
-    :return: pandas DataFrame
+    :param datetime_to_timestamp: приводит столбцы "Дата операции" и "Дата платежа" к формату timestamp
+    :param use_cache: читать данные из колоночного кэша (data/cache), xlsx разбирается только при его изменении
+    :param amounts_in_kopecks: хранить денежные столбцы целым числом копеек (Int64) вместо float64 в рублях
+    :return: pandas DataFrame; текстовые столбцы с небольшим числом значений имеют тип category (см. src.schema)
     """
-    operations_df = pd.read_excel(PATH_DATA_FILE / filename)
-    if datetime_to_timestamp:
-        # Приведение даты к datetime для дальнейшей фильтрации (dayfirst - первым значением указан день)
-        operations_df["Дата операции"] = pd.to_datetime(operations_df["Дата операции"], dayfirst=True, errors="coerce")
-    logger.debug(f"Успешно прочитан файл: {filename}, размер данных DataFrame: {operations_df.shape}")
+    path = PATH_DATA_FILE / filename
+    operations_df = read_cached_frame(path, use_parsed=datetime_to_timestamp) if use_cache else None
+    if operations_df is None:
+        operations_df = pd.read_excel(path)
+        # Приведение дат к datetime для дальнейшей фильтрации (явные форматы выгрузки: день.месяц.год)
+        parsed_columns = normalize_dates(operations_df)
+        # Подсчет памяти с deep=True просматривает все строки, поэтому выполняется только при уровне DEBUG
+        report_memory = logger.isEnabledFor(logging.DEBUG)
+        usage_before = operations_df.memory_usage(deep=True) if report_memory else None
+        apply_schema(operations_df)
+        if report_memory:
+            logger.debug(
+                "Память DataFrame до и после применения схемы типов:\n%s",
+                memory_report(usage_before, operations_df.memory_usage(deep=True)),
+            )
+        if use_cache and path.exists():
+            write_cached_frame(path, operations_df, parsed_columns)
+        if datetime_to_timestamp:
+            for column, parsed in parsed_columns.items():
+                operations_df[column] = parsed
+    if amounts_in_kopecks:
+        amounts_to_kopecks(operations_df)
+    logger.debug("Успешно прочитан файл: %s, размер данных DataFrame: %s", filename, operations_df.shape)
     return operations_df
     # return operations_df.to_dict("records")  # Преобразуем в список словарей
 
 
-def df_range_current_month(transactions: pd.DataFrame, date: datetime) -> pd.DataFrame:
+def month_start(date: datetime) -> datetime:
+    """Функция возвращает начало месяца даты date"""
+    return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def month_window_end(transactions: Optional[Transactions], date: datetime) -> datetime:
+    """Функция возвращает время последней траты с начала месяца до date включительно (начало месяца,
+    если трат нет). Траты за периоды до date и до этого времени совпадают, поэтому оно служит ключом
+    запомненного результата, одинаковым для всех date до следующей траты.
+    Для DataFrame и без переданных операций возвращается date: поиск потребовал бы просмотра всех строк"""
+    date_start = month_start(date)
+    if isinstance(transactions, TransactionStore):
+        return transactions.last_spend_date(date_start, date) or date_start
+    if isinstance(transactions, SpendDataset):
+        start = transactions.dates.searchsorted(pd.Timestamp(date_start), side="left")
+        end = transactions.dates.searchsorted(pd.Timestamp(date), side="right")
+        return transactions.dates[end - 1].to_pydatetime() if end > start else date_start
+    return date
+
+
+@stage()
+def df_range_current_month(transactions: Transactions, date: datetime) -> pd.DataFrame:
     """Функция возвращает DataFrame, отфильтрованный за текущий месяц
-    :param transactions: DataFrame с операциями
+    :param transactions: DataFrame с операциями или подготовленный набор трат SpendDataset
     :param date: строка в формате "DD.MM.YYYY", для которой нужно фильтровать
     :return: pandas DataFrame, отфильтрованный по текущему месяцу
     """
     # Определяем начало месяца
-    first_day_of_month = date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    first_day_of_month = month_start(date)
     # Фильтрация данных
-    transactions_spend = transactions[(transactions["Сумма платежа"] < 0) & (transactions["Статус"] == "OK")]
-    logger.info("Данные отфильтрованы по 'Сумма платежа' и 'Статус'")
-    transactions_df_range = transactions_spend[
-        (transactions_spend["Дата операции"] >= first_day_of_month) & (transactions_spend["Дата операции"] <= date)
-    ]
+    transactions_df_range = as_spend_dataset(transactions).between(first_day_of_month, date)
     logger.debug(
-        f"Успешно получены данные DataFrame с начала месяца до текущей даты, размер данных DataFrame: {transactions_df_range.shape}"
+        "Успешно получены данные DataFrame с начала месяца до текущей даты, размер данных DataFrame: %s",
+        transactions_df_range.shape,
     )
     return transactions_df_range
 
 
+def _sum_by_key(keys: pd.Series, values: list[pd.Series]) -> tuple[pd.Index, list[pd.Series]]:
+    """Функция суммирует столбцы values по ключу keys за один проход (bincount по кодам ключа).
+    Для столбца category используются его готовые коды, иначе ключи кодируются factorize.
+    Строки с пустым ключом не учитываются, ключи без строк в результат не попадают (как groupby observed=True).
+    :return: отсортированные ключи (в порядке groupby) и суммы по каждому столбцу values
+    """
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        codes, labels = keys.cat.codes.to_numpy(), keys.cat.categories
+    else:
+        codes, labels = pd.factorize(keys, sort=True)
+    present = codes >= 0
+    codes = codes[present]
+    counts = np.bincount(codes, minlength=len(labels))
+    observed = counts > 0
+    sums = []
+    for series in values:
+        weights = series.to_numpy(dtype="float64", na_value=0.0)[present]
+        column_sum = pd.Series(np.bincount(codes, weights=weights, minlength=len(labels))[observed], name=series.name)
+        # Суммы в рублях округляются до копеек (результат не зависит от порядка сложения),
+        # суммы в копейках (Int64) остаются целыми
+        if pd.api.types.is_float_dtype(series.dtype):
+            sums.append(column_sum.round(2))
+        else:
+            sums.append(column_sum.astype(series.dtype))
+    return pd.Index(labels[observed]), sums
+
+
+def _cards_frame(labels: pd.Index, total_spent: pd.Series, cashback: pd.Series) -> pd.DataFrame:
+    """Функция формирует DataFrame трат по картам; последние 4 цифры берутся от уникальных номеров карт"""
+    return pd.DataFrame(
+        {"last_digits": labels.astype(str).str[-4:], "total_spent": total_spent.array, "cashback": cashback.array}
+    )
+
+
+@stage()
 def df_cards_spend(transactions_of_month: pd.DataFrame) -> pd.DataFrame:
     """Функция фильтрует данные по картам и возвращает DataFrame, в виде:
     последние 4 цифры карты;
     общая сумма расходов;
     кешбэк (1 рубль на каждые 100 рублей).
     """
-    df_transactions_by_cards = (
-        transactions_of_month[["Номер карты", "Сумма платежа", "Кэшбэк"]].groupby("Номер карты").sum().reset_index()
+    labels, (total_spent, cashback) = _sum_by_key(
+        transactions_of_month["Номер карты"],
+        [transactions_of_month[amount_column(transactions_of_month)], transactions_of_month["Кэшбэк"]],
     )
     logger.info("Данные отфильтрованы по 'Номер карты', 'Сумма платежа' и 'Кэшбэк'")
-    df_transactions_by_cards["Номер карты"] = df_transactions_by_cards["Номер карты"].str[-4:]
-    df_transactions_by_cards = df_transactions_by_cards.rename(
-        columns={"Номер карты": "last_digits", "Сумма платежа": "total_spent", "Кэшбэк": "cashback"}
-    )
-    logger.debug(f"Данные успешно отфильтрованы по картам, размер данных DataFrame: {df_transactions_by_cards.shape}")
+    df_transactions_by_cards = _cards_frame(labels, total_spent, cashback)
+    logger.debug("Данные успешно отфильтрованы по картам, размер данных DataFrame: %s", df_transactions_by_cards.shape)
     return df_transactions_by_cards
 
 
-def df_top_transactions(transactions_of_month: pd.DataFrame) -> pd.DataFrame:
-    """Функция возвращает DataFrame из Топ-5 транзакций по сумме платежа, в виде:
+@stage()
+def df_top_transactions(transactions_of_month: pd.DataFrame, n: int = 5) -> pd.DataFrame:
+    """Функция возвращает DataFrame из Топ-n транзакций по сумме платежа (по умолчанию Топ-5), в виде:
     date,
     amount,
     category,
     description
     """
-    top_transactions = (
-        transactions_of_month[["Дата платежа", "Сумма платежа", "Категория", "Описание"]]
-        .sort_values(by="Сумма платежа")
-        .head()
-    )
-    logger.info("Получены ТОП 5 транзакций по сумме платежа")
+    # Частичный отбор n наименьших сумм вместо сортировки всего месяца
+    amount = amount_column(transactions_of_month)
+    top_transactions = transactions_of_month[["Дата платежа", amount, "Категория", "Описание"]].nsmallest(n, amount)
+    logger.info("Получены ТОП %s транзакций по сумме платежа", n)
+    if pd.api.types.is_datetime64_any_dtype(top_transactions["Дата платежа"]):
+        # В ответе дата платежа остается в формате выгрузки
+        top_transactions["Дата платежа"] = top_transactions["Дата платежа"].dt.strftime(DATE_FORMATS["Дата платежа"])
     top_transactions = top_transactions.rename(
-        columns={"Дата платежа": "date", "Сумма платежа": "amount", "Категория": "category", "Описание": "description"}
+        columns={"Дата платежа": "date", amount: "amount", "Категория": "category", "Описание": "description"}
     )
     logger.info(
-        "В данных ТОП 5 транзакций, переименованы названия столобцов 'Дата платежа': 'date', 'Сумма платежа': 'amount', 'Категория': 'category', 'Описание': 'description'"
+        "В данных ТОП %s транзакций, переименованы названия столобцов 'Дата платежа': 'date', 'Сумма платежа': 'amount', 'Категория': 'category', 'Описание': 'description'",
+        n,
     )
 
-    logger.debug("Успешно получены ТОП 5 транзакций по сумме платежа")
+    logger.debug("Успешно получены ТОП %s транзакций по сумме платежа", n)
     return top_transactions
 
 
-def get_currencies_rate(currency_code: str) -> dict:
-    """Функция возвращает курс валют от API, заданных в файле: data/'user_settings.json'"""
+@stage()
+def main_page_summary(transactions_of_month: pd.DataFrame, n: int = 5) -> dict[str, pd.DataFrame]:
+    """Функция рассчитывает данные страницы 'Главная' за один проход по операциям месяца
+    :param transactions_of_month: траты за месяц (см. df_range_current_month)
+    :param n: количество транзакций в Топ-n
+    :return: dict с DataFrame:
+    cards — траты и кешбэк по картам (как df_cards_spend);
+    top_transactions — Топ-n транзакций (как df_top_transactions);
+    categories — траты и кешбэк по категориям (category, total_spent, cashback)
+    """
+    amounts = transactions_of_month[amount_column(transactions_of_month)]
+    cashback = transactions_of_month["Кэшбэк"]
+    card_labels, card_sums = _sum_by_key(transactions_of_month["Номер карты"], [amounts, cashback])
+    category_labels, category_sums = _sum_by_key(transactions_of_month["Категория"], [amounts, cashback])
+    summary = {
+        "cards": _cards_frame(card_labels, *card_sums),
+        "top_transactions": df_top_transactions(transactions_of_month, n),
+        "categories": pd.DataFrame(
+            {
+                "category": category_labels.astype(str),
+                "total_spent": category_sums[0].array,
+                "cashback": category_sums[1].array,
+            }
+        ),
+    }
+    logger.debug("Рассчитаны данные страницы 'Главная' по %s операциям", len(transactions_of_month))
+    return summary
+
+
+def month_summary(transactions: Transactions, date: datetime, n: int = 5) -> dict[str, pd.DataFrame]:
+    """Функция рассчитывает данные страницы 'Главная' с начала месяца до date (как main_page_summary).
+    Для хранилища операций траты по картам и категориям считаются агрегатными запросами,
+    а из базы читаются только n строк Топ-n, без выборки всех операций месяца."""
+    if isinstance(transactions, TransactionStore):
+        date_start = month_start(date)
+        summary = {
+            "cards": transactions.cards_spend(date_start, date),
+            "top_transactions": df_top_transactions(transactions.top_spending(date_start, date, n), n),
+            "categories": transactions.categories_spend(date_start, date),
+        }
+        logger.debug("Данные страницы 'Главная' получены запросами к хранилищу операций")
+        return summary
+    return main_page_summary(df_range_current_month(transactions, date), n)
+
+
+@stage()
+def get_currencies_rate(
+    currency_code: str,
+    session: Optional[requests.Session] = None,
+    timeout: float = REQUEST_TIMEOUT,
+    url: str = CURRENCY_RATE_URL,
+) -> dict:
+    """Функция возвращает курс валют от API, заданных в файле: data/'user_settings.json'
+    :param session: сессия requests с пулом соединений, по умолчанию выполняется отдельный запрос
+    :param timeout: таймаут запроса в секундах
+    :param url: адрес API курсов валют
+    """
 
-    url = "https://api.apilayer.com/exchangerates_data/convert"
     payload = {
         "amount": "1",
         "to": "RUB",
         "from": currency_code,
     }
-    headers = {"apikey": os.getenv("API_KEY_CURRENCY_RATE")}
-    logger.info(f"Запрос данных с API: {url} для валюты '{currency_code}'")
+    load_environment()
+    headers: dict[str, Any] = {"apikey": os.getenv("API_KEY_CURRENCY_RATE")}
+    http = session if session is not None else requests
+    logger.info("Запрос данных с API: %s для валюты '%s'", url, currency_code)
     try:
-        response = requests.get(url, headers=headers, params=payload)
+        response = http.get(url, headers=headers, params=payload, timeout=timeout)
         response.raise_for_status()
-    except requests.exceptions.RequestException:
-        logger.error(f"Ошибка при выполнении API-запроса: {url} - {requests.exceptions.RequestException}")
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as error:
+        logger.error("Ошибка при выполнении API-запроса: %s - %s", url, error)
         return {}
 
-    logger.info(f"Успешный ответ от {url}, статус: {response.status_code}")
-    data = response.json()
+    logger.info("Успешный ответ от %s, статус: %s", url, response.status_code)
     currency_data = data.get("result")
     result = {
         "currency": currency_code,
         "rate": currency_data,
     }
-    logger.debug(f"Успешно получен ответ от {url}")
+    logger.debug("Успешно получен ответ от %s", url)
     return result
 
 
-def get_stock_prices(stock_simbol: str) -> dict:
-    """Функция возвращает стоимость акций, заданных в файле: data/'user_settings.json'"""
-    headers = {"apikey": os.getenv("API_KEY_STOCK_PRICES")}
-    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={stock_simbol}&apikey={headers}"
-    logger.info(f"Запрос данных с API: {url} для акций '{stock_simbol}'")
+def _rub_rates(rates: dict, currency_codes: list[str]) -> dict[str, float]:
+    """Функция переводит курсы относительно рубля (base=RUB) в стоимость единицы валюты в рублях"""
+    return {code: 1 / rates[code] for code in currency_codes if rates.get(code)}
+
+
+@stage()
+def get_currencies_rates_bulk(
+    currency_codes: list[str],
+    session: Optional[requests.Session] = None,
+    timeout: float = REQUEST_TIMEOUT,
+    url: str = CURRENCY_LATEST_URL,
+) -> dict[str, float]:
+    """Функция возвращает курсы нескольких валют к рублю одним запросом к API
+    :param currency_codes: коды валют, например ["USD", "EUR"]
+    :param session: сессия requests с пулом соединений, по умолчанию выполняется отдельный запрос
+    :param timeout: таймаут запроса в секундах
+    :param url: адрес API последних курсов валют
+    :return: dict {код валюты: курс в рублях}, при ошибке — пустой dict
+    """
+    load_environment()
+    headers: dict[str, Any] = {"apikey": os.getenv("API_KEY_CURRENCY_RATE")}
+    payload = {"base": "RUB", "symbols": ",".join(currency_codes)}
+    http = session if session is not None else requests
+    logger.info("Запрос данных с API: %s для валют %s", url, currency_codes)
+    try:
+        response = http.get(url, headers=headers, params=payload, timeout=timeout)
+        response.raise_for_status()
+        rates = response.json().get("rates", {})
+    except (requests.exceptions.RequestException, ValueError) as error:
+        logger.error("Ошибка при выполнении API-запроса: %s - %s", url, error)
+        return {}
+    logger.debug("Успешно получен ответ от %s", url)
+    return _rub_rates(rates, currency_codes)
+
+
+@stage()
+def get_currencies_rates_history(
+    currency_codes: list[str],
+    date_start: datetime,
+    date_end: datetime,
+    session: Optional[requests.Session] = None,
+    timeout: float = REQUEST_TIMEOUT,
+    url: str = CURRENCY_TIMESERIES_URL,
+) -> dict[str, dict[str, float]]:
+    """Функция возвращает курсы нескольких валют к рублю по дням периода одним запросом к API
+    (API ограничивает период одним годом)
+    :return: dict {дата "YYYY-MM-DD": {код валюты: курс в рублях}}, при ошибке — пустой dict
+    """
+    load_environment()
+    headers: dict[str, Any] = {"apikey": os.getenv("API_KEY_CURRENCY_RATE")}
+    payload = {
+        "start_date": date_start.strftime("%Y-%m-%d"),
+        "end_date": date_end.strftime("%Y-%m-%d"),
+        "base": "RUB",
+        "symbols": ",".join(currency_codes),
+    }
+    http = session if session is not None else requests
+    logger.info("Запрос данных с API: %s для валют %s за период %s", url, currency_codes, payload)
+    try:
+        response = http.get(url, headers=headers, params=payload, timeout=timeout)
+        response.raise_for_status()
+        history = response.json().get("rates", {})
+    except (requests.exceptions.RequestException, ValueError) as error:
+        logger.error("Ошибка при выполнении API-запроса: %s - %s", url, error)
+        return {}
+    logger.debug("Успешно получен ответ от %s", url)
+    return {day: _rub_rates(rates, currency_codes) for day, rates in history.items()}
+
+
+@stage()
+def get_stock_prices(
+    stock_simbol: str,
+    session: Optional[requests.Session] = None,
+    timeout: float = REQUEST_TIMEOUT,
+    url: str = STOCK_PRICES_URL,
+) -> dict:
+    """Функция возвращает стоимость акций, заданных в файле: data/'user_settings.json'
+    :param session: сессия requests с пулом соединений, по умолчанию выполняется отдельный запрос
+    :param timeout: таймаут запроса в секундах
+    :param url: адрес API котировок акций
+    """
+    load_environment()
+    payload = {
+        "function": "GLOBAL_QUOTE",
+        "symbol": stock_simbol,
+        "apikey": os.getenv("API_KEY_STOCK_PRICES"),
+    }
+    http = session if session is not None else requests
+    logger.info("Запрос данных с API: %s для акций '%s'", url, stock_simbol)
     try:
-        response = requests.get(url)
+        response = http.get(url, params=payload, timeout=timeout)
         response.raise_for_status()
-    except requests.exceptions.RequestException:
-        logger.error(f"Ошибка при выполнении API-запроса: {url} - {requests.exceptions.RequestException}")
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as error:
+        logger.error("Ошибка при выполнении API-запроса: %s - %s", url, error)
         return {}
 
-    logger.info(f"Успешный ответ от {url}, статус: {response.status_code}")
-    data = response.json()
-    stock_price = data["Global Quote"].get("05. price")
+    logger.info("Успешный ответ от %s, статус: %s", url, response.status_code)
+    stock_price = data.get("Global Quote", {}).get("05. price")
     result = {
         "stock": stock_simbol,
         "price": stock_price,
     }
-    logger.debug(f"Успешно получен ответ от {url}")
+    logger.debug("Успешно получен ответ от %s", url)
     return result
 
 
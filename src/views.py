@@ -1,47 +1,73 @@
 import json
 from datetime import datetime
-
-from dotenv import load_dotenv
+from typing import Optional
 
 from config import PATH_DATA_FILE
-from src.utils import (df_cards_spend, df_range_current_month, df_top_transactions, get_currencies_rate,
-                       get_current_date_time, get_stock_prices, greetings, read_excel)
-
-load_dotenv()
+from src.dataset import Transactions
+from src.instrumentation import collect, stage
+from src.market_store import get_market_snapshot
+from src.memo import FileVersion, memoize
+from src.utils import greetings, month_summary, month_window_end, read_excel
 
-result: dict = {}
-current_date = get_current_date_time()
 
-def get_result_main_page(date: datetime) -> str:
-    """Функция реализует JSON-ответ для старницы 'Главная'"""
-    #  Приветствие
-    result["greeting"] = greetings(current_date)
+@memoize()
+def _month_summary(date: datetime, transactions: Optional[Transactions], source: Optional[FileVersion]) -> dict:
+    """Функция возвращает траты по картам и Топ 5 транзакций с начала месяца до date (результат запоминается)
+    :param date: конец окна трат — время последней траты до даты страницы (см. month_window_end),
+    поэтому запросы в разное время между двумя тратами используют один результат
+    :param source: версия файла операций, который читается, если transactions не переданы
+    (если переданы, в ключ входит их отпечаток и source — None)
+    """
     #  DataFrame: Исходные данные
-    data_df = read_excel("operations.xlsx")
+    if transactions is None:
+        transactions = read_excel(source.path.name if source else "operations.xlsx")
+
+    #  DataFrame: Данные по расходам по картам и Топ 5 транзакций за текущий месяц (один проход по данным
+    #  или агрегатные запросы к хранилищу операций)
+    summary = month_summary(transactions, date, n=5)
+    return {
+        "cards": summary["cards"].to_dict(orient="records"),
+        "top_transactions": summary["top_transactions"].to_dict(orient="records"),
+    }
 
-    #  DataFrame: Данные за текущий месяц
-    data_df_range_current_month = df_range_current_month(data_df, current_date)
 
-    #  DataFrame: Данные по расходам, сортированные по картам
-    spends_by_cards = df_cards_spend(data_df_range_current_month)
-    result["cards"] = spends_by_cards.to_dict(orient="records")
+@memoize()
+def _user_settings(source: FileVersion) -> dict:
+    """Функция читает настройки пользователя (перечитываются только после изменения файла)"""
+    with open(source.path, "r") as file:
+        return dict(json.load(file))
+
+
+def _main_page(date: datetime, transactions: Optional[Transactions]) -> dict:
+    """Функция собирает данные страницы 'Главная'"""
+    result: dict = {}
+    #  Приветствие
+    result["greeting"] = greetings(date)
+    window_end = month_window_end(transactions, date)
+    source = FileVersion(PATH_DATA_FILE / "operations.xlsx") if transactions is None else None
+    result.update(_month_summary(window_end, transactions, source))
 
-    #  DataFrame: Топ 5 транзакций за текущий месяц
-    top_5_transactions = df_top_transactions(data_df_range_current_month)
-    result["top_transactions"] = top_5_transactions.to_dict(orient="records")
+    data_rates = _user_settings(FileVersion(PATH_DATA_FILE / "user_settings.json"))
 
-    with open(PATH_DATA_FILE / "user_settings.json", "r") as file:
-        data_rates = json.load(file)
+    #  Курсы валют и стоимость акций из локального хранилища (обновляется пакетно, в т.ч. в фоне)
+    currency_rates, stock_prices = get_market_snapshot(data_rates["user_currencies"], data_rates["user_stocks"])
+    result["currency_rates"] = currency_rates
+    result["stock_prices"] = stock_prices
+    return result
 
-    #  Курсы валют
-    for value in data_rates["user_currencies"]:
-        currencies_rate = get_currencies_rate(value)
-        result.setdefault("currency_rates", []).append(currencies_rate)
 
-    #  Стоимость акций
-    for value in data_rates["user_stocks"]:
-        stock_price = get_stock_prices(value)
-        result.setdefault("stock_prices", []).append(stock_price)
+def get_result_main_page(date: datetime, transactions: Optional[Transactions] = None, timings: bool = False) -> str:
+    """Функция реализует JSON-ответ для старницы 'Главная'
+    :param date: дата и время, для которых формируется страница (приветствие и операции с начала месяца)
+    :param transactions: уже загруженные операции (DataFrame или SpendDataset),
+    по умолчанию читается файл operations.xlsx
+    :param timings: добавить в ответ блок "timings" с замерами этапов (время, строки на входе и выходе, память)
+    """
+    with collect() as measurements:
+        with stage("get_result_main_page"):
+            result = _main_page(date, transactions)
+    if timings:
+        result["timings"] = measurements
 
     #  Вывод на консоль в json формате
     try:
@@ -53,4 +79,4 @@ def get_result_main_page(date: datetime) -> str:
 
 
 # if __name__ == "__main__":
-#     print(get_result_main_page(current_date))
+#     print(get_result_main_page(get_current_date_time()))
@@ -0,0 +1,203 @@
+import atexit
+import csv
+import importlib.util
+import json
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Optional, Union
+
+import pandas as pd
+
+from src.logger import get_logger
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость, без нее используется стандартный json
+    orjson = None  # type: ignore[assignment]
+
+logger = get_logger("writers")
+
+ReportData = Union[str, dict, list, pd.DataFrame]
+
+
+def dumps_compact(data: Any) -> bytes:
+    """Функция кодирует данные в компактный JSON (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _to_records(data: ReportData) -> list:
+    """Функция приводит результат отчета к списку записей"""
+    if isinstance(data, str):
+        data = json.loads(data)
+    if isinstance(data, pd.DataFrame):
+        return list(data.to_dict(orient="records"))
+    if isinstance(data, dict):
+        return [data]
+    return list(data)
+
+
+def _to_frame(data: ReportData) -> pd.DataFrame:
+    """Функция приводит результат отчета к DataFrame"""
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame(_to_records(data))
+
+
+def _write_json(data: ReportData, file: IO[bytes]) -> None:
+    # Готовая строка (результат функции отчета) записывается как есть, остальное — компактным JSON
+    if isinstance(data, str):
+        file.write(data.encode("utf-8"))
+    elif isinstance(data, pd.DataFrame):
+        file.write(dumps_compact(data.to_dict(orient="records")))
+    else:
+        file.write(dumps_compact(data))
+
+
+def _write_ndjson(data: ReportData, file: IO[bytes]) -> None:
+    for record in _to_records(data):
+        file.write(dumps_compact(record))
+        file.write(b"\n")
+
+
+def _write_csv(data: ReportData, file: IO[bytes]) -> None:
+    _to_frame(data).to_csv(file, index=False, encoding="utf-8", quoting=csv.QUOTE_MINIMAL)
+
+
+def _write_parquet(data: ReportData, file: IO[bytes]) -> None:
+    if importlib.util.find_spec("pyarrow") is None and importlib.util.find_spec("fastparquet") is None:
+        raise ImportError("Для записи отчета в формате parquet нужен пакет pyarrow или fastparquet")
+    _to_frame(data).to_parquet(file, index=False)
+
+
+# Форматы отчетов: имя формата -> (расширение файла, функция записи)
+WRITERS: dict[str, tuple[str, Callable[[ReportData, IO[bytes]], None]]] = {
+    "json": (".json", _write_json),
+    "ndjson": (".ndjson", _write_ndjson),
+    "csv": (".csv", _write_csv),
+    "parquet": (".parquet", _write_parquet),
+}
+
+
+def register_writer(fmt: str, extension: str, writer: Callable[[ReportData, IO[bytes]], None]) -> None:
+    """Функция добавляет формат отчета
+    :param fmt: имя формата
+    :param extension: расширение файла, например ".xml"
+    :param writer: функция записи данных отчета в открытый бинарный файл
+    """
+    WRITERS[fmt] = (extension, writer)
+
+
+def format_for(path: Path) -> str:
+    """Функция определяет формат отчета по расширению файла (по умолчанию json)"""
+    for fmt, (extension, _) in WRITERS.items():
+        if path.suffix.lower() == extension:
+            return fmt
+    return "json"
+
+
+def unique_path(path: Path) -> Path:
+    """Функция добавляет к имени файла время запуска, pid и случайный суффикс,
+    чтобы параллельные запуски не перезаписывали отчеты друг друга"""
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return path.with_name(f"{path.stem}_{stamp}_{os.getpid()}_{uuid.uuid4().hex[:6]}{path.suffix}")
+
+
+def atomic_write(path: Path, data: ReportData, fmt: str) -> None:
+    """Функция записывает отчет во временный файл в том же каталоге и затем переименовывает его,
+    поэтому читатель никогда не увидит частично записанный отчет"""
+    _, writer = WRITERS[fmt]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            writer(data, file)
+        # mkstemp создает файл с правами 0600, отчет должен читаться как обычный файл
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+class BackgroundWriter:
+    """Фоновый поток записи отчетов: вычисление не ждет записи на диск"""
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="report_writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                path, data, fmt = task
+                atomic_write(path, data, fmt)
+                logger.debug("Отчет записан в фоновом потоке: %s", path)
+            except Exception as error:
+                logger.error("Ошибка записи отчета в фоновом потоке: %s", error)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, path: Path, data: ReportData, fmt: str) -> None:
+        """Метод ставит отчет в очередь на запись"""
+        self._queue.put((path, data, fmt))
+
+    def flush(self) -> None:
+        """Метод ждет записи всех отчетов из очереди"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Метод дописывает очередь и останавливает поток"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+_background_writer: Optional[BackgroundWriter] = None
+_background_writer_lock = threading.Lock()
+
+
+def get_background_writer() -> BackgroundWriter:
+    """Функция возвращает общий фоновый поток записи (создается при первом обращении)"""
+    global _background_writer
+    with _background_writer_lock:
+        if _background_writer is None:
+            _background_writer = BackgroundWriter()
+            atexit.register(_background_writer.close)
+        return _background_writer
+
+
+def write_report(
+    data: ReportData, path: Path, fmt: Optional[str] = None, unique: bool = False, background: bool = False
+) -> Path:
+    """Функция записывает отчет в файл
+    :param data: результат отчета: готовая JSON-строка, dict, список записей или DataFrame
+    :param path: путь к файлу отчета
+    :param fmt: формат (json, ndjson, csv, parquet), по умолчанию определяется по расширению файла
+    :param unique: добавить к имени файла уникальный суффикс запуска
+    :param background: записать в фоновом потоке, не дожидаясь окончания записи
+    :return: путь, по которому записан (или будет записан) отчет
+    """
+    fmt = fmt or format_for(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Неизвестный формат отчета: {fmt}")
+    if path.suffix.lower() != WRITERS[fmt][0]:
+        path = path.with_suffix(WRITERS[fmt][0])
+    if unique:
+        path = unique_path(path)
+    if background:
+        get_background_writer().submit(path, data, fmt)
+    else:
+        atomic_write(path, data, fmt)
+        logger.debug("Отчет записан: %s", path)
+    return path
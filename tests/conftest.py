@@ -1,10 +1,21 @@
 from datetime import datetime
+from typing import Iterator
 
 import pandas as pd
 import pytest
 from numpy import nan
 from pandas import Timestamp
 
+from src.memo import get_memo
+
+
+@pytest.fixture(autouse=True)
+def clear_memo() -> Iterator[None]:
+    """Фикстура очищает запомненные результаты, чтобы тесты не зависели друг от друга"""
+    get_memo().clear()
+    yield
+    get_memo().clear()
+
 
 @pytest.fixture
 def sample_data() -> pd.DataFrame:
@@ -0,0 +1,122 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.aggregates
+from src.aggregates import CashbackRollup, load_cashback_rollup, rollup_path
+from src.services import profitable_cashback, profitable_cashback_period
+
+
+def test_rollup_month(sample_data: pd.DataFrame) -> None:
+    """Проверка помесячных агрегатов: кешбэк, сумма трат и количество операций"""
+    rollup = CashbackRollup()
+    rollup.update(sample_data)
+    assert rollup.month(2023, 5) == {"Еда": [45, -450, 2], "Топливо": [50, -500, 1], "Развлечения": [20, -200, 1]}
+    assert rollup.month(2023, 4) == {}
+
+
+def test_rollup_incremental_update(sample_data: pd.DataFrame) -> None:
+    """Проверка, что при добавлении строк обрабатывается только хвост"""
+    rollup = CashbackRollup()
+    rollup.update(sample_data.iloc[:2])
+    assert rollup.update(sample_data) == 3
+    assert rollup.update(sample_data) == 0
+    assert rollup.cashback((2023, 5)) == {"Еда": 45, "Развлечения": 20, "Топливо": 50}
+
+
+def test_rollup_rebuild_on_change(sample_data: pd.DataFrame) -> None:
+    """Проверка, что при изменении обработанных строк агрегаты строятся заново"""
+    rollup = CashbackRollup()
+    rollup.update(sample_data)
+    changed = sample_data.assign(**{"Кэшбэк": [1, 2, 3, 4, 5]})
+    assert rollup.update(changed) == 5
+    assert rollup.cashback((2023, 5)) == {"Еда": 3, "Развлечения": 4, "Топливо": 3}
+
+
+def test_rollup_save_load(sample_data: pd.DataFrame, tmp_path: Path) -> None:
+    """Проверка сохранения агрегатов на диск"""
+    rollup = CashbackRollup()
+    rollup.update(sample_data)
+    rollup.save(tmp_path / "rollup.json")
+    loaded = CashbackRollup.load(tmp_path / "rollup.json")
+    assert loaded.buckets == rollup.buckets
+    assert loaded.update(sample_data) == 0
+
+
+def test_profitable_cashback_from_rollup(sample_data: pd.DataFrame) -> None:
+    """Проверка, что результат по агрегатам совпадает с расчетом по DataFrame"""
+    rollup = CashbackRollup()
+    rollup.update(sample_data)
+    assert profitable_cashback(rollup, 2023, 5) == profitable_cashback(sample_data, 2023, 5)
+
+
+def test_profitable_cashback_period(test_df: pd.DataFrame) -> None:
+    """Проверка суммирования помесячных агрегатов за квартал"""
+    rollup = CashbackRollup()
+    rollup.update(test_df)
+    result = json.loads(profitable_cashback_period(rollup, 2021, 10, 2021, 12))
+    assert result == {"Переводы": 0.0, "Супермаркеты": 2.0}
+
+
+def test_rollup_rebuild_on_middle_row_change(sample_data: pd.DataFrame) -> None:
+    """Проверка, что изменение строки в середине обработанной части тоже сбрасывает агрегаты"""
+    rollup = CashbackRollup()
+    rollup.update(sample_data)
+    changed = sample_data.copy()
+    changed.loc[changed.index[2], "Кэшбэк"] = 0
+    assert rollup.update(changed) == 5
+    assert rollup.cashback((2023, 5)) == {"Еда": 45, "Развлечения": 20, "Топливо": 0}
+
+
+def test_rollup_hashes_only_tail(sample_data: pd.DataFrame, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Проверка, что при обновлении хэшируются только последние обработанные строки и добавленные"""
+    hashed = []
+    row_hashes = src.aggregates._row_hashes
+
+    def counting_row_hashes(transactions: pd.DataFrame) -> np.ndarray:
+        hashed.append(len(transactions))
+        return row_hashes(transactions)
+
+    monkeypatch.setattr(src.aggregates, "TAIL_ROWS", 1)
+    monkeypatch.setattr(src.aggregates, "_row_hashes", counting_row_hashes)
+    rollup = CashbackRollup()
+    rollup.update(sample_data.iloc[:2])
+    assert rollup.update(sample_data) == 3
+    assert hashed == [2, 4]
+    assert rollup.cashback((2023, 5)) == {"Еда": 45, "Развлечения": 20, "Топливо": 50}
+
+
+def test_rollup_path_per_directory(tmp_path: Path) -> None:
+    """Проверка, что одноименные файлы операций из разных каталогов не делят агрегаты"""
+    assert rollup_path(str(tmp_path / "a" / "operations.xlsx")) != rollup_path(str(tmp_path / "b" / "operations.xlsx"))
+
+
+def test_load_rollup_skips_unchanged_file(
+    sample_data: pd.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Проверка, что неизмененный файл операций не перечитывается, а измененный без новых строк
+    приводит к пересчету агрегатов"""
+    monkeypatch.setattr(src.aggregates, "PATH_DATA_CACHE", tmp_path / "cache")
+    source = tmp_path / "operations.xlsx"
+    source.write_bytes(b"v1")
+    load_cashback_rollup(str(source), sample_data)
+
+    def fail(filename: str) -> pd.DataFrame:
+        raise AssertionError("файл операций не должен читаться")
+
+    monkeypatch.setattr(src.aggregates, "read_excel", fail)
+    assert load_cashback_rollup(str(source)).cashback((2023, 5)) == {"Еда": 45, "Развлечения": 20, "Топливо": 50}
+
+    # Измененная строка выше отметки последних обработанных строк
+    monkeypatch.setattr(src.aggregates, "TAIL_ROWS", 1)
+    source.write_bytes(b"v2 edited")
+    changed = sample_data.copy()
+    changed.loc[changed.index[0], "Кэшбэк"] = 0
+    assert load_cashback_rollup(str(source), changed).cashback((2023, 5)) == {
+        "Еда": 30,
+        "Развлечения": 20,
+        "Топливо": 50,
+    }
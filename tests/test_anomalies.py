@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.anomalies import AnomalyMonitor, find_outliers, find_recurring, monthly_baseline, normalize_descriptions
+from src.services import recurring_payments, transaction_outliers
+
+
+@pytest.fixture
+def history_df() -> pd.DataFrame:
+    """Операции за год: подписка (постоянная сумма), коммунальные платежи (разные суммы),
+    покупки в супермаркете и одна необычно большая покупка в декабре"""
+    subscription = pd.date_range("2021-01-01 10:00", periods=12, freq="MS") + pd.Timedelta(days=4)
+    utilities = pd.date_range("2021-01-01 12:00", periods=12, freq="MS") + pd.Timedelta(days=19)
+    groceries = pd.date_range("2021-01-02 18:00", "2021-12-30", freq="3D")
+    dates = [*subscription, *utilities, *groceries, pd.Timestamp("2021-12-15 19:00")]
+    amounts = [
+        *[-299.0] * 12,
+        *(-2500.0 - 400.0 * (np.arange(12) % 4)),
+        *(-500.0 - 10.0 * (np.arange(len(groceries)) % 7)),
+        -25000.0,
+    ]
+    descriptions = [
+        *[f"YANDEX PLUS {month:02d}/2021" for month in range(1, 13)],
+        *["Мосэнергосбыт"] * 12,
+        *["Пятерочка"] * len(groceries),
+        "Пятерочка",
+    ]
+    categories = ["Цифровые товары"] * 12 + ["ЖКХ"] * 12 + ["Супермаркеты"] * (len(groceries) + 1)
+    return pd.DataFrame(
+        {
+            "Дата операции": dates,
+            "Номер карты": "*7197",
+            "Статус": "OK",
+            "Сумма платежа": amounts,
+            "Кэшбэк": 0.0,
+            "Категория": categories,
+            "Описание": descriptions,
+        }
+    ).sort_values("Дата операции", ascending=False, ignore_index=True)
+
+
+def test_normalize_descriptions() -> None:
+    """Проверка нормализации описаний: без дат, цифр и регистра"""
+    descriptions = pd.Series(["YANDEX PLUS 01/2021", "Yandex Plus", "123", None])
+    normalized = normalize_descriptions(descriptions)
+    assert normalized.codes[0] == normalized.codes[1]
+    assert list(normalized.categories) == ["yandex plus"]
+    assert pd.isna(normalized[2]) and pd.isna(normalized[3])
+
+
+def test_find_recurring(history_df: pd.DataFrame) -> None:
+    """Проверка поиска ежемесячных платежей с фиксированной и переменной суммой"""
+    result = find_recurring(history_df.sort_values("Дата операции"))
+    assert result[["description", "period", "count", "fixed_amount"]].to_dict(orient="records") == [
+        {"description": "yandex plus", "period": "месяц", "count": 12, "fixed_amount": True},
+        {"description": "мосэнергосбыт", "period": "месяц", "count": 12, "fixed_amount": False},
+    ]
+    assert result["amount"].tolist() == [299.0, 3100.0]
+    assert result["next_date"][0] == "05.01.2022"
+
+
+def test_monthly_baseline() -> None:
+    """Проверка медианы и MAD по окну предыдущих месяцев группы"""
+    values = np.array([1.0, 2.0, 3.0, 10.0, 100.0, 5.0])
+    groups = np.array([0, 0, 0, 0, 1, -1])
+    months = np.array([0, 0, 1, 2, 2, 2])
+    median, mad = monthly_baseline(values, groups, months, months=2, min_periods=2)
+    # Окно месяца 2 группы 0 — значения месяцев 0 и 1: медиана 2, MAD 1
+    assert median[3] == 2.0 and mad[3] == 1.0
+    assert median[2] == 1.5
+    # Первый месяц, группа без предыдущих месяцев, значение без группы
+    assert np.isnan(median[[0, 1, 4, 5]]).all()
+    # Размер окон зависит от числа встречающихся групп, а не от величины кодов
+    sparse_median, _ = monthly_baseline(values, np.where(groups == 1, 10**15, groups), months, 2, 2)
+    np.testing.assert_array_equal(sparse_median, median)
+
+
+def test_find_outliers(history_df: pd.DataFrame) -> None:
+    """Проверка, что выбросом отмечается только необычно крупная трата"""
+    result = find_outliers(history_df.sort_values("Дата операции"))
+    assert result["amount"].tolist() == [25000.0]
+    assert result["category_score"].iloc[0] > 3.5
+
+
+def test_anomaly_monitor_matches_full_history(history_df: pd.DataFrame) -> None:
+    """Проверка, что дополнение монитора по месяцам дает тот же результат, что и расчет по всей истории"""
+    monitor = AnomalyMonitor()
+    dates = history_df["Дата операции"]
+    first = monitor.update(history_df[dates < "2021-07-01"])
+    second = monitor.update(history_df[dates >= "2021-07-01"])
+    full = find_outliers(history_df.sort_values("Дата операции")).reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.concat([first, second], ignore_index=True), full)
+    pd.testing.assert_frame_equal(monitor.recurring(), find_recurring(history_df.sort_values("Дата операции")))
+    # Хранится только хвост истории
+    assert monitor.context is not None
+    assert len(monitor.context) < len(history_df)
+
+
+def test_services_return_json(history_df: pd.DataFrame) -> None:
+    """Проверка JSON-ответов сервисов регулярных платежей и выбросов"""
+    assert [item["description"] for item in json.loads(recurring_payments(history_df))] == [
+        "yandex plus",
+        "мосэнергосбыт",
+    ]
+    assert [item["amount"] for item in json.loads(transaction_outliers(history_df))] == [25000.0]
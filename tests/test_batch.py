@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from src.batch import analyze_file, find_workbooks, merge_results, run_batch
+
+
+@pytest.fixture
+def exports(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, test_df: pd.DataFrame) -> Path:
+    """Фикстура: каталог с двумя выгрузками операций и одним поврежденным файлом"""
+    monkeypatch.setattr("src.cache.PATH_DATA_CACHE", tmp_path / "cache")
+    monkeypatch.setattr("src.batch.PATH_DATA_REPORT", tmp_path / "reports")
+    directory = tmp_path / "exports"
+    directory.mkdir()
+    raw_df = test_df.assign(**{"Дата операции": test_df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")})
+    raw_df.to_excel(directory / "client_1.xlsx", index=False)
+    raw_df.to_excel(directory / "client_2.xlsx", index=False)
+    (directory / "broken.xlsx").write_bytes(b"not a workbook")
+    (directory / "~$client_1.xlsx").write_bytes(b"lock")
+    return directory
+
+
+def test_find_workbooks(exports: Path) -> None:
+    """Проверка поиска выгрузок в каталоге"""
+    assert [path.name for path in find_workbooks(exports)] == ["broken.xlsx", "client_1.xlsx", "client_2.xlsx"]
+    assert [path.name for path in find_workbooks(exports / "client_*.xlsx")] == ["client_1.xlsx", "client_2.xlsx"]
+
+
+def test_analyze_file(exports: Path) -> None:
+    """Проверка анализа одного файла: кешбэк, траты по картам и по категориям"""
+    result = analyze_file(exports / "client_1.xlsx", 2021, 12, "31.12.2021")
+    assert result["rows"] == 6
+    assert result["cashback"] == {"Супермаркеты": 1.0}
+    assert result["cards"] == [{"last_digits": "7197", "total_spent": -160.89, "cashback": 1.0}]
+    assert result["categories"] == {
+        "Переводы": {"total": -182.12, "count": 2},
+        "Супермаркеты": {"total": -78.05, "count": 1},
+    }
+
+
+def test_merge_results() -> None:
+    """Проверка сводного отчета: суммирование по файлам и список файлов с ошибками"""
+    results: list[dict[str, Any]] = [
+        {"file": "b.xlsx", "rows": 2, "cashback": {"Еда": 1.5}, "cards": [], "categories": {}},
+        {"file": "a.xlsx", "error": "ValueError: bad file"},
+        {
+            "file": "c.xlsx",
+            "rows": 3,
+            "cashback": {"Еда": 2.0, "Авто": 1.0},
+            "cards": [{"last_digits": "1234", "total_spent": -10.0, "cashback": 0.0}],
+            "categories": {"Еда": {"total": -10.0, "count": 1}},
+        },
+    ]
+    combined = merge_results(results)
+    assert combined["files"] == 2
+    assert combined["rows"] == 5
+    assert combined["cashback"] == {"Авто": 1.0, "Еда": 3.5}
+    assert combined["cards"] == [{"file": "c.xlsx", "last_digits": "1234", "total_spent": -10.0, "cashback": 0.0}]
+    assert combined["failed"] == [{"file": "a.xlsx", "error": "ValueError: bad file"}]
+
+
+def test_run_batch(exports: Path, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Проверка пакетной обработки в пуле процессов: поврежденный файл не прерывает остальные"""
+    combined = run_batch(exports, 2021, 12, "31.12.2021", workers=2)
+    assert combined["files"] == 2
+    assert combined["rows"] == 12
+    assert combined["cashback"] == {"Супермаркеты": 2.0}
+    assert combined["categories"]["Переводы"] == {"total": -364.24, "count": 4}
+    assert [item["file"] for item in combined["failed"]] == [str(exports / "broken.xlsx")]
+    assert "[3/3]" in capsys.readouterr().out
+    with open(tmp_path / "reports" / "batch_report.json", encoding="utf-8") as file:
+        assert json.load(file) == combined
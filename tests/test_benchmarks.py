@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from benchmarks.generator import generate_operations
+from benchmarks.run import compare, run, save_results
+from src.utils import read_excel
+
+
+def test_generate_operations_is_deterministic() -> None:
+    """Проверка, что генератор с одним seed дает одинаковые операции, а с разными — разные"""
+    pd.testing.assert_frame_equal(generate_operations(500, seed=1), generate_operations(500, seed=1))
+    assert not generate_operations(500, seed=1).equals(generate_operations(500, seed=2))
+
+
+def test_generate_operations_matches_operations_file() -> None:
+    """Проверка, что синтетические операции повторяют столбцы и порядок дат файла операций"""
+    operations_df = generate_operations(1000)
+    assert len(operations_df) == 1000
+    assert list(operations_df.columns) == list(read_excel("operations.xlsx").columns)
+    assert operations_df["Дата операции"].is_monotonic_decreasing
+    assert (operations_df["Статус"] == "OK").any()
+
+
+def test_run_and_compare(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Проверка замеров, сохранения результатов и сравнения с прошлым запуском"""
+    results = run([1000], repeat=1, functions=["df_cards_spend", "profitable_cashback"])
+    assert {(item["function"], item["rows"]) for item in results} == {
+        ("df_cards_spend", 1000),
+        ("profitable_cashback", 1000),
+    }
+    assert all(item["seconds"] > 0 and item["rows_per_second"] > 0 for item in results)
+
+    path = save_results(results, tmp_path)
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file)["results"] == results
+
+    slower = [{**item, "seconds": item["seconds"] * 2} for item in results]
+    assert len(compare(slower, path)) == 2
+    assert compare(results, path) == []
+    assert "замедление" in capsys.readouterr().out
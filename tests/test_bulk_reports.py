@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from src.bulk_reports import MANIFEST_FILENAME, compute_month, generate_monthly_reports, month_bounds
+from src.dataset import SpendDataset
+from src.services import profitable_cashback
+
+
+def test_month_bounds(test_df: pd.DataFrame) -> None:
+    dataset = SpendDataset(test_df)
+    assert month_bounds(dataset.dates) == {"2021-10": (0, 2), "2021-11": (2, 3), "2021-12": (3, 4)}
+
+
+def test_compute_month(test_df: pd.DataFrame) -> None:
+    result = compute_month("2021-12", SpendDataset(test_df).frame, windows=(1, 3))
+    assert result["cashback"] == json.loads(profitable_cashback(test_df, 2021, 12))
+    assert result["categories"] == {
+        "Переводы": {"3": {"total": -182.12, "count": 2}},
+        "Супермаркеты": {"1": {"total": -160.89, "count": 1}, "3": {"total": -238.94, "count": 2}},
+    }
+
+
+def test_generate_monthly_reports_resumes(test_df: pd.DataFrame, tmp_path: Path) -> None:
+    result = generate_monthly_reports(test_df, tmp_path, windows=(1, 3), workers=1)
+    assert result == {"computed": ["2021-10", "2021-11", "2021-12"], "skipped": [], "failed": [], "removed": []}
+    manifest = json.loads((tmp_path / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    assert sorted(manifest["partitions"]) == ["2021-10", "2021-11", "2021-12"]
+    report = json.loads((tmp_path / "2021-11.json").read_text(encoding="utf-8"))
+    assert report["categories"]["Переводы"]["1"] == {"total": -64.0, "count": 1}
+
+    assert generate_monthly_reports(test_df, tmp_path, windows=(1, 3), workers=1)["computed"] == []
+    # Изменение операции ноября пересчитывает ноябрь и декабрь (окно 3 месяца), но не октябрь
+    changed_df = test_df.copy()
+    changed_df.loc[1, "Сумма платежа"] = -70.0
+    result = generate_monthly_reports(changed_df, tmp_path, windows=(1, 3), workers=1)
+    assert result == {"computed": ["2021-11", "2021-12"], "skipped": ["2021-10"], "failed": [], "removed": []}
+    # Удаленный отчет рассчитывается заново
+    (tmp_path / "2021-10.json").unlink()
+    assert generate_monthly_reports(changed_df, tmp_path, windows=(1, 3), workers=1)["computed"] == ["2021-10"]
+
+
+def test_generate_monthly_reports_drops_removed_months(test_df: pd.DataFrame, tmp_path: Path) -> None:
+    """Проверка, что отчет и запись манифеста месяца, которого нет в исходных данных, удаляются"""
+    generate_monthly_reports(test_df, tmp_path, windows=(1,), workers=1)
+    without_december = test_df[test_df["Дата операции"] < "2021-12-01"]
+    result = generate_monthly_reports(without_december, tmp_path, windows=(1,), workers=1)
+    assert result == {"computed": [], "skipped": ["2021-10", "2021-11"], "failed": [], "removed": ["2021-12"]}
+    assert not (tmp_path / "2021-12.json").exists()
+    manifest = json.loads((tmp_path / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    assert sorted(manifest["partitions"]) == ["2021-10", "2021-11"]
@@ -0,0 +1,97 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import PATH_DATA_FILE
+from src.cache import cache_dir_for, read_cached_frame, write_cached_frame
+from src.schema import apply_schema
+from src.utils import read_excel
+
+
+@pytest.fixture
+def source_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Фикстура: исходный файл и отдельный каталог кэша для теста"""
+    monkeypatch.setattr("src.cache.PATH_DATA_CACHE", tmp_path / "cache")
+    source = tmp_path / "operations.xlsx"
+    source.write_bytes(b"operations")
+    return source
+
+
+def test_cache_roundtrip(source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что DataFrame из кэша совпадает с исходным, а разобранные столбцы подставляются"""
+    raw_df = test_df.assign(**{"Дата операции": test_df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")})
+    write_cached_frame(source_file, raw_df, {"Дата операции": test_df["Дата операции"]})
+
+    pd.testing.assert_frame_equal(read_cached_frame(source_file), test_df)
+    pd.testing.assert_frame_equal(read_cached_frame(source_file, use_parsed=False), raw_df)
+
+
+def test_cache_categorical_roundtrip(source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка сохранения столбцов category"""
+    df = test_df.astype({"Категория": "category", "Статус": "category"})
+    write_cached_frame(source_file, df, {})
+    pd.testing.assert_frame_equal(read_cached_frame(source_file), df)
+
+
+def test_cache_mixed_object_roundtrip(source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка столбца со значениями разных типов: он сохраняется кодами и значениями в meta.json, без pickle"""
+    df = test_df.assign(**{"MCC": pd.Series([5411, "нет", np.nan, 5411.5, "нет", 7], dtype=object)})
+    write_cached_frame(source_file, df, {})
+    pd.testing.assert_frame_equal(read_cached_frame(source_file), df)
+
+
+def test_cache_not_written_for_non_json_values(source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что значение, которое нельзя записать в JSON, отменяет запись кэша без исключения"""
+    df = test_df.copy()
+    df.attrs["loaded_at"] = pd.Timestamp("2021-12-31")
+    write_cached_frame(source_file, df, {})
+    assert read_cached_frame(source_file) is None
+    assert not list(cache_dir_for(source_file).parent.iterdir())
+
+
+def test_cache_invalidated_on_change(source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что после изменения исходного файла кэш не используется"""
+    write_cached_frame(source_file, test_df, {})
+    source_file.write_bytes(b"operations, new rows")
+    assert read_cached_frame(source_file) is None
+
+
+def test_cache_touched_file_still_valid(source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что изменение только mtime (содержимое то же) не сбрасывает кэш"""
+    write_cached_frame(source_file, test_df, {})
+    stat = source_file.stat()
+    os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert read_cached_frame(source_file) is not None
+
+
+def test_cache_missing() -> None:
+    """Проверка, что при отсутствии кэша возвращается None"""
+    assert read_cached_frame(Path("not_existing.xlsx")) is None
+
+
+@patch("src.utils.pd.read_excel")
+def test_read_excel_uses_cache(mock_reader: MagicMock, source_file: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что read_excel разбирает xlsx один раз, а затем читает кэш"""
+    mock_reader.return_value = test_df.assign(
+        **{"Дата операции": test_df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")}
+    )
+    first = read_excel(str(source_file))
+    second = read_excel(str(source_file))
+
+    mock_reader.assert_called_once_with(source_file)
+    pd.testing.assert_frame_equal(first, second)
+    expected = test_df.assign(**{"Дата платежа": pd.to_datetime(test_df["Дата платежа"], format="%d.%m.%Y")})
+    pd.testing.assert_frame_equal(second, apply_schema(expected))
+    assert second.attrs["invalid_dates"] == {}
+
+
+def test_cache_dir_for_files_outside_data(tmp_path: Path) -> None:
+    """Проверка, что одноименные выгрузки из разных каталогов не делят один кэш"""
+    first = cache_dir_for(tmp_path / "client_1" / "operations.xlsx")
+    second = cache_dir_for(tmp_path / "client_2" / "operations.xlsx")
+    assert first != second
+    assert cache_dir_for(PATH_DATA_FILE / "operations.xlsx").name == "operations.xlsx"
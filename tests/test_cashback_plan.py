@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.cashback_plan import SpendTensor, boost_gain, recommend_categories
+from src.dataset import SpendDataset
+from src.services import recommended_cashback
+
+
+def test_spend_tensor(test_df: pd.DataFrame) -> None:
+    tensor = SpendTensor(SpendDataset(test_df).frame)
+    assert list(tensor.accounts) == ["*4393", "*7197"]
+    assert list(tensor.categories) == ["Переводы", "Супермаркеты"]
+    assert [str(month) for month in tensor.months] == ["2021-10", "2021-11", "2021-12"]
+    np.testing.assert_allclose(tensor.values[1], [[0.0, 78.05], [64.0, 0.0], [0.0, 160.89]])
+    np.testing.assert_allclose(tensor.trailing_mean(np.array([2]), lookback=2)[1, 0], [32.0, 39.025])
+
+
+def test_boost_gain() -> None:
+    spend = np.array([100.0, 1000.0])
+    np.testing.assert_allclose(boost_gain(spend, np.array([0.05, 0.05]), base_rate=0.01), [4.0, 40.0])
+    np.testing.assert_allclose(boost_gain(spend, np.array([0.05, 0.05]), base_rate=0.01, cap=20.0), [4.0, 10.0])
+
+
+def test_recommend_categories(test_df: pd.DataFrame) -> None:
+    tensor = SpendTensor(SpendDataset(test_df).frame)
+    result = recommend_categories(tensor, [pd.Period("2021-12", "M"), pd.Period("2022-01", "M")], k=2, lookback=2)
+    assert result[["account", "month", "rank", "category"]].values.tolist() == [
+        ["*4393", "12.2021", 1, "Переводы"],
+        ["*7197", "12.2021", 1, "Супермаркеты"],
+        ["*7197", "12.2021", 2, "Переводы"],
+        ["*7197", "01.2022", 1, "Супермаркеты"],
+        ["*7197", "01.2022", 2, "Переводы"],
+    ]
+    # Выгода выбора при фактических тратах декабря; январь за пределами истории
+    assert result["actual_gain"].tolist()[:3] == [0.0, 6.44, 0.0]
+    assert result["actual_gain"].iloc[3:].isna().all()
+    # В словаре ставок только доступные для выбора категории
+    offer = recommend_categories(tensor, [pd.Period("2022-01", "M")], k=2, boost_rates={"Переводы": 0.1})
+    assert offer["category"].unique().tolist() == ["Переводы"]
+
+
+def test_recommended_cashback(test_df: pd.DataFrame) -> None:
+    result = json.loads(recommended_cashback(test_df, 2022, 1, k=1, lookback=3))
+    assert result == [
+        {
+            "account": "*4393",
+            "rank": 1,
+            "category": "Переводы",
+            "expected_spend": 39.37,
+            "expected_gain": 1.57,
+            "actual_gain": None,
+        },
+        {
+            "account": "*7197",
+            "rank": 1,
+            "category": "Супермаркеты",
+            "expected_spend": 79.65,
+            "expected_gain": 3.19,
+            "actual_gain": None,
+        },
+    ]
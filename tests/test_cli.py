@@ -0,0 +1,95 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from config import PATH_ROOT
+from src.cli import main
+from src.logger import flush_logs, get_logger
+
+# Бюджет времени импорта модуля командной строки (микросекунды, -X importtime)
+IMPORT_BUDGET_US = 100_000
+HEAVY_MODULES = {"pandas", "numpy", "requests", "dotenv"}
+
+
+def test_help_does_not_import_heavy_modules() -> None:
+    """Проверка, что --help не загружает pandas и requests и укладывается в бюджет времени импорта"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "src.main", "--help"],
+        cwd=PATH_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "cashback" in completed.stdout
+    imported = {}
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                imported[name.strip()] = int(cumulative)
+    assert not HEAVY_MODULES & {name.split(".")[0] for name in imported}
+    assert imported["src.cli"] < IMPORT_BUDGET_US
+
+
+def test_cashback_command(test_df: pd.DataFrame, capsys: pytest.CaptureFixture) -> None:
+    """Проверка команды cashback"""
+    with patch("src.cli._load_transactions", return_value=test_df):
+        assert main(["cashback", "--year", "2021", "--month", "12"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"Супермаркеты": 1.0}
+
+
+def test_report_command_without_file(test_df: pd.DataFrame, capsys: pytest.CaptureFixture) -> None:
+    """Проверка, что с --no-file отчет только выводится"""
+    with patch("src.cli._load_transactions", return_value=test_df), patch("src.reports.write_report") as write:
+        assert main(["report", "--category", "Переводы", "--date", "31.12.2021", "--no-file"]) == 0
+    write.assert_not_called()
+    assert len(json.loads(capsys.readouterr().out)) == 2
+
+
+def test_report_command_summary(test_df: pd.DataFrame, capsys: pytest.CaptureFixture) -> None:
+    """Проверка итогов по категории за один месяц"""
+    with patch("src.cli._load_transactions", return_value=test_df):
+        args = ["report", "--category", "Переводы", "--date", "31.12.2021", "--months", "1", "--summary", "--no-file"]
+        assert main(args) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert (result["total"], result["count"]) == (-64.0, 1)
+
+
+def test_invalid_date(capsys: pytest.CaptureFixture) -> None:
+    """Проверка, что неверная дата выводится как ошибка параметров с кодом 2"""
+    assert main(["main", "--date", "31-12-2021"]) == 2
+    assert "Ошибка" in capsys.readouterr().err
+    assert main(["report", "--category", "Переводы", "--date", "2021-12-31", "--no-file"]) == 2
+    assert "%d.%m.%Y" in capsys.readouterr().err
+
+
+def test_invalid_month(capsys: pytest.CaptureFixture) -> None:
+    """Проверка, что месяц вне диапазона 1–12 выводится как ошибка параметров с кодом 2"""
+    assert main(["cashback", "--year", "2021", "--month", "13"]) == 2
+    assert "месяц 13" in capsys.readouterr().err
+    assert main(["cashback-plan", "--year", "2021", "--month", "0"]) == 2
+    assert main(["batch", "data", "--year", "2021", "--month", "13"]) == 2
+
+
+def test_unexpected_error_propagates(test_df: pd.DataFrame) -> None:
+    """Проверка, что ошибки в коде команд не выдаются за ошибки параметров"""
+    with patch("src.cli._load_transactions", return_value=test_df.drop(columns="Кэшбэк")):
+        with pytest.raises(KeyError):
+            main(["cashback", "--year", "2021", "--month", "12"])
+
+
+def test_get_logger_is_idempotent(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Проверка, что повторный вызов не добавляет обработчик, а файл лога создается при первой записи"""
+    monkeypatch.setattr("src.logger.PATH_TO_LOGGER", tmp_path)
+    logger = get_logger("test_cli_logger")
+    assert get_logger("test_cli_logger").handlers == logger.handlers
+    assert len(logger.handlers) == 1
+    assert not (tmp_path / "test_cli_logger.log").exists()
+    logger.info("запись")
+    flush_logs()
+    assert (tmp_path / "test_cli_logger.log").exists()
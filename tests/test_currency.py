@@ -0,0 +1,72 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.currency import add_rub_amounts, load_rates
+from src.reports import spending_by_category
+from src.schema import RUB_AMOUNT_COLUMN, to_kopecks
+from src.utils import df_cards_spend
+
+
+@pytest.fixture
+def rates() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "currency": ["USD", "USD", "EUR"],
+            "date": pd.to_datetime(["2021-10-01", "2021-11-01", "2021-10-01"]),
+            "rate": [70.0, 75.0, 80.0],
+        }
+    )
+
+
+@pytest.fixture
+def foreign_df(test_df: pd.DataFrame) -> pd.DataFrame:
+    currencies = ["RUB", "USD", "USD", "EUR", "RUB", "USD"]
+    return test_df.assign(**{"Валюта платежа": pd.Categorical(currencies)})
+
+
+def test_add_rub_amounts(foreign_df: pd.DataFrame, rates: pd.DataFrame) -> None:
+    result = add_rub_amounts(foreign_df, rates)
+    # Курс на дату операции: 30.11 — курс от 01.11, 20.10 — от 01.10, 29.09 (раньше первого курса) — первый курс
+    assert result[RUB_AMOUNT_COLUMN].tolist() == [-160.89, -4800.0, -8268.4, -6244.0, 564.0, -7000.0]
+    assert RUB_AMOUNT_COLUMN not in foreign_df.columns
+
+
+def test_add_rub_amounts_missing_rate(foreign_df: pd.DataFrame, rates: pd.DataFrame) -> None:
+    result = add_rub_amounts(foreign_df, rates[rates["currency"] == "USD"])
+    assert pd.isna(result[RUB_AMOUNT_COLUMN][3])
+    assert result[RUB_AMOUNT_COLUMN][1] == -4800.0
+
+
+def test_add_rub_amounts_kopecks(foreign_df: pd.DataFrame, rates: pd.DataFrame) -> None:
+    kopecks_df = foreign_df.assign(**{"Сумма платежа": to_kopecks(foreign_df["Сумма платежа"])})
+    result = add_rub_amounts(kopecks_df, rates)
+    assert result[RUB_AMOUNT_COLUMN].dtype == "Int64"
+    assert result[RUB_AMOUNT_COLUMN][2] == -826840
+
+
+def test_load_rates_from_file(tmp_path: Path) -> None:
+    path = tmp_path / "rates.csv"
+    path.write_text("currency,date,rate\nUSD,2021-11-01,75\nUSD,2021-10-01,70\nEUR,2021-10-01,80\n")
+    rates = load_rates(path, ["USD"])
+    assert rates["rate"].tolist() == [70.0, 75.0]
+    assert pd.api.types.is_datetime64_any_dtype(rates["date"])
+
+
+def test_aggregates_use_rub_amounts(foreign_df: pd.DataFrame, rates: pd.DataFrame) -> None:
+    converted = add_rub_amounts(foreign_df, rates)
+    cards = df_cards_spend(converted)
+    assert cards.set_index("last_digits")["total_spent"].to_dict() == {
+        "4393": -8268.4,
+        "5091": -7000.0 + 564.0,
+        "7197": -160.89 - 4800.0 - 6244.0,
+    }
+    with patch("src.reports.write_report"):
+        report = json.loads(spending_by_category(converted, "Переводы", "31.12.2021"))
+    assert report == [
+        {"Сумма платежа": -64.0, RUB_AMOUNT_COLUMN: -4800.0, "Категория": "Переводы"},
+        {"Сумма платежа": -118.12, RUB_AMOUNT_COLUMN: -8268.4, "Категория": "Переводы"},
+    ]
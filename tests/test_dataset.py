@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pandas as pd
+
+from src.dataset import SpendDataset, as_spend_dataset
+
+
+def test_spend_dataset_filters_and_sorts(test_df: pd.DataFrame) -> None:
+    """Проверка, что в наборе только успешные траты, отсортированные по дате операции"""
+    dataset = SpendDataset(test_df)
+    assert len(dataset) == 4
+    assert all(dataset.frame["Сумма платежа"] < 0)
+    assert all(dataset.frame["Статус"] == "OK")
+    assert dataset.frame["Дата операции"].is_monotonic_increasing
+
+
+def test_spend_dataset_between(test_df: pd.DataFrame) -> None:
+    """Проверка выделения окна по датам (границы включительно)"""
+    dataset = SpendDataset(test_df)
+    result = dataset.between(datetime(2021, 10, 1), datetime(2021, 11, 30, 16, 42, 4))
+    assert list(result["Сумма платежа"]) == [-118.12, -78.05, -64.0]
+
+
+def test_spend_dataset_between_exclude_end(test_df: pd.DataFrame) -> None:
+    """Проверка выделения окна без правой границы"""
+    dataset = SpendDataset(test_df)
+    result = dataset.between(datetime(2021, 10, 1), datetime(2021, 11, 30, 16, 42, 4), include_end=False)
+    assert list(result["Сумма платежа"]) == [-118.12, -78.05]
+
+
+def test_as_spend_dataset(test_df: pd.DataFrame) -> None:
+    """Проверка, что готовый набор не перестраивается повторно"""
+    dataset = SpendDataset(test_df)
+    assert as_spend_dataset(dataset) is dataset
+    assert isinstance(as_spend_dataset(test_df), SpendDataset)
+
+
+def test_spending_index_matches_filter(test_df: pd.DataFrame) -> None:
+    """Проверка, что выборка по индексу трат совпадает с фильтрацией окна по категории"""
+    dataset = SpendDataset(test_df.astype({"Категория": "category"}))
+    index = dataset.spending_index
+    assert index is dataset.spending_index
+    start, end = datetime(2021, 10, 1), datetime(2021, 12, 31, 16, 44)
+    window = dataset.between(start, end)
+    for category in ["Переводы", "Супермаркеты", "Нет такой"]:
+        expected = window[window["Категория"] == category]
+        pd.testing.assert_frame_equal(index.rows(category, start, end), expected)
+        total, count = index.total(category, start, end)
+        assert (total, count) == (round(expected["Сумма платежа"].sum(), 2), len(expected))
+
+
+def test_spending_index_windows(test_df: pd.DataFrame) -> None:
+    """Проверка сумм для нескольких окон и категорий сразу"""
+    index = SpendDataset(test_df).spending_index
+    dates_end = pd.DatetimeIndex(["2021-11-30 23:59:59", "2021-12-31 23:59:59"])
+    totals, counts = index.windows(["Переводы", "Супермаркеты"], dates_end, months=1)
+    assert totals.round(2).tolist() == [[-64.0, 0.0], [0.0, -160.89]]
+    assert counts.tolist() == [[1, 0], [0, 1]]
@@ -0,0 +1,123 @@
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.dataset import SpendDataset
+from src.db_store import TransactionStore, operation_ids
+from src.reports import spending_by_category
+from src.services import profitable_cashback
+from src.utils import df_cards_spend, df_range_current_month, month_summary, month_window_end, read_excel
+
+
+@pytest.fixture
+def store(tmp_path: Path, test_df: pd.DataFrame) -> TransactionStore:
+    store = TransactionStore(tmp_path / "operations.sqlite")
+    store.import_frame(test_df)
+    return store
+
+
+def test_import_is_incremental(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    assert store.import_frame(test_df) == 0
+    new_operation = test_df.iloc[[0]].assign(**{"Дата операции": pd.Timestamp("2022-01-05 10:00:00")})
+    assert store.import_frame(pd.concat([test_df, new_operation])) == 1
+    assert len(store) == 5
+
+
+def test_identical_operations_are_kept(tmp_path: Path, test_df: pd.DataFrame) -> None:
+    doubled = pd.concat([test_df.iloc[[0]], test_df.iloc[[0]]])
+    assert operation_ids(doubled).nunique() == 2
+    store = TransactionStore(tmp_path / "operations.sqlite")
+    assert store.import_frame(doubled) == 2
+    assert store.import_frame(doubled) == 0
+
+
+def test_ids_do_not_depend_on_read_mode(tmp_path: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что один и тот же файл, прочитанный в разных режимах (суммы в рублях или копейках,
+    даты разобраны или строками выгрузки), дает те же идентификаторы и те же значения в хранилище"""
+    path = tmp_path / "operations.xlsx"
+    test_df.assign(**{"Дата операции": test_df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")}).to_excel(
+        path, index=False
+    )
+    rubles = read_excel(str(path), use_cache=False)
+    kopecks = read_excel(str(path), use_cache=False, amounts_in_kopecks=True)
+    raw_dates = read_excel(str(path), datetime_to_timestamp=False, use_cache=False)
+    assert operation_ids(kopecks).tolist() == operation_ids(rubles).tolist() == operation_ids(raw_dates).tolist()
+    store = TransactionStore(tmp_path / "operations.sqlite")
+    assert store.import_frame(kopecks) == 6
+    assert store.import_frame(rubles) == 0
+    assert store.import_frame(raw_dates) == 0
+    assert store.frame["Сумма платежа"].tolist() == [-118.12, -78.05, -64.0, -160.89]
+
+
+def test_store_of_other_version_is_rebuilt(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    """Проверка, что хранилище прежнего формата очищается и операции загружаются заново без задвоения"""
+    connection = sqlite3.connect(store.path)
+    connection.execute("PRAGMA user_version = 1")
+    connection.close()
+    reopened = TransactionStore(store.path)
+    assert len(reopened) == 0
+    assert reopened.import_frame(test_df) == 6
+    assert len(TransactionStore(store.path)) == 4
+
+
+def test_between_matches_spend_dataset(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    dataset = SpendDataset(test_df)
+    start, end = datetime(2021, 10, 1), datetime(2021, 11, 30, 16, 42, 4)
+    for include_end in (True, False):
+        expected = dataset.between(start, end, include_end=include_end).reset_index(drop=True)
+        result = store.between(start, end, include_end=include_end).reset_index(drop=True)
+        pd.testing.assert_frame_equal(
+            result[["Дата операции", "Сумма платежа", "Категория"]],
+            expected[["Дата операции", "Сумма платежа", "Категория"]],
+            check_dtype=False,
+        )
+    assert list(store.dates) == list(dataset.dates)
+
+
+def test_df_range_current_month(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    result = df_range_current_month(store, datetime(2021, 10, 31))
+    assert (
+        result["Дата операции"].tolist()
+        == df_range_current_month(test_df, datetime(2021, 10, 31))["Дата операции"].tolist()
+    )
+
+
+def test_profitable_cashback_from_store(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    for year, month in ((2021, 10), (2021, 12), (2020, 1)):
+        assert profitable_cashback(store, year, month) == profitable_cashback(test_df, year, month)
+
+
+def test_spending_by_category_from_store(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    with patch("src.reports.write_report"):
+        expected = spending_by_category(test_df, "Супермаркеты", "31.12.2021")
+        assert spending_by_category(store, "Супермаркеты", "31.12.2021") == expected
+
+
+def test_cards_spend(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    result = store.cards_spend(datetime(2021, 10, 1), datetime(2021, 12, 31, 23, 59, 59))
+    expected = df_cards_spend(SpendDataset(test_df).between(datetime(2021, 10, 1), datetime(2021, 12, 31, 23, 59, 59)))
+    assert result.to_dict("records") == expected.to_dict("records")
+
+
+def test_month_summary_from_store(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    """Проверка, что страница 'Главная' по запросам к хранилищу совпадает с расчетом по DataFrame"""
+    date = datetime(2021, 10, 31, 23, 0, 0)
+    result = month_summary(store, date, n=1)
+    expected = month_summary(test_df, date, n=1)
+    assert len(result["cards"]) == 2
+    assert result["top_transactions"]["amount"].tolist() == [-118.12]
+    for name in ("cards", "top_transactions", "categories"):
+        pd.testing.assert_frame_equal(
+            result[name].reset_index(drop=True), expected[name].reset_index(drop=True), check_dtype=False
+        )
+
+
+def test_month_window_end_from_store(store: TransactionStore, test_df: pd.DataFrame) -> None:
+    """Проверка, что конец окна трат по хранилищу совпадает с найденным по набору трат"""
+    dataset = SpendDataset(test_df)
+    for date in (datetime(2021, 10, 30, 12, 0), datetime(2021, 11, 30, 16, 42, 4), datetime(2021, 12, 1)):
+        assert month_window_end(store, date) == month_window_end(dataset, date)
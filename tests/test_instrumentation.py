@@ -0,0 +1,94 @@
+import json
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from src.db_store import TransactionStore
+from src.instrumentation import collect, metrics_snapshot, profiling, prometheus_text, reset_metrics, stage
+from src.views import get_result_main_page
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics() -> Iterator[None]:
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+@stage()
+def first_rows(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    return df.head(n)
+
+
+def test_stage_decorator_records_rows(test_df: pd.DataFrame) -> None:
+    with collect() as measurements:
+        first_rows(test_df, 2)
+    assert len(measurements) == 1
+    assert measurements[0]["stage"] == "first_rows"
+    assert measurements[0]["rows_in"] == 6
+    assert measurements[0]["rows_out"] == 2
+    assert measurements[0]["seconds"] >= 0
+    assert measurements[0]["memory_peak_bytes"] is None
+    first_rows(test_df, 3)
+    assert metrics_snapshot()["first_rows"]["calls"] == 2
+    assert metrics_snapshot()["first_rows"]["rows_out"] == 5
+
+
+def test_stage_store_rows_only_when_profiling(test_df: pd.DataFrame, tmp_path: Path) -> None:
+    """Проверка, что строки хранилища операций (запрос COUNT(*)) считаются только в режиме profiling"""
+    store = TransactionStore(tmp_path / "operations.sqlite")
+    store.import_frame(test_df)
+    read_store = stage("read_store")(lambda data: None)
+    with collect() as measurements:
+        read_store(store)
+        with profiling():
+            read_store(store)
+    assert [measurement["rows_in"] for measurement in measurements] == [None, 4]
+
+
+def test_stage_memory_with_nested_stages() -> None:
+    tracemalloc.start()
+    try:
+        with collect() as measurements:
+            with stage("outer"):
+                with stage("inner"):
+                    data = bytearray(10_000_000)
+                del data
+    finally:
+        tracemalloc.stop()
+    memory = {item["stage"]: item["memory_peak_bytes"] for item in measurements}
+    assert memory["inner"] >= 10_000_000
+    assert memory["outer"] >= memory["inner"]
+
+
+def test_prometheus_text(test_df: pd.DataFrame) -> None:
+    first_rows(test_df, 2)
+    text = prometheus_text()
+    assert "# TYPE bank_stage_calls_total counter" in text
+    assert 'bank_stage_calls_total{stage="first_rows"} 1' in text
+    assert 'bank_stage_rows_in_total{stage="first_rows"} 6' in text
+
+
+def test_profiling_writes_stats(tmp_path: Path, test_df: pd.DataFrame) -> None:
+    path = tmp_path / "profile.pstats"
+    with profiling(path):
+        with collect() as measurements:
+            first_rows(test_df, 2)
+    assert path.stat().st_size > 0
+    assert measurements[0]["memory_peak_bytes"] is not None
+    assert not tracemalloc.is_tracing()
+
+
+@patch("src.views.get_market_snapshot")
+def test_main_page_timings(mock_snapshot: MagicMock, test_df: pd.DataFrame) -> None:
+    mock_snapshot.return_value = ([], [])
+    result = json.loads(get_result_main_page(datetime(2021, 10, 30, 12, 0), test_df, timings=True))
+    stages = [item["stage"] for item in result["timings"]]
+    assert stages[-1] == "get_result_main_page"
+    assert {"df_range_current_month", "main_page_summary", "df_top_transactions"} <= set(stages)
+    assert "timings" not in json.loads(get_result_main_page(datetime(2021, 10, 30, 12, 0), test_df))
@@ -0,0 +1,55 @@
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.logger import flush_logs, get_logger
+
+
+@pytest.fixture
+def log_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Фикстура: отдельный каталог логов для теста"""
+    monkeypatch.setattr("src.logger.PATH_TO_LOGGER", tmp_path)
+    return tmp_path
+
+
+def test_records_written_by_background_thread(log_dir: Path) -> None:
+    """Проверка, что %-аргументы подставляются в потоке записи, а запись попадает в файл модуля"""
+    threads = []
+
+    class Shape:
+        def __str__(self) -> str:
+            threads.append(threading.current_thread())
+            return "(10, 2)"
+
+    logger = get_logger("test_logger_thread")
+    logger.debug("Размер данных DataFrame: %s", Shape())
+    flush_logs()
+    assert "DEBUG - Размер данных DataFrame: (10, 2)" in (log_dir / "test_logger_thread.log").read_text("utf-8")
+    assert any(thread is not threading.main_thread() for thread in threads)
+
+
+def test_log_level_from_env(log_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Проверка, что уровень задается переменной окружения LOG_LEVEL"""
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    logger = get_logger("test_logger_level")
+    assert logger.level == logging.INFO
+    logger.debug("отладка")
+    logger.info("информация")
+    flush_logs()
+    text = (log_dir / "test_logger_level.log").read_text("utf-8")
+    assert "информация" in text
+    assert "отладка" not in text
+
+
+def test_child_process_writes_directly(log_dir: Path) -> None:
+    """Проверка записи из дочернего процесса (fork), в котором нет потока записи родителя"""
+    logger = get_logger("test_logger_fork")
+    pid = os.fork()
+    if pid == 0:
+        logger.info("дочерний процесс")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert "дочерний процесс" in (log_dir / "test_logger_fork.log").read_text("utf-8")
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.market_data import FixedWindowRateLimiter, MarketDataClient, TTLCache
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Заглушка API: /convert отдает курс валюты, /query — котировку акции (с задержкой delay секунд)"""
+
+    requests_count = 0
+    delay = 0.0
+
+    def do_GET(self) -> None:
+        StubHandler.requests_count += 1
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        time.sleep(StubHandler.delay)
+        if url.path == "/convert":
+            body: dict[str, Any] = {"result": {"USD": 80.5, "EUR": 90.25}[params["from"]]}
+        elif url.path == "/query":
+            body = {"Global Quote": {"05. price": f"{len(params['symbol'])}.00"}}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server() -> Iterator[str]:
+    """Фикстура: локальный HTTP-сервер с заглушкой API, возвращает его адрес"""
+    StubHandler.requests_count = 0
+    StubHandler.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(base_url: str, **kwargs: Any) -> MarketDataClient:
+    return MarketDataClient(currency_url=f"{base_url}/convert", stock_url=f"{base_url}/query", **kwargs)
+
+
+def test_fetch_all(stub_server: str) -> None:
+    """Проверка, что ответы возвращаются в порядке запроса"""
+    client = make_client(stub_server)
+    currency_rates, stock_prices = client.fetch_all(["USD", "EUR"], ["AAPL", "TSLA", "GOOGL"])
+    client.close()
+    assert currency_rates == [{"currency": "USD", "rate": 80.5}, {"currency": "EUR", "rate": 90.25}]
+    assert stock_prices == [
+        {"stock": "AAPL", "price": "4.00"},
+        {"stock": "TSLA", "price": "4.00"},
+        {"stock": "GOOGL", "price": "5.00"},
+    ]
+
+
+def test_fetch_all_concurrent(stub_server: str) -> None:
+    """Проверка, что запросы выполняются параллельно, а не последовательно"""
+    StubHandler.delay = 0.2
+    client = make_client(stub_server)
+    start = time.monotonic()
+    client.fetch_all(["USD", "EUR"], ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"])
+    elapsed = time.monotonic() - start
+    client.close()
+    assert StubHandler.requests_count == 7
+    assert elapsed < 7 * 0.2
+
+
+def test_fetch_all_cached(stub_server: str) -> None:
+    """Проверка, что повторный вызов в пределах времени жизни кэша не обращается к API"""
+    client = make_client(stub_server)
+    client.fetch_all(["USD"], ["AAPL"])
+    client.fetch_all(["USD"], ["AAPL"])
+    client.close()
+    assert StubHandler.requests_count == 2
+
+
+def test_fetch_rate_limited(stub_server: str) -> None:
+    """Проверка, что при исчерпании квоты запрос к API не выполняется"""
+    client = make_client(stub_server, stock_limit=(1, 60.0))
+    _, stock_prices = client.fetch_all([], ["AAPL", "TSLA"])
+    client.close()
+    assert StubHandler.requests_count == 1
+    assert {} in stock_prices
+
+
+def test_fetch_timeout(stub_server: str) -> None:
+    """Проверка, что при превышении таймаута возвращается пустой ответ и он не кэшируется"""
+    StubHandler.delay = 0.5
+    client = make_client(stub_server, timeout=0.1)
+    assert client.get_currency_rate("USD") == {}
+    assert len(client.cache) == 0
+    client.close()
+
+
+def test_ttl_cache_expiry_and_eviction() -> None:
+    """Проверка истечения времени жизни и вытеснения записей кэша"""
+    cache = TTLCache(ttl=0.05, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
+    time.sleep(0.06)
+    assert cache.get("b") is None
+
+
+def test_fixed_window_rate_limiter() -> None:
+    """Проверка сброса квоты в новом окне"""
+    limiter = FixedWindowRateLimiter(max_calls=2, period=0.05)
+    assert limiter.acquire()
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    time.sleep(0.06)
+    assert limiter.acquire()
@@ -0,0 +1,104 @@
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+import src.market_store
+from src.market_store import MarketDataStore, get_market_snapshot, refresh_market_data, refresh_rate_history
+from src.utils import get_currencies_rates_bulk
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> MarketDataStore:
+    return MarketDataStore(tmp_path / "market.sqlite")
+
+
+@pytest.fixture(autouse=True)
+def no_last_attempt(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("src.market_store._last_attempt", 0.0)
+
+
+def test_latest_values_in_requested_order(store: MarketDataStore) -> None:
+    store.save_rates({"USD": 70.0, "EUR": 80.0}, "2021-01-01")
+    store.save_rates({"USD": 75.0}, "2021-02-01")
+    store.save_quotes({"AAPL": 150.5}, "2021-02-01")
+    assert store.latest_rates(["EUR", "USD", "GBP"]) == [
+        {"currency": "EUR", "rate": 80.0},
+        {"currency": "USD", "rate": 75.0},
+        {},
+    ]
+    assert store.latest_prices(["AAPL"]) == [{"stock": "AAPL", "price": 150.5}]
+    assert store.last_fetched(["USD"], ["AAPL"]) is not None
+    assert store.last_fetched(["USD"], ["MSFT"]) is None
+
+
+def test_rate_on(store: MarketDataStore) -> None:
+    store.save_rates_history({"2021-01-01": {"USD": 70.0}, "2021-01-10": {"USD": 72.0}})
+    assert store.rate_on("USD", datetime(2020, 12, 31)) is None
+    assert store.rate_on("USD", datetime(2021, 1, 5, 15, 30)) == 70.0
+    assert store.rate_on("USD", datetime(2021, 1, 10)) == 72.0
+    assert store.rate_on("RUB", datetime(2021, 1, 5)) == 1.0
+    frame = store.rates_frame(["USD"])
+    assert frame["rate"].tolist() == [70.0, 72.0]
+    assert pd.api.types.is_datetime64_any_dtype(frame["date"])
+
+
+def test_get_currencies_rates_bulk() -> None:
+    session = MagicMock()
+    session.get.return_value.json.return_value = {"base": "RUB", "rates": {"USD": 0.0125, "EUR": 0.01}}
+    assert get_currencies_rates_bulk(["USD", "EUR"], session=session) == {"USD": 80.0, "EUR": 100.0}
+    assert session.get.call_count == 1
+    assert session.get.call_args.kwargs["params"] == {"base": "RUB", "symbols": "USD,EUR"}
+
+
+@patch("src.market_store.get_currencies_rates_bulk", return_value={"USD": 80.0})
+def test_refresh_market_data(mock_bulk: MagicMock, store: MarketDataStore) -> None:
+    client = MagicMock()
+    client.fetch_all.return_value = ([], [{"stock": "AAPL", "price": "190.5"}, {}])
+    assert refresh_market_data(store, ["USD"], ["AAPL", "MSFT"], client) == (1, 1)
+    client.fetch_all.assert_called_once_with([], ["AAPL", "MSFT"])
+    assert store.latest_prices(["AAPL", "MSFT"]) == [{"stock": "AAPL", "price": 190.5}, {}]
+
+
+@patch("src.market_store.get_currencies_rates_history", return_value={"2021-01-01": {"USD": 70.0}})
+def test_refresh_rate_history_by_year(mock_history: MagicMock, store: MarketDataStore) -> None:
+    refresh_rate_history(store, ["USD"], datetime(2020, 1, 1), datetime(2021, 6, 30), MagicMock())
+    assert mock_history.call_count == 2
+    assert mock_history.call_args_list[1].args[1] == datetime(2020, 12, 31)
+
+
+@patch("src.market_store.refresh_market_data")
+def test_snapshot_refreshes_missing_data(mock_refresh: MagicMock, store: MarketDataStore) -> None:
+    mock_refresh.side_effect = lambda store, currencies, stocks: store.save_rates({"USD": 80.0}, "2021-01-01")
+    assert get_market_snapshot(["USD"], [], store) == ([{"currency": "USD", "rate": 80.0}], [])
+    # Свежие данные читаются из хранилища без обращения к API
+    assert get_market_snapshot(["USD"], [], store) == ([{"currency": "USD", "rate": 80.0}], [])
+    assert mock_refresh.call_count == 1
+
+
+@patch("src.market_store.refresh_market_data", side_effect=ConnectionError("offline"))
+def test_snapshot_offline_returns_stored_data(mock_refresh: MagicMock, store: MarketDataStore) -> None:
+    store.save_rates({"USD": 80.0}, "2021-01-01", fetched_at=time.time() - 10 * 24 * 3600)
+    assert get_market_snapshot(["USD"], [], store) == ([{"currency": "USD", "rate": 80.0}], [])
+    for _ in range(50):
+        if mock_refresh.called:
+            break
+        time.sleep(0.01)
+    mock_refresh.assert_called_once()
+    assert get_market_snapshot(["EUR"], [], store) == ([{}], [])
+
+
+@patch("src.market_store.threading.Thread")
+def test_snapshot_no_thread_while_refreshing(mock_thread: MagicMock, store: MarketDataStore) -> None:
+    """Проверка, что для устаревших данных поток не создается, пока обновление уже выполняется"""
+    store.save_rates({"USD": 80.0}, "2021-01-01", fetched_at=time.time() - 10 * 24 * 3600)
+    with src.market_store._refresh_lock:
+        assert get_market_snapshot(["USD"], [], store) == ([{"currency": "USD", "rate": 80.0}], [])
+    mock_thread.assert_not_called()
+    get_market_snapshot(["USD"], [], store)
+    mock_thread.assert_called_once()
+    # Поток замещен, блокировку освобождает тест
+    src.market_store._refresh_lock.release()
@@ -0,0 +1,124 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from config import PATH_DATA_FILE
+from src.dataset import SpendDataset
+from src.memo import FileVersion, Memo, fingerprint, get_memo, memo_prometheus_text, memoize
+from src.reports import spending_by_category
+from src.services import profitable_cashback
+from src.utils import month_window_end
+from src.views import get_result_main_page
+
+
+def test_memo_lru_and_stats() -> None:
+    memo = Memo(maxsize=2)
+    memo.set("a", 1)
+    memo.set("b", 2)
+    assert memo.get("f", "a") == (True, 1)
+    memo.set("c", 3)
+    # "b" — самый давно использованный результат
+    assert memo.get("f", "b") == (False, None)
+    assert len(memo) == 2
+    assert memo.stats() == {"f": {"hits": 1, "disk_hits": 0, "misses": 1}}
+
+
+def test_memo_disk_tier(tmp_path: Path) -> None:
+    Memo(path=tmp_path, disk_maxsize=2).set("a", {"total": 1.5})
+    memo = Memo(path=tmp_path, disk_maxsize=2)
+    assert memo.get("f", "a") == (True, {"total": 1.5})
+    assert memo.get("f", "a") == (True, {"total": 1.5})
+    assert memo.stats()["f"] == {"hits": 1, "disk_hits": 1, "misses": 0}
+    memo.set("b", 2)
+    os.utime(tmp_path / "a.json", (0, 0))
+    memo.set("c", 3)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.json", "c.json"]
+
+
+def test_fingerprint(test_df: pd.DataFrame, tmp_path: Path) -> None:
+    dataset = SpendDataset(test_df)
+    assert fingerprint(dataset) == fingerprint(SpendDataset(test_df.copy()))
+    assert fingerprint(test_df) != fingerprint(test_df.assign(**{"Кэшбэк": 0.0}))
+    assert fingerprint(iter([test_df])) is None
+    source = tmp_path / "user_settings.json"
+    source.write_text("{}")
+    version = fingerprint(FileVersion(source))
+    source.write_text('{"user_currencies": []}')
+    assert fingerprint(FileVersion(source)) != version
+
+
+def test_memoize_calls_once() -> None:
+    calls = []
+
+    @memoize("test_memoize")
+    def double(value: int, items: object = None) -> int:
+        calls.append(value)
+        return value * 2
+
+    assert [double(2), double(2), double(3), double(2, items=iter([]))] == [4, 4, 6, 4]
+    assert calls == [2, 3, 2]
+    assert get_memo().stats()["test_memoize"] == {"hits": 1, "disk_hits": 0, "misses": 2}
+
+
+def test_reports_are_memoized(test_df: pd.DataFrame) -> None:
+    first = profitable_cashback(test_df, 2021, 12)
+    assert profitable_cashback(test_df, 2021, 12) == first
+    with patch("src.reports.write_report") as write:
+        spending_by_category(test_df, "Переводы", "30.11.2021")
+        spending_by_category(test_df, "Переводы", "30.11.2021")
+    # Отчет берется из запомненных, но файл отчета записывается при каждом вызове
+    assert write.call_count == 2
+    stats = get_memo().stats()
+    assert stats["profitable_cashback"]["hits"] == 1
+    assert stats["category_report"]["hits"] == 1
+    assert 'bank_memo_hits_total{function="category_report"} 1' in memo_prometheus_text()
+
+
+def test_memoize_sees_in_place_changes(test_df: pd.DataFrame) -> None:
+    """Проверка, что изменение DataFrame на месте (размер тот же) не возвращает запомненный старый результат"""
+    first = json.loads(profitable_cashback(test_df, 2021, 12))
+    test_df.loc[test_df.index[0], "Кэшбэк"] = 5.0
+    assert json.loads(profitable_cashback(test_df, 2021, 12)) != first
+    assert get_memo().stats()["profitable_cashback"]["misses"] == 2
+
+
+def test_memo_returns_copies() -> None:
+    """Проверка, что изменение полученного результата не затрагивает запомненный"""
+    memo = Memo()
+    result = {"cards": [1]}
+    memo.set("a", result)
+    result["cards"].append(2)
+    memo.get("f", "a")[1]["cards"].append(3)
+    assert memo.get("f", "a") == (True, {"cards": [1]})
+
+
+@patch("src.views.get_market_snapshot", return_value=([], []))
+def test_main_page_window_key(mock_snapshot: MagicMock, test_df: pd.DataFrame) -> None:
+    """Проверка, что запросы страницы 'Главная' в разное время между двумя тратами используют один результат"""
+    dataset = SpendDataset(test_df)
+    assert month_window_end(dataset, datetime(2021, 10, 30, 12, 0)) == datetime(2021, 10, 27, 15, 44, 39)
+    assert month_window_end(dataset, datetime(2021, 10, 10)) == datetime(2021, 10, 1)
+    first = json.loads(get_result_main_page(datetime(2021, 10, 28, 9, 0), dataset))
+    second = json.loads(get_result_main_page(datetime(2021, 10, 30, 12, 0), dataset))
+    assert first["cards"] == second["cards"] and first["top_transactions"] == second["top_transactions"]
+    assert get_memo().stats()["_month_summary"] == {"hits": 1, "disk_hits": 0, "misses": 1}
+
+
+@patch("src.views.month_summary")
+@patch("src.views.get_market_snapshot", return_value=([], []))
+def test_main_page_key_ignores_default_file(
+    mock_snapshot: MagicMock, mock_summary: MagicMock, test_df: pd.DataFrame, tmp_path: Path
+) -> None:
+    """Проверка, что для переданных операций ключ не зависит от файла data/operations.xlsx"""
+    mock_summary.return_value = {"cards": pd.DataFrame(), "top_transactions": pd.DataFrame()}
+    dataset = SpendDataset(test_df)
+    get_result_main_page(datetime(2021, 10, 28, 9, 0), dataset)
+    # Другой каталог data: файла operations.xlsx в нем нет, настройки те же
+    (tmp_path / "user_settings.json").write_bytes((PATH_DATA_FILE / "user_settings.json").read_bytes())
+    with patch("src.views.PATH_DATA_FILE", tmp_path):
+        get_result_main_page(datetime(2021, 10, 28, 9, 0), dataset)
+    assert mock_summary.call_count == 1
@@ -1,10 +1,12 @@
 import json
 from datetime import datetime
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pandas as pd
+import pytest
 
-from src.reports import spending_by_category
+from src.reports import spending_by_categories, spending_by_category
 
 
 def test_spending_by_category(test_df: pd.DataFrame) -> None:
@@ -20,3 +22,56 @@ def test_spending_by_category_no_date(mock_datetime: Mock, test_df: pd.DataFrame
 
     expected_result = json.dumps([{"Сумма платежа": -118.12, "Категория": "Переводы"}], ensure_ascii=False, indent=4)
     assert spending_by_category(test_df, "Переводы") == expected_result
+
+
+def test_spending_by_categories(test_df: pd.DataFrame) -> None:
+    """Проверка отчета по всем категориям для нескольких дат"""
+    result = json.loads(spending_by_categories(test_df, ["30.11.2021", "31.12.2021"], to_file=False))
+    assert result == [
+        {"date": "30.11.2021", "category": "Переводы", "total": -118.12, "count": 1},
+        {"date": "30.11.2021", "category": "Супермаркеты", "total": -78.05, "count": 1},
+        {"date": "31.12.2021", "category": "Переводы", "total": -182.12, "count": 2},
+        {"date": "31.12.2021", "category": "Супермаркеты", "total": -78.05, "count": 1},
+    ]
+
+
+def test_spending_by_categories_matches_single(test_df: pd.DataFrame) -> None:
+    """Проверка, что пакетный отчет совпадает с отчетами по одной категории"""
+    result = json.loads(spending_by_categories(test_df, ["30.11.2021"], ["Переводы"], to_file=False))
+    single = json.loads(spending_by_category(test_df, "Переводы", "30.11.2021", to_file=False))
+    assert result[0]["total"] == sum(row["Сумма платежа"] for row in single)
+
+
+def test_spending_by_category_to_file(test_df: pd.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Проверка, что to_file=False не записывает отчет в файл"""
+    monkeypatch.setattr("src.reports.PATH_DATA_REPORT", tmp_path)
+    spending_by_category(test_df, "Переводы", "30.11.2021", to_file=False)
+    assert not (tmp_path / "report.json").exists()
+    spending_by_category(test_df, "Переводы", "30.11.2021")
+    assert (tmp_path / "report.json").exists()
+
+
+def test_spending_by_category_months(test_df: pd.DataFrame) -> None:
+    """Проверка периода произвольной длины"""
+    result = json.loads(spending_by_category(test_df, "Переводы", "31.12.2021", months=1, to_file=False))
+    assert result == [{"Сумма платежа": -64.0, "Категория": "Переводы"}]
+    result = json.loads(spending_by_category(test_df, "Переводы", "31.12.2021", months=12, to_file=False))
+    assert [row["Сумма платежа"] for row in result] == [-64.0, -118.12]
+
+
+def test_spending_by_category_summary(test_df: pd.DataFrame) -> None:
+    """Проверка итогов по категории с тратами по дням"""
+    result = json.loads(spending_by_category(test_df, "Переводы", "31.12.2021", months=6, summary=True, to_file=False))
+    assert result == {
+        "category": "Переводы",
+        "date_start": "30.06.2021",
+        "date_end": "31.12.2021",
+        "total": -182.12,
+        "count": 2,
+        "daily": [
+            {"date": "20.10.2021", "total": -118.12, "count": 1},
+            {"date": "30.11.2021", "total": -64.0, "count": 1},
+        ],
+    }
+    empty = json.loads(spending_by_category(test_df, "Нет такой", "31.12.2021", summary=True, to_file=False))
+    assert (empty["total"], empty["count"], empty["daily"]) == (0.0, 0, [])
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from src.schema import apply_schema, from_kopecks, memory_report, normalize_dates, parse_dates, to_kopecks
+
+
+def test_apply_schema(test_df: pd.DataFrame) -> None:
+    """Проверка приведения текстовых столбцов к category"""
+    result = apply_schema(test_df.copy())
+    assert result["Категория"].dtype == "category"
+    assert result["Номер карты"].dtype == "category"
+    assert result["Сумма платежа"].dtype == "float64"
+    assert list(result["Статус"] == "OK") == list(test_df["Статус"] == "OK")
+
+
+def test_apply_schema_kopecks(test_df: pd.DataFrame) -> None:
+    """Проверка хранения сумм в копейках"""
+    result = apply_schema(test_df.copy(), amounts_in_kopecks=True)
+    assert result["Сумма платежа"].tolist() == [-16089, -6400, -11812, -7805, 56400, -10000]
+    assert result["Кэшбэк"].isna().sum() == 3
+    pd.testing.assert_series_equal(from_kopecks(result["Сумма платежа"]), test_df["Сумма платежа"])
+
+
+def test_to_kopecks_rounding() -> None:
+    """Проверка округления до копейки (0.1 + 0.2 не равно 0.3 в float)"""
+    assert to_kopecks(pd.Series([0.1 + 0.2, -160.89])).tolist() == [30, -16089]
+
+
+def test_parse_dates() -> None:
+    """Проверка разбора дат по явному формату и с запасным вариантом для другого формата"""
+    values = pd.Series(["31.12.2021 16:44:00", "01.02.2021", None])
+    result = parse_dates(values, "%d.%m.%Y %H:%M:%S")
+    assert result.tolist()[:2] == [pd.Timestamp("2021-12-31 16:44:00"), pd.Timestamp("2021-02-01")]
+    assert pd.isna(result[2])
+
+
+def test_parse_dates_invalid() -> None:
+    """Проверка, что повторяющиеся значения разбираются один раз, а некорректные даты становятся NaT"""
+    values = pd.Series(["31.12.2021", "31.12.2021", "не дата", None, "31.12.2021"], index=[5, 6, 7, 8, 9])
+    result = parse_dates(values, "%d.%m.%Y")
+    assert result.index.tolist() == [5, 6, 7, 8, 9]
+    assert result.isna().tolist() == [False, False, True, True, False]
+    assert result[9] == pd.Timestamp("2021-12-31")
+
+
+def test_normalize_dates(test_df: pd.DataFrame) -> None:
+    """Проверка разбора столбцов дат выгрузки и учета некорректных дат"""
+    raw_df = test_df.assign(**{"Дата операции": test_df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")})
+    raw_df.loc[0, "Дата платежа"] = "32.12.2021"
+    parsed = normalize_dates(raw_df)
+    assert set(parsed) == {"Дата операции", "Дата платежа"}
+    pd.testing.assert_series_equal(parsed["Дата операции"], test_df["Дата операции"])
+    assert pd.isna(parsed["Дата платежа"][0])
+    assert parsed["Дата платежа"][1] == pd.Timestamp("2021-11-30")
+    assert raw_df.attrs["invalid_dates"] == {"Дата платежа": 1}
+
+
+def test_memory_report(test_df: pd.DataFrame) -> None:
+    """Проверка отчета о памяти: категориальные столбцы занимают меньше места"""
+    usage_before = test_df.memory_usage(deep=True)
+    compact_df = apply_schema(pd.concat([test_df] * 100, ignore_index=True))
+    report = memory_report(usage_before * 100, compact_df.memory_usage(deep=True))
+    assert report.loc["Категория", "after"] < report.loc["Категория", "before"]
+    assert 0 < report.loc["Итого", "saved"] < 1
@@ -0,0 +1,67 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.reports import spending_by_category
+from src.serialization import frame_to_json, series_to_json
+
+
+@pytest.fixture
+def mixed_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Сумма платежа": [-160.89, np.nan, 1e20, 0.1],
+            "Категория": pd.Categorical(["Супермаркеты", None, "Переводы", "Супермаркеты"]),
+            "Описание": ["Колхоз", None, 'Перевод "{}"', "Колхоз"],
+            "Количество": [1, 2, 3, 4],
+            "Возврат": [True, False, False, True],
+        }
+    )
+
+
+@pytest.mark.parametrize("indent", [4, 2, None])
+def test_frame_to_json_matches_json_dumps(mixed_df: pd.DataFrame, indent: int) -> None:
+    expected = json.dumps(mixed_df.to_dict(orient="records"), ensure_ascii=False, indent=indent)
+    assert frame_to_json(mixed_df, indent=indent) == expected
+
+
+def test_frame_to_json_compact_and_chunks(mixed_df: pd.DataFrame) -> None:
+    records = mixed_df.to_dict(orient="records")
+    assert frame_to_json(mixed_df, "compact") == json.dumps(records, ensure_ascii=False, separators=(",", ":"))
+    with patch("src.serialization.CHUNK_ROWS", 3):
+        assert frame_to_json(mixed_df) == json.dumps(records, ensure_ascii=False, indent=4)
+    assert frame_to_json(mixed_df.iloc[:0]) == "[]"
+
+
+def test_frame_to_json_columns(mixed_df: pd.DataFrame) -> None:
+    assert json.loads(frame_to_json(mixed_df, "columns")) == {
+        "Сумма платежа": [-160.89, None, 1e20, 0.1],
+        "Категория": ["Супермаркеты", None, "Переводы", "Супермаркеты"],
+        "Описание": ["Колхоз", None, 'Перевод "{}"', "Колхоз"],
+        "Количество": [1, 2, 3, 4],
+        "Возврат": [True, False, False, True],
+    }
+    with pytest.raises(ValueError):
+        frame_to_json(mixed_df, "xml")
+
+
+def test_series_to_json() -> None:
+    series = pd.Series([5.0, 1.25], index=pd.CategoricalIndex(["Переводы", "Супермаркеты"]))
+    assert series_to_json(series) == json.dumps({"Переводы": 5.0, "Супермаркеты": 1.25}, ensure_ascii=False, indent=4)
+    assert series_to_json(series.iloc[:0]) == "{}"
+
+
+def test_spending_by_category_formats(test_df: pd.DataFrame) -> None:
+    with patch("src.reports.write_report"):
+        records = spending_by_category(test_df, "Переводы", "31.12.2021")
+        compact = spending_by_category(test_df, "Переводы", "31.12.2021", json_format="compact")
+        columns = spending_by_category(test_df, "Переводы", "31.12.2021", json_format="columns")
+    assert json.loads(compact) == json.loads(records)
+    assert "\n" not in compact
+    assert json.loads(columns) == {
+        "Сумма платежа": [-64.0, -118.12],
+        "Категория": ["Переводы", "Переводы"],
+    }
@@ -0,0 +1,88 @@
+import json
+import threading
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+
+from src.server import DatasetHolder, create_server
+
+
+@pytest.fixture
+def holder(test_df: pd.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> DatasetHolder:
+    """Фикстура: операции test_df, «файл» операций — временный файл (по нему отслеживаются изменения)"""
+    monkeypatch.setattr("src.aggregates.PATH_DATA_CACHE", tmp_path)
+    source = tmp_path / "operations.xlsx"
+    source.write_bytes(b"v1")
+    return DatasetHolder(str(source), loader=MagicMock(return_value=test_df))
+
+
+@pytest.fixture
+def base_url(holder: DatasetHolder) -> Iterator[str]:
+    server = create_server(port=0, holder=holder)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def get_json(url: str) -> object:
+    with urlopen(url) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def test_dataset_holder_reload(holder: DatasetHolder) -> None:
+    """Проверка, что файл перечитывается только после изменения"""
+    holder.get()
+    holder.get()
+    assert holder.loader.call_count == 1  # type: ignore[attr-defined]
+    source = Path(holder.filename)
+    source.write_bytes(b"v2, changed")
+    holder.get()
+    assert holder.loader.call_count == 2  # type: ignore[attr-defined]
+
+
+def test_cashback_endpoint(base_url: str) -> None:
+    assert get_json(f"{base_url}/cashback?year=2021&month=10") == {"Переводы": 0.0, "Супермаркеты": 1.0}
+
+
+def test_report_endpoint(base_url: str) -> None:
+    result = get_json(f"{base_url}/report?category=%D0%9F%D0%B5%D1%80%D0%B5%D0%B2%D0%BE%D0%B4%D1%8B&date=30.11.2021")
+    assert result == [{"Сумма платежа": -118.12, "Категория": "Переводы"}]
+
+
+@patch("src.views.get_market_snapshot")
+def test_main_endpoint(mock_snapshot: MagicMock, base_url: str) -> None:
+    mock_snapshot.return_value = ([{"currency": "USD", "rate": 80.5}], [])
+    result = get_json(f"{base_url}/main?date=30.10.2021%2015:44:00")
+    assert isinstance(result, dict)
+    assert result["greeting"] == "Добрый день"
+    assert len(result["top_transactions"]) == 2
+    assert result["currency_rates"] == [{"currency": "USD", "rate": 80.5}]
+
+
+@pytest.mark.parametrize("path, status", [("/cashback?year=2021", 400), ("/unknown", 404)])
+def test_errors(base_url: str, path: str, status: int) -> None:
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"{base_url}{path}")
+    assert error.value.code == status
+
+
+def test_health(base_url: str) -> None:
+    assert get_json(f"{base_url}/health") == {"status": "ok"}
+
+
+@patch("src.views.get_market_snapshot")
+def test_metrics_endpoint(mock_snapshot: MagicMock, base_url: str) -> None:
+    mock_snapshot.return_value = ([], [])
+    result = get_json(f"{base_url}/main?date=30.10.2021%2015:44:00&timings=1")
+    assert isinstance(result, dict)
+    assert "df_range_current_month" in [item["stage"] for item in result["timings"]]
+    with urlopen(f"{base_url}/metrics") as response:
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert 'bank_stage_calls_total{stage="get_result_main_page"}' in response.read().decode("utf-8")
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from src.reports import REPORT_COLUMNS, spending_by_category, spending_by_category_batches
+from src.services import CASHBACK_COLUMNS, profitable_cashback, profitable_cashback_batches
+from src.streaming import fold_batches, iter_operations
+
+
+@pytest.fixture
+def operations_xlsx(test_df: pd.DataFrame, tmp_path: Path) -> Path:
+    """Фикстура: xlsx с операциями в формате выгрузки банка (даты — строки)"""
+    raw_df = test_df.assign(**{"Дата операции": test_df["Дата операции"].dt.strftime("%d.%m.%Y %H:%M:%S")})
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(list(raw_df.columns))
+    for row in raw_df.itertuples(index=False):
+        sheet.append([None if pd.isna(value) else value for value in row])
+    path = tmp_path / "operations.xlsx"
+    workbook.save(path)
+    return path
+
+
+def test_iter_operations_xlsx(operations_xlsx: Path, test_df: pd.DataFrame) -> None:
+    """Проверка чтения xlsx пакетами только нужных столбцов"""
+    batches = list(iter_operations(str(operations_xlsx), CASHBACK_COLUMNS, batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 2]
+    result = pd.concat(batches, ignore_index=True)
+    pd.testing.assert_frame_equal(result, test_df[CASHBACK_COLUMNS])
+
+
+def test_iter_operations_csv(test_df: pd.DataFrame, tmp_path: Path) -> None:
+    """Проверка чтения csv частями"""
+    path = tmp_path / "operations.csv"
+    test_df.to_csv(path, index=False, date_format="%d.%m.%Y %H:%M:%S")
+    batches = list(iter_operations(str(path), REPORT_COLUMNS, batch_size=5))
+    assert [len(batch) for batch in batches] == [5, 1]
+    pd.testing.assert_frame_equal(pd.concat(batches), test_df[REPORT_COLUMNS])
+
+
+def test_iter_operations_missing_column(operations_xlsx: Path) -> None:
+    """Проверка ошибки при запросе отсутствующего столбца"""
+    with pytest.raises(KeyError):
+        list(iter_operations(str(operations_xlsx), ["Нет такого столбца"]))
+
+
+def test_fold_batches() -> None:
+    """Проверка свертки пакетов"""
+    batches = [pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]})]
+    assert fold_batches(batches, lambda batch: int(batch["a"].sum()), lambda x, y: x + y, 0) == 6
+
+
+def test_profitable_cashback_batches(operations_xlsx: Path, test_df: pd.DataFrame) -> None:
+    """Проверка, что расчет по пакетам совпадает с расчетом по всему DataFrame"""
+    batches = iter_operations(str(operations_xlsx), CASHBACK_COLUMNS, batch_size=2)
+    result = json.loads(profitable_cashback_batches(batches, 2021, 10))
+    assert result == json.loads(profitable_cashback(test_df, 2021, 10)) == {"Переводы": 0.0, "Супермаркеты": 1.0}
+
+
+def test_spending_by_category_batches(operations_xlsx: Path, test_df: pd.DataFrame) -> None:
+    """Проверка отчета по категории по пакетам"""
+    batches = iter_operations(str(operations_xlsx), REPORT_COLUMNS, batch_size=2)
+    result = spending_by_category_batches(batches, "Супермаркеты", "31.12.2021")
+    assert result == spending_by_category(test_df, "Супермаркеты", "31.12.2021")
+    assert json.loads(result) == [{"Сумма платежа": -78.05, "Категория": "Супермаркеты"}]
@@ -8,7 +8,7 @@ from freezegun import freeze_time
 
 from config import PATH_DATA_FILE
 from src.utils import (df_cards_spend, df_range_current_month, df_top_transactions, get_currencies_rate,
-                       get_current_date_time, get_stock_prices, greetings, read_excel)
+                       get_current_date_time, get_stock_prices, greetings, main_page_summary, read_excel)
 
 
 @freeze_time("2025-04-19 12:36:00")  # замораживаем дату и время для теста
@@ -108,6 +108,37 @@ def test_df_top_transactions(test_df: pd.DataFrame) -> None:
     assert list(result.columns) == expected_columns
 
 
+def test_df_top_transactions_n(test_df: pd.DataFrame) -> None:
+    """Тест параметра n функции df_top_transactions"""
+    result = df_top_transactions(test_df, n=2)
+    assert result["amount"].tolist() == [-160.89, -118.12]
+
+
+def test_df_top_transactions_payment_date(test_df: pd.DataFrame) -> None:
+    """Тест, что разобранная дата платежа выводится в формате выгрузки"""
+    parsed_df = test_df.assign(**{"Дата платежа": pd.to_datetime(test_df["Дата платежа"], format="%d.%m.%Y")})
+    result = df_top_transactions(parsed_df, n=2)
+    assert result["date"].tolist() == ["31.12.2021", "30.10.2021"]
+
+
+def test_df_cards_spend_categorical(test_df: pd.DataFrame) -> None:
+    """Тест, что для столбца category результат совпадает с обычным столбцом"""
+    categorical_df = test_df.astype({"Номер карты": "category"})
+    pd.testing.assert_frame_equal(df_cards_spend(categorical_df), df_cards_spend(test_df))
+
+
+def test_main_page_summary(test_df: pd.DataFrame) -> None:
+    """Тест расчета данных страницы 'Главная' за один проход"""
+    summary = main_page_summary(test_df, n=3)
+    pd.testing.assert_frame_equal(summary["cards"], df_cards_spend(test_df))
+    pd.testing.assert_frame_equal(summary["top_transactions"], df_top_transactions(test_df, n=3))
+    assert summary["categories"].to_dict(orient="records") == [
+        {"category": "Переводы", "total_spent": -182.12, "cashback": 0.0},
+        {"category": "Различные товары", "total_spent": 564.0, "cashback": 0.0},
+        {"category": "Супермаркеты", "total_spent": -338.94, "cashback": 3.0},
+    ]
+
+
 @patch("requests.get")
 def test_get_currencies_rate_success(mock_get: MagicMock) -> None:
     """Тест на проверку, что функция возвращает курс валют от API"""
@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+from typing import IO
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.reports import spending_by_category, write_to_file
+from src.writers import ReportData, dumps_compact, get_background_writer, register_writer, write_report
+
+RECORDS = [{"Сумма платежа": -118.12, "Категория": "Переводы"}, {"Сумма платежа": -64.0, "Категория": "Переводы"}]
+
+
+def test_write_report_json_string(tmp_path: Path) -> None:
+    """Проверка, что готовая строка записывается как есть"""
+    path = write_report(json.dumps(RECORDS, ensure_ascii=False, indent=4), tmp_path / "report.json")
+    assert json.loads(path.read_text(encoding="utf-8")) == RECORDS
+
+
+def test_write_report_compact_json(tmp_path: Path) -> None:
+    """Проверка компактной записи JSON без отступов"""
+    path = write_report(RECORDS, tmp_path / "report.json")
+    text = path.read_text(encoding="utf-8")
+    assert "\n" not in text
+    assert json.loads(text) == RECORDS
+
+
+def test_write_report_ndjson(tmp_path: Path) -> None:
+    """Проверка записи NDJSON: одна запись на строку"""
+    path = write_report(json.dumps(RECORDS), tmp_path / "report", fmt="ndjson")
+    assert path.suffix == ".ndjson"
+    assert [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()] == RECORDS
+
+
+def test_write_report_csv(tmp_path: Path) -> None:
+    """Проверка записи CSV"""
+    path = write_report(pd.DataFrame(RECORDS), tmp_path / "report.csv")
+    pd.testing.assert_frame_equal(pd.read_csv(path), pd.DataFrame(RECORDS))
+
+
+def test_write_report_parquet_without_engine(tmp_path: Path) -> None:
+    """Проверка понятной ошибки, если нет библиотеки для parquet"""
+    with patch("src.writers.importlib.util.find_spec", return_value=None):
+        with pytest.raises(ImportError):
+            write_report(RECORDS, tmp_path / "report.parquet")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_write_report_unknown_format(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        write_report(RECORDS, tmp_path / "report.json", fmt="xml")
+
+
+def test_write_report_unique(tmp_path: Path) -> None:
+    """Проверка, что при unique=True отчеты не перезаписывают друг друга"""
+    first = write_report(RECORDS, tmp_path / "report.json", unique=True)
+    second = write_report(RECORDS, tmp_path / "report.json", unique=True)
+    assert first != second
+    assert first.name.startswith("report_") and first.suffix == ".json"
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_write_report_background(tmp_path: Path) -> None:
+    """Проверка записи в фоновом потоке"""
+    path = write_report(RECORDS, tmp_path / "report.json", background=True)
+    get_background_writer().flush()
+    assert json.loads(path.read_text(encoding="utf-8")) == RECORDS
+
+
+def test_register_writer(tmp_path: Path) -> None:
+    """Проверка подключения своего формата"""
+
+    def write_txt(data: ReportData, file: IO[bytes]) -> None:
+        file.write(str(len(data)).encode())
+
+    register_writer("txt", ".txt", write_txt)
+    path = write_report(RECORDS, tmp_path / "report.txt")
+    assert path.read_text() == "2"
+
+
+def test_dumps_compact() -> None:
+    """Проверка компактного JSON без экранирования кириллицы"""
+    assert json.loads(dumps_compact({"Категория": "Еда", "сумма": 1.5})) == {"Категория": "Еда", "сумма": 1.5}
+
+
+def test_write_to_file_format(test_df: pd.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Проверка декоратора с форматом NDJSON"""
+    monkeypatch.setattr("src.reports.PATH_DATA_REPORT", tmp_path)
+    report = write_to_file("report.ndjson")(spending_by_category.__wrapped__)
+    result = report(test_df, "Переводы", "30.11.2021")
+    lines = (tmp_path / "report.ndjson").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == json.loads(result)